@@ -295,6 +295,7 @@ class FigshareObjectWindow(QMdiSubWindow):
         # Connect search function to the return key
         edit.returnPressed.connect(lambda: self.search_on_return(edit.text()))
         edit.textChanged.connect(lambda: self.search_on_clear(edit.text()))
+        self.search_edit = edit
         return edit
 
     # Widget Actions
@@ -346,6 +347,35 @@ class FigshareObjectWindow(QMdiSubWindow):
         self.s_bar.setMaximum(len(self.object_list) - number)  # Will be zero if less than 4 items in list
         self.create_object_bar(0, number)  # Recreates the button view from the new position
 
+    def on_object_list_changed(self, key: str, object_list: list):
+        """
+        Called when a background sync of the offline mirror finds that the object list has changed on Figshare. Redraws
+        the object buttons, unless search results are being shown.
+
+        Args:
+            key: Mirror key of the object list.
+            object_list: Updated list of the users Figshare objects.
+
+        Returns:
+            None
+        """
+        if self.search_edit.text() != '':
+            return
+        self.object_list = object_list
+
+        # Remove all existing button widgets
+        while self.object_buttons_box.count():
+            item = self.object_buttons_box.takeAt(0)
+            item.widget().deleteLater()
+
+        # The list may have shrunk, so the scroll bar is limited before its position is read
+        number = min(len(self.object_list), 4)
+        self.s_bar.blockSignals(True)
+        self.s_bar.setMaximum(len(self.object_list) - number)
+        self.s_bar.blockSignals(False)
+        s_bar_pos = self.s_bar.value()
+        self.create_object_bar(s_bar_pos, s_bar_pos + number)
+
     def search_on_return(self, search_text: str):
         """
         Called when the return key is pressed in the search bar. Will search the relavant Figshare object endpoint based
@@ -4,7 +4,7 @@
 
 # Standard Imports
 import os
-from requests import HTTPError
+from functools import partial
 
 # PyQt Imports
 from PyQt5.QtWidgets import (QWidget, QLabel, QPushButton, QLineEdit, QMessageBox, QScrollArea, QMdiSubWindow,
@@ -17,9 +17,8 @@ from Figshare_desktop.custom_widgets.button_field import QButtonField
 from Figshare_desktop.custom_widgets.author_field import AuthorField
 from Figshare_desktop.custom_widgets.categories_field import CategoriesField
 from Figshare_desktop.formatting.formatting import (grid_label, grid_edit, press_button)
-
-# Figshare API Interface Imports
-from figshare_interface import (Projects)
+from Figshare_desktop.background_jobs.save_manager import (SaveManager, apply_update)
+from Figshare_desktop.local_store.offline_mirror import ARTICLE_UPDATE
 
 __author__ = "Tobias Gill"
 __credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
@@ -41,6 +40,9 @@ class ArticleEditWindow(QMdiSubWindow):
         self.project_id = project_id
         self.article_ids = article_ids
 
+        # Managers of the saves that are running. Each save has its own manager holding its own updates
+        self.save_managers = set()
+
         self.initFig()
         self.initUI()
 
@@ -465,62 +467,101 @@ class ArticleEditWindow(QMdiSubWindow):
 
     def update_all_articles(self, article_list):
         """
-        Updates multiple articles
+        Saves the edits made in the window to multiple articles in the background. The edited values are read from the
+        form once, and each article that differs from them is sent a single update holding both its Figshare and custom
+        fields.
         :param article_list: list of int.
         :return:
         """
-        all_errors = []
-        for article_id in article_list:
-            errors = self.update_single_article(article_id)
-            if errors != []:
-                for err in errors:
-                    all_errors.append(err)
+        figshare_values = self.read_figshare_metadata()
+        file_values = self.read_file_metadata() if self.file_metadata is not None else None
 
-        if all_errors == []:
+        # Updates to be sent, keyed by article id
+        updates = {}
+        for article_id in article_list:
+            update_dict = self.article_update(article_id, figshare_values, file_values)
+            if update_dict:
+                updates[str(article_id)] = update_dict
+
+        if not updates:
+            QMessageBox.information(self, "Update Confirmation", "No changes to save", QMessageBox.Ok)
+            return
+
+        # The updates are passed to the save job, so that a save started while this one runs cannot change them
+        save_manager = SaveManager(partial(self.save_article, updates), self)
+        save_manager.sig_finished.connect(partial(self.on_save_finished, save_manager, updates))
+        self.save_managers.add(save_manager)
+        save_manager.start(list(updates))
+
+    def on_save_finished(self, save_manager: SaveManager, updates: dict, saved: list, errors: list):
+        """
+        Called once the article updates have been sent. Updates the local articles that were saved, and offers to retry
+        those that were not.
+        :param save_manager: SaveManager. Manager of the finished save
+        :param updates: dict. Updates that were sent, keyed by article id
+        :param saved: list of str. Figshare article id numbers of the saved articles.
+        :param errors: list of str. Error messages of the articles that could not be saved.
+        :return:
+        """
+        self.save_managers.discard(save_manager)
+
+        documents = []
+        articles = []
+        for article_id in saved:
+            article = self.parent.figshare_articles[article_id]
+            apply_update(article, updates[article_id])
+            articles.append(article)
+            document_dict = {}
+            for d in article.input_dicts():
+                document_dict.update(d)
+            documents.append(document_dict)
+        if documents and self.parent.figshare_article_index is not None:
+            self.parent.figshare_article_index.updateDocuments(schema='figshare_articles', data_dicts=documents)
+        # Keep the edits in the article cache, so that queued edits are still shown in the next session
+        self.parent.article_cache.store_many(articles)
+
+        # Articles that failed or were not reached before the saves were cancelled
+        saved = set(saved)
+        unsaved = [article_id for article_id in updates if article_id not in saved]
+        # Articles whose updates are queued until Figshare can be reached
+        queued = saved & self.parent.local_mirror.pending_ids(ARTICLE_UPDATE)
+        self.parent.mirror_sync.check_online()
+
+        if not unsaved:
             msg = "All articles updated"
-            resp = QMessageBox.information(self, "Update Confirmation", msg, QMessageBox.Ok)
+            if queued:
+                msg += (".\n{} of the updates could not reach Figshare, and will be sent once the connection "
+                        "returns.".format(len(queued)))
+            QMessageBox.information(self, "Update Confirmation", msg, QMessageBox.Ok)
         else:
-            msg_box = QMessageBox()
+            msg_box = QMessageBox(self)
             msg_box.setIcon(QMessageBox.Warning)
-            msg_box.setText("Error in update.")
-            detailed_msg = ""
-            for err in all_errors:
-                for arg in err.args:
-                    detailed_msg += arg + '\n'
-            msg_box.setDetailedText(detailed_msg)
-            msg_box.setStandardButtons(QMessageBox.Ok)
-            msg_box.show()
-
-    def update_single_article(self, article_id):
-        """
-        Updates a single figshare article
-        :param article_id:
+            msg_box.setWindowTitle("Update Errors")
+            msg_box.setText("{} of {} articles were not updated.".format(len(unsaved), len(updates)))
+            msg_box.setDetailedText('\n'.join(errors))
+            msg_box.setStandardButtons(QMessageBox.Retry | QMessageBox.Close)
+            if msg_box.exec_() == QMessageBox.Retry:
+                self.update_all_articles(unsaved)
+
+    def save_article(self, updates: dict, article_id: str):
+        """
+        Sends the update of a single article to Figshare. The update is queued in the offline mirror first, and left
+        there to be sent once the connection returns if Figshare cannot be reached. Called from the save thread pool,
+        so it must not modify any shared state.
+        :param updates: dict. Updates of the save job, keyed by article id
+        :param article_id: str. Figshare article id number
         :return:
         """
-        err_figshare = self.update_article_figshare_metadata(article_id)
+        mirror = self.parent.local_mirror
+        edit = mirror.queue_edit(ARTICLE_UPDATE, article_id, updates[article_id])
+        if not mirror.offline:
+            mirror.send_edit(edit, self.parent.mirror_sync.senders[ARTICLE_UPDATE])
 
-        if self.file_metadata is not None:
-            err_filespecific = self.update_article_file_metadata(article_id)
-
-        errors = []
-        if err_figshare is not None:
-            errors.append(err_figshare)
-        if self.file_metadata is not None and err_filespecific is not None:
-            errors.append(err_filespecific)
-
-        return errors
-
-    def update_article_figshare_metadata(self, article_id):
+    def read_figshare_metadata(self):
         """
-        Updates the figshare metadata of a single article
-        :param article_id:
-        :return:
+        Reads the edited Figshare metadata from the Figshare metadata tab
+        :return: dict.
         """
-        # Get the current/old figshare metadata
-        article = self.parent.figshare_articles[str(article_id)]
-        old_figshare_metadata = article.figshare_metadata
-
-        # Get the new/edited figshare metadata
         new_figshare_metadata = {}
         figshare_grid = self.figshare_tab.widget().layout()
 
@@ -547,98 +588,60 @@ class ArticleEditWindow(QMdiSubWindow):
         new_figshare_metadata['defined_type'] = defined_type
         # Funding
         fund_tags = figshare_grid.itemAtPosition(7, 1).widget().get_tags()
-        funding = ''
-        for tag in fund_tags:
-            funding += tag + ':_:'
-        new_figshare_metadata['funding'] = funding
+        new_figshare_metadata['funding'] = ''.join(tag + ':_:' for tag in fund_tags)
         # License
         license = figshare_grid.itemAtPosition(8, 1).widget().currentIndex()
         new_figshare_metadata['license'] = license
 
-        # Create an empty dictionary to add updates/edits
-        update_dict = {}
-
-        # Check for changes
-        for key, value in new_figshare_metadata.items():
-
-            if value != 'None' and value is not None and value != '':
-                if value != old_figshare_metadata[key]:
-                    update_dict[key] = value
-
-        try:
-            project = Projects(self.token)
-            proj_info = project.update_article(self.token, article_id, update_dict)
+        return new_figshare_metadata
 
-            # Update local version of article
-            article.update_info(update_dict)
-
-            # Change up_to_date
-            article.figshare_metadata['up_to_date'] = False
-
-            return None
-        except HTTPError as err:
-            return err
-        except TypeError as err:
-            return err
-        except ValueError as err:
-            return err
-
-    def update_article_file_metadata(self, article_id):
+    def read_file_metadata(self):
         """
-        Updates an articles custom fields metadata
-        :param article_id: int. Figshare article id number
-        :return:
+        Reads the edited file specific metadata from the file specific metadata tab
+        :return: dict.
         """
-        # Get the current/old file specific metadata
-        article = self.parent.figshare_articles[str(article_id)]
-        old_file_dicts = article.input_dicts()[2:]
-        old_file_metadata = {}
-        for d in old_file_dicts:
-            for key, value in d.items():
-                old_file_metadata[key] = value
-
-        # Get the new/edited figshare metadata
         new_file_metadata = {}
         file_grid = self.filespecific_tab.widget().layout()
 
-        # Get the number of rows in the grid layout
-        n_rows = file_grid.rowCount()
-
-        # Get the new file metadata
-        for row in range(n_rows):
+        # Get the new file metadata from each row of the grid layout
+        for row in range(file_grid.rowCount()):
             lbl = file_grid.itemAtPosition(row, 0).widget().text()
             edit = file_grid.itemAtPosition(row, 1).widget().text()
 
             new_file_metadata[lbl] = edit
 
+        return new_file_metadata
+
+    def article_update(self, article_id, figshare_values: dict, file_values: dict=None):
+        """
+        Creates the update dictionary of a single article from the edited metadata, holding only the values that differ
+        from those of the article. Custom field changes are given under the 'custom_fields' key.
+        :param article_id: int. Figshare article id number
+        :param figshare_values: dict. Edited Figshare metadata from read_figshare_metadata()
+        :param file_values: dict. Edited file specific metadata from read_file_metadata(), or None
+        :return: dict.
+        """
+        article = self.parent.figshare_articles[str(article_id)]
+        old_figshare_metadata = article.figshare_metadata
+
         # Check for changes
         update_dict = {}
-        for key, value in new_file_metadata.items():
-            if value != 'None' and value is not None:
-                if value != old_file_metadata[key]:
+        for key, value in figshare_values.items():
+            if value != 'None' and value is not None and value != '':
+                if value != old_figshare_metadata.get(key):
                     update_dict[key] = value
 
-        # Update local version of article
-        article.update_info(update_dict)
-
-        # Reformat update dictionary
-        update_dict = {'custom_fields': update_dict}
-
-        try:
-            project = Projects(self.token)
-            proj_info = project.update_article(self.token, article_id, update_dict)
-
-            # Update local version of article
-            article.update_info(update_dict)
-
-            # Change up_to_date
-            article.figshare_metadata['up_to_date'] = False
+        if file_values is not None:
+            old_file_metadata = {}
+            for d in article.input_dicts()[2:]:
+                old_file_metadata.update(d)
 
-            return None
-        except HTTPError as err:
-            return err
-        except TypeError as err:
-            return err
-        except ValueError as err:
-            return err
+            custom_fields = {}
+            for key, value in file_values.items():
+                if value != 'None' and value is not None:
+                    if value != old_file_metadata.get(key):
+                        custom_fields[key] = value
+            if custom_fields:
+                update_dict['custom_fields'] = custom_fields
 
+        return update_dict
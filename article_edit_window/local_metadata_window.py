@@ -9,9 +9,6 @@ from PyQt5.QtWidgets import (QMdiSubWindow, QScrollArea,
 # Figshare Desktop Imports
 from Figshare_desktop.article_edit_window.article_edit_window import ArticleEditWindow
 
-# Figshare API Imports
-from figshare_interface.http_requests.figshare_requests import issue_request
-
 __author__ = "Tobias Gill"
 __credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
 __license__ = ""
@@ -91,10 +88,7 @@ class LocalMetadataWindow(ArticleEditWindow):
                 self.file_metadata = file_dict
 
         # Metadata Dictionaries
-        allowed_cats = issue_request(method='GET', endpoint='categories', token=self.token)
-        self.cat_dict = {}
-        for cat in allowed_cats:
-            self.cat_dict[cat['id']] = cat['title']
+        self.cat_dict = self.parent.id_categories
 
         self.defined_type_dict = {'': 0, 'figure': 1, 'media': 2, 'dataset': 3, 'fileset': 4, 'poster': 5,
                                   'paper': 6,
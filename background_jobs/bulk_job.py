@@ -0,0 +1,187 @@
+"""
+Bulk Article Jobs
+
+Applies a single Figshare request, such as publishing or deleting, to each of a set of articles in a background
+thread. A bounded number of requests are in flight at once, and a progress dialog advances as each article completes.
+"""
+
+from PyQt5.QtWidgets import (QProgressDialog)
+from PyQt5.QtCore import (Qt, QThread, QObject, pyqtSignal, pyqtSlot)
+
+# Figshare Desktop Imports
+from Figshare_desktop.background_jobs.concurrency import map_as_completed
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+# Default number of article requests made concurrently
+DEFAULT_JOB_WORKERS = 4
+
+
+def error_message(article_id, err: Exception):
+    """
+    Describes a failed article request, including the body of any Figshare error response.
+
+    Args:
+        article_id: Figshare article ID number.
+        err: Exception raised by the request.
+
+    Returns:
+        msg (str)
+    """
+    msg = '{}: {}'.format(article_id, err)
+    response = getattr(err, 'response', None)
+    if response is not None:
+        msg += '\n' + str(response.content)
+    return msg
+
+
+class ArticleJobWorker(QObject):
+    """
+    Worker object that applies a function to each of a set of articles, to be moved to a QThread.
+    """
+
+    sig_step = pyqtSignal(str, bool)
+    sig_done = pyqtSignal(list, list)
+
+    def __init__(self, func, article_ids, max_workers: int=DEFAULT_JOB_WORKERS, backoff: bool=False):
+        """
+        Args:
+            func: Callable taking an article id and making the Figshare request for it. Failures are raised.
+            article_ids: Iterable of Figshare article ID numbers.
+            max_workers: Maximum number of concurrent requests.
+            backoff: If True a request that fails with a retryable error is repeated. Requests made through the
+                transport are already retried by it, so this is only for requests that are not, and must be False for
+                requests that may have taken effect despite failing, such as a publish that timed out.
+
+        Returns:
+            None
+        """
+        super().__init__()
+        self.__abort = False
+
+        self.func = func
+        self.article_ids = list(article_ids)
+        self.max_workers = max_workers
+        self.backoff = backoff
+
+    @pyqtSlot()
+    def work(self):
+        """
+        Makes the requests. Emits sig_step for each article as its request completes, and sig_done with the ids of the
+        articles that succeeded and the error messages of those that failed.
+        """
+        succeeded = []
+        errors = []
+        for article_id, result, err in map_as_completed(self.func, self.article_ids, max_workers=self.max_workers,
+                                                        abort=self.is_aborted, backoff=self.backoff):
+            if err is None:
+                succeeded.append(str(article_id))
+            else:
+                errors.append(error_message(article_id, err))
+            self.sig_step.emit(str(article_id), err is None)
+
+        self.sig_done.emit(succeeded, errors)
+
+    @pyqtSlot()
+    def abort(self):
+        self.__abort = True
+
+    def is_aborted(self):
+        return self.__abort
+
+
+class ArticleJobManager(QObject):
+    """
+    Runs bulk article jobs in a background thread, showing their progress in a dialog owned by the given window.
+    """
+
+    sig_finished = pyqtSignal(list, list)
+
+    # Title of the progress dialog, and the words describing an article that succeeded or failed
+    title = 'Updating Articles'
+    succeeded_text = 'Updated'
+    failed_text = 'Failed to update'
+
+    # Whether failed requests are retried by the job. Figshare requests are retried by the transport, which only
+    # repeats those that are safe to repeat, so retrying them here as well would multiply the attempts
+    backoff = False
+
+    def __init__(self, func, parent, max_workers: int=DEFAULT_JOB_WORKERS):
+        """
+        Args:
+            func: Callable taking an article id and making the Figshare request for it. Failures are raised.
+            parent: Window from which the job is started.
+            max_workers: Maximum number of concurrent requests.
+
+        Returns:
+            None
+        """
+        super().__init__()
+
+        self.func = func
+        self.parent = parent
+        self.max_workers = max_workers
+
+        self.__threads = []
+        # Progress of each running job by its worker, as a dict of its dialog and article counts, so that jobs can run
+        # alongside each other
+        self.jobs = {}
+
+    def start(self, article_ids):
+        """
+        Starts the job for the given articles. sig_finished is emitted with the ids of the articles that succeeded and
+        any error messages once all requests have completed or the user has cancelled.
+
+        Args:
+            article_ids: Iterable of Figshare article ID numbers.
+
+        Returns:
+            None
+        """
+        worker = ArticleJobWorker(self.func, article_ids, max_workers=self.max_workers, backoff=self.backoff)
+        n_articles = len(worker.article_ids)
+
+        job_thread = QThread()
+        self.__threads.append((job_thread, worker))
+        worker.moveToThread(job_thread)
+
+        dialog = QProgressDialog(self.title, 'Cancel', 0, n_articles, self.parent)
+        dialog.setWindowTitle(self.title)
+        dialog.setWindowModality(Qt.NonModal)
+        dialog.setMinimumDuration(0)
+        dialog.setValue(0)
+        self.jobs[worker] = {'dialog': dialog, 'n_articles': n_articles, 'n_done': 0}
+
+        dialog.canceled.connect(worker.abort, Qt.DirectConnection)
+        worker.sig_step.connect(self.update_progress)
+        worker.sig_done.connect(self.job_finished)
+        worker.sig_done.connect(job_thread.quit)
+
+        job_thread.started.connect(worker.work)
+        job_thread.start()
+
+    def update_progress(self, article_id: str, succeeded: bool):
+        """
+        Advances the progress dialog of a job as each of its articles completes.
+        """
+        job = self.jobs[self.sender()]
+        job['n_done'] += 1
+        job['dialog'].setValue(job['n_done'])
+        status = self.succeeded_text if succeeded else self.failed_text
+        job['dialog'].setLabelText('{} article {} ({} of {})'.format(status, article_id, job['n_done'],
+                                                                     job['n_articles']))
+
+    def job_finished(self, succeeded: list, errors: list):
+        """
+        Closes the progress dialog of a finished job and passes on the outcome of its requests.
+        """
+        dialog = self.jobs.pop(self.sender())['dialog']
+        dialog.reset()
+        dialog.close()
+        self.sig_finished.emit(succeeded, errors)
@@ -0,0 +1,180 @@
+"""
+Concurrency Helpers
+
+Shared helpers for running blocking Figshare API calls concurrently from a worker thread. Calls are made from a bounded
+thread pool, results are handed back in the order in which they complete, and requests that Figshare rejects because of
+rate limiting or a transient server error are retried with an exponential backoff.
+"""
+
+import os
+import time
+import random
+import multiprocessing
+from concurrent.futures import (ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait)
+
+from requests import (HTTPError, ConnectionError as RequestsConnectionError, Timeout)
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+# Default number of concurrent requests made to Figshare
+DEFAULT_MAX_WORKERS = 8
+
+# Default number of worker processes for CPU bound work such as parsing data files
+DEFAULT_MAX_PROCESSES = os.cpu_count() or 1
+
+# HTTP status codes that indicate a request may succeed if retried later
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def is_retryable(err: Exception):
+    """
+    Determines if an exception raised by a Figshare API call is worth retrying.
+
+    Args:
+        err: Exception raised by the API call.
+
+    Returns:
+        bool: True for rate limiting, transient server errors, and dropped connections.
+    """
+    if isinstance(err, HTTPError):
+        response = err.response
+        return response is not None and response.status_code in RETRY_STATUS_CODES
+    return isinstance(err, (RequestsConnectionError, Timeout, ConnectionError, TimeoutError))
+
+
+def retry_after(err: Exception):
+    """
+    Returns the delay in seconds requested by a Retry-After response header, if one was given.
+
+    Args:
+        err: Exception raised by the API call.
+
+    Returns:
+        delay (float or None)
+    """
+    response = getattr(err, 'response', None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+def call_with_backoff(func, *args, retries: int=5, base_delay: float=1., max_delay: float=30., **kwargs):
+    """
+    Calls a function, retrying with a jittered exponential backoff when it fails with a retryable error.
+
+    Args:
+        func: Callable making one or more Figshare API requests.
+        args: Positional arguments passed to func.
+        retries: Maximum number of retries before the last error is raised.
+        base_delay: Delay in seconds before the first retry. Doubled for each subsequent retry.
+        max_delay: Upper limit of the delay between retries.
+        kwargs: Keyword arguments passed to func.
+
+    Returns:
+        The return value of func.
+
+    Raises:
+        The last exception raised by func if it is not retryable or the retries are exhausted.
+    """
+    attempt = 0
+    while True:
+        try:
+            return func(*args, **kwargs)
+        except Exception as err:
+            if attempt >= retries or not is_retryable(err):
+                raise
+            delay = retry_after(err)
+            if delay is None:
+                delay = min(max_delay, base_delay * 2 ** attempt)
+                # Full jitter stops a pool of workers that were throttled together from retrying in lockstep
+                delay = random.uniform(0, delay)
+            time.sleep(delay)
+            attempt += 1
+
+
+def process_pool(max_workers: int=DEFAULT_MAX_PROCESSES):
+    """
+    Creates a process pool for CPU bound work.
+
+    Worker processes are spawned rather than forked, as forking a process running Qt and other threads can copy locks
+    that are held by those threads into the child.
+
+    Args:
+        max_workers: Number of worker processes.
+
+    Returns:
+        ProcessPoolExecutor
+    """
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def map_as_completed(func, items, max_workers: int=DEFAULT_MAX_WORKERS, abort=None, backoff: bool=True,
+                     processes: bool=False):
+    """
+    Applies a function to each item using a bounded worker pool and yields the outcomes as each call completes.
+
+    No more than max_workers calls are in flight at once, so an abort takes effect after the running calls finish
+    rather than after the whole list has been submitted.
+
+    Args:
+        func: Callable taking a single item.
+        items: Iterable of items to process.
+        max_workers: Maximum number of concurrent calls.
+        abort: Optional callable returning True when no further items should be started.
+        backoff: If True each call is wrapped with call_with_backoff.
+        processes: If True calls are made in a pool of worker processes instead of threads. func, the items, and the
+            results must then be picklable.
+
+    Returns:
+        Generator of (item, result, error) tuples in completion order. Exactly one of result or error is meaningful;
+        error is None for successful calls.
+    """
+    items = iter(items)
+    max_workers = max(1, int(max_workers))
+
+    if processes:
+        executor = process_pool(max_workers)
+    else:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    with executor:
+        in_flight = {}
+
+        def submit_next():
+            if abort is not None and abort():
+                return False
+            try:
+                item = next(items)
+            except StopIteration:
+                return False
+            if backoff:
+                future = executor.submit(call_with_backoff, func, item)
+            else:
+                future = executor.submit(func, item)
+            in_flight[future] = item
+            return True
+
+        # Fill the pool
+        while len(in_flight) < max_workers and submit_next():
+            pass
+
+        while in_flight:
+            done, pending = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = in_flight.pop(future)
+                err = future.exception()
+                if err is None:
+                    yield item, future.result(), None
+                else:
+                    yield item, None, err
+                # Replace each finished call with the next item
+                submit_next()
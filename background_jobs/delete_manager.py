@@ -0,0 +1,71 @@
+"""
+Delete Manager
+
+Deletes Figshare articles in a background thread, with a bounded number of delete requests in flight at once. Errors
+are gathered for all articles and reported together once every request has completed.
+"""
+
+# Figshare Desktop Imports
+from Figshare_desktop.background_jobs.bulk_job import (DEFAULT_JOB_WORKERS, ArticleJobManager)
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+# Default number of articles deleted concurrently
+DEFAULT_DELETE_WORKERS = DEFAULT_JOB_WORKERS
+
+
+class DeleteError(Exception):
+    """
+    Raised when Figshare reports that an article could not be deleted.
+    """
+    pass
+
+
+class DeleteManager(ArticleJobManager):
+    """
+    Runs article deletion in a background thread, showing its progress in a dialog owned by the given window.
+    sig_finished is emitted with the ids of the deleted articles and the error messages of any that failed.
+    """
+
+    title = 'Deleting Articles'
+    succeeded_text = 'Deleted'
+    failed_text = 'Failed to delete'
+
+    def __init__(self, delete, parent, max_workers: int=DEFAULT_DELETE_WORKERS):
+        """
+        Args:
+            delete: Callable taking an article id and deleting the article from Figshare. It may return an error
+                message or exception rather than raising one, as the Figshare interface delete functions do.
+            parent: Window from which articles are deleted.
+            max_workers: Maximum number of concurrent delete requests.
+
+        Returns:
+            None
+        """
+        super().__init__(self.delete_article, parent, max_workers)
+        self.delete = delete
+
+    def delete_article(self, article_id):
+        """
+        Deletes a single article. Called from the worker thread pool.
+
+        Args:
+            article_id: Figshare article ID number.
+
+        Returns:
+            None
+
+        Raises:
+            DeleteError: If the delete function returned an error message.
+        """
+        err = self.delete(article_id)
+        if isinstance(err, Exception):
+            raise err
+        if err:
+            raise DeleteError(err)
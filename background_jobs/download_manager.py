@@ -0,0 +1,348 @@
+"""
+Download Manager
+
+Downloads the files of Figshare articles in a background thread. File lists are retrieved concurrently, and files are
+then streamed to disk from a bounded pool of concurrent downloads. The files of each article are kept in a
+sub-directory named by the article id, so that files of the same name in different articles do not overwrite each
+other. Each file is first written to a .part file next to its destination, so that an interrupted download is continued
+with an HTTP range request rather than started again. Files that already exist locally with the size and MD5 reported
+by Figshare are skipped.
+"""
+
+import os
+import time
+
+from PyQt5.QtWidgets import (QProgressDialog, QMessageBox)
+from PyQt5.QtCore import (Qt, QThread, QObject, pyqtSignal, pyqtSlot)
+
+# Figshare Desktop Imports
+from Figshare_desktop.background_jobs.concurrency import (DEFAULT_MAX_WORKERS, map_as_completed)
+from Figshare_desktop.data_window.chunked_upload import file_md5
+from Figshare_desktop.network.transport import default_transport
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+# Default number of files downloaded concurrently
+DEFAULT_DOWNLOAD_WORKERS = 4
+
+# Size in bytes of each block streamed to disk
+CHUNK_SIZE = 256 * 1024
+
+# Minimum time in seconds between progress signals for a single file
+PROGRESS_INTERVAL = 0.1
+
+# Suffix of partially downloaded files
+PART_SUFFIX = '.part'
+
+
+class DownloadAborted(Exception):
+    """
+    Raised from within a download when the user has cancelled the downloads.
+    """
+    pass
+
+
+def is_local_copy(file_info: dict, local_path: str):
+    """
+    Determines if a local file is already a complete copy of a Figshare file.
+
+    Args:
+        file_info: Figshare file dictionary, as returned by list_files.
+        local_path: Path to the local file.
+
+    Returns:
+        bool: True if the file exists with the size, and MD5 where Figshare gives one, of the Figshare file.
+    """
+    if not os.path.isfile(local_path):
+        return False
+    size = file_info.get('size')
+    if size is not None and os.path.getsize(local_path) != size:
+        return False
+    md5 = file_info.get('computed_md5')
+    if md5:
+        return file_md5(local_path) == md5
+    # Without an MD5 a matching size is the best check available
+    return size is not None
+
+
+def download_file(url: str, local_path: str, OAuth_token: str, expected_size: int=None, progress=None, abort=None,
+                  chunk_size: int=CHUNK_SIZE, timeout: float=60.):
+    """
+    Streams a file to disk, continuing from any partial download left by an earlier attempt.
+
+    Args:
+        url: Figshare download url of the file.
+        local_path: Destination path of the file.
+        OAuth_token: Authentication token generated from Figshare login.
+        expected_size: Size in bytes Figshare reports for the file, used to check the download is complete.
+        progress: Optional callable taking (bytes written, total bytes) called as each block is written.
+        abort: Optional callable returning True if the download should stop. The partial file is kept.
+        chunk_size: Size in bytes of each block read from the response.
+        timeout: Timeout in seconds of the connection and of each read.
+
+    Returns:
+        size (int): Size in bytes of the downloaded file.
+
+    Raises:
+        HTTPError: If Figshare returns an error status.
+        DownloadAborted: If abort returned True.
+        IOError: If the downloaded file does not have the expected size.
+    """
+    part_path = local_path + PART_SUFFIX
+    offset = os.path.getsize(part_path) if os.path.isfile(part_path) else 0
+    if expected_size is not None and offset > expected_size:
+        # The partial file cannot belong to the remote file, so start again
+        offset = 0
+
+    headers = {'Authorization': 'token {}'.format(OAuth_token)}
+    # If the previous attempt received everything but was stopped before the file was moved into place there is
+    # nothing left to request
+    if not (offset and offset == expected_size):
+        if offset:
+            headers['Range'] = 'bytes={}-'.format(offset)
+
+        with default_transport().get(url, headers=headers, stream=True, timeout=timeout) as response:
+            if response.status_code == 416:
+                # The partial file is not a prefix of the remote file, so start again
+                os.remove(part_path)
+                return download_file(url, local_path, OAuth_token, expected_size, progress, abort, chunk_size,
+                                     timeout)
+            response.raise_for_status()
+
+            # Servers that ignore the range header send the whole file
+            if response.status_code != 206:
+                offset = 0
+            total = expected_size
+            if total is None and 'Content-Length' in response.headers:
+                total = offset + int(response.headers['Content-Length'])
+
+            received = 0
+            with open(part_path, 'ab' if offset else 'wb') as f:
+                for block in response.iter_content(chunk_size=chunk_size):
+                    if abort is not None and abort():
+                        raise DownloadAborted(local_path)
+                    f.write(block)
+                    received += len(block)
+                    if progress is not None:
+                        progress(offset + received, total)
+        offset += received
+
+    if expected_size is not None and offset != expected_size:
+        raise IOError('Downloaded {} bytes of {} expected for {}'.format(offset, expected_size,
+                                                                       os.path.basename(local_path)))
+
+    os.replace(part_path, local_path)
+    return offset
+
+
+class DownloadWorker(QObject):
+    """
+    Worker object that retrieves the file lists of articles and downloads their files, to be moved to a QThread.
+    """
+
+    sig_file_progress = pyqtSignal(str, int, int)
+    sig_progress = pyqtSignal(float)
+    sig_file_done = pyqtSignal(str, bool)
+    sig_done = pyqtSignal(list, list)
+
+    def __init__(self, OAuth_token: str, list_files, article_ids, download_dir: str,
+                 max_workers: int=DEFAULT_DOWNLOAD_WORKERS, skip_ext: tuple=('.png',)):
+        """
+        Args:
+            OAuth_token: Authentication token generated from Figshare login.
+            list_files: Callable taking an article id and returning a list of Figshare file dictionaries.
+            article_ids: Iterable of Figshare article ID numbers.
+            download_dir: Directory to download the files into, in a sub-directory per article.
+            max_workers: Maximum number of concurrent downloads.
+            skip_ext: File extensions that are not downloaded. Thumbnail images are skipped by default.
+
+        Returns:
+            None
+        """
+        super().__init__()
+        self.__abort = False
+
+        self.token = OAuth_token
+        self.list_files = list_files
+        self.article_ids = list(article_ids)
+        self.download_dir = download_dir
+        self.max_workers = max_workers
+        self.skip_ext = skip_ext
+
+        # Aggregate progress
+        self.total_bytes = 0
+        self.file_bytes = {}
+
+    @pyqtSlot()
+    def work(self):
+        """
+        Lists and downloads the article files. Emits sig_done with the names, relative to the download directory, of
+        the files that failed to download and those that were skipped as they already exist locally.
+        """
+        errors = []
+        skipped = []
+
+        # Retrieve the file lists concurrently. Here, and for the downloads, failed requests are retried by the
+        # transport, and an interrupted download is continued when it is next started
+        downloads = []
+        for article_id, file_list, err in map_as_completed(self.list_files, self.article_ids,
+                                                           max_workers=DEFAULT_MAX_WORKERS, abort=self.is_aborted,
+                                                           backoff=False):
+            if err is not None:
+                errors.append('Article {}'.format(article_id))
+                continue
+            for f in file_list:
+                if os.path.splitext(f['name'])[1].lower() in self.skip_ext:
+                    continue
+                name = os.path.join(str(article_id), f['name'])
+                local_path = os.path.abspath(os.path.join(self.download_dir, name))
+                if is_local_copy(f, local_path):
+                    skipped.append(name)
+                    continue
+                downloads.append((f, local_path))
+                self.total_bytes += f.get('size') or 0
+
+        for (f, local_path), result, err in map_as_completed(self.download, downloads, max_workers=self.max_workers,
+                                                             abort=self.is_aborted, backoff=False):
+            name = os.path.relpath(local_path, self.download_dir)
+            if err is None:
+                self.sig_file_done.emit(name, True)
+            elif not isinstance(err, DownloadAborted):
+                errors.append(name)
+                self.sig_file_done.emit(name, False)
+
+        self.sig_done.emit(errors, skipped)
+
+    def download(self, download: tuple):
+        """
+        Downloads a single file. Called from the download thread pool.
+
+        Args:
+            download: Tuple of (Figshare file dictionary, local path).
+
+        Returns:
+            size (int)
+        """
+        f, local_path = download
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        last_emit = [0.]
+
+        def progress(n_bytes, total):
+            self.file_bytes[f['id']] = n_bytes
+            now = time.time()
+            if now - last_emit[0] >= PROGRESS_INTERVAL or n_bytes == total:
+                last_emit[0] = now
+                self.sig_file_progress.emit(f['name'], n_bytes, total or 0)
+                if self.total_bytes:
+                    self.sig_progress.emit(sum(list(self.file_bytes.values())) / self.total_bytes)
+
+        return download_file(f['download_url'], local_path, self.token, expected_size=f.get('size'),
+                             progress=progress, abort=self.is_aborted)
+
+    @pyqtSlot()
+    def abort(self):
+        self.__abort = True
+
+    def is_aborted(self):
+        return self.__abort
+
+
+class DownloadManager(QObject):
+    """
+    Runs article file downloads in a background thread, showing their progress in a dialog owned by the given window.
+    """
+
+    def __init__(self, OAuth_token: str, list_files, parent, max_workers: int=DEFAULT_DOWNLOAD_WORKERS):
+        """
+        Args:
+            OAuth_token: Authentication token generated from Figshare login.
+            list_files: Callable taking an article id and returning a list of Figshare file dictionaries.
+            parent: Window from which downloads are started.
+            max_workers: Maximum number of concurrent downloads.
+
+        Returns:
+            None
+        """
+        super().__init__()
+
+        self.token = OAuth_token
+        self.list_files = list_files
+        self.parent = parent
+        self.max_workers = max_workers
+
+        self.__threads = []
+        # Progress dialog of each running download worker, so that downloads can run alongside each other
+        self.dialogs = {}
+
+    def start(self, article_ids, download_dir: str):
+        """
+        Starts downloading the files of the given articles.
+
+        Args:
+            article_ids: Iterable of Figshare article ID numbers.
+            download_dir: Directory to download the files into, in a sub-directory per article.
+
+        Returns:
+            None
+        """
+        worker = DownloadWorker(self.token, self.list_files, article_ids, download_dir, max_workers=self.max_workers)
+
+        download_thread = QThread()
+        self.__threads.append((download_thread, worker))
+        worker.moveToThread(download_thread)
+
+        # Progress is shown per mille so that large downloads do not overflow the dialog range
+        dialog = QProgressDialog('Retrieving file lists', 'Cancel', 0, 1000, self.parent)
+        dialog.setWindowTitle('Downloading Articles')
+        dialog.setWindowModality(Qt.NonModal)
+        dialog.setMinimumDuration(0)
+        dialog.setValue(0)
+        self.dialogs[worker] = dialog
+
+        dialog.canceled.connect(worker.abort, Qt.DirectConnection)
+        worker.sig_progress.connect(lambda fraction: dialog.setValue(int(fraction * 1000)))
+        worker.sig_file_progress.connect(self.update_label)
+        worker.sig_done.connect(self.downloads_finished)
+        worker.sig_done.connect(download_thread.quit)
+
+        download_thread.started.connect(worker.work)
+        download_thread.start()
+
+    def update_label(self, file_name: str, n_bytes: int, total: int):
+        """
+        Shows the progress of the most recently updated file in the dialog of the worker downloading it.
+        """
+        dialog = self.dialogs[self.sender()]
+        if total:
+            dialog.setLabelText('{}: {:.1f} of {:.1f} MB'.format(file_name, n_bytes / 1e6, total / 1e6))
+        else:
+            dialog.setLabelText('{}: {:.1f} MB'.format(file_name, n_bytes / 1e6))
+
+    def downloads_finished(self, errors: list, skipped: list):
+        """
+        Closes the progress dialog of the finished worker and reports the outcome of its downloads.
+        """
+        dialog = self.dialogs.pop(self.sender())
+        aborted = dialog.wasCanceled()
+        dialog.reset()
+        dialog.close()
+
+        if errors:
+            msg = 'There was an error in downloading the following files.\n'
+            for f in errors:
+                msg += f + '\n'
+            QMessageBox.warning(self.parent, "Download Error", msg, QMessageBox.Ok)
+        elif aborted:
+            msg = 'Downloads cancelled. Partially downloaded files will be continued when downloaded again.'
+            QMessageBox.information(self.parent, 'Download Cancelled', msg, QMessageBox.Ok)
+        else:
+            msg = "All files downloaded"
+            if skipped:
+                msg += '\n{} files already existed locally and were skipped.'.format(len(skipped))
+            QMessageBox.information(self.parent, 'Download Confirmation', msg, QMessageBox.Ok)
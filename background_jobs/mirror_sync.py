@@ -0,0 +1,277 @@
+"""
+Mirror Sync
+
+Keeps the offline mirror up to date in background threads. Windows are given the mirrored copy of what they show
+straight away, and the copy is then refreshed from Figshare, with the window told if it has changed. Edits queued while
+Figshare could not be reached are sent once it can be again.
+"""
+
+from functools import partial
+
+from PyQt5.QtCore import (QThread, QObject, QTimer, pyqtSignal, pyqtSlot)
+
+# Figshare API Imports
+from figshare_interface import Projects
+
+# Figshare Desktop Imports
+from Figshare_desktop.background_jobs.concurrency import (map_as_completed, DEFAULT_MAX_WORKERS)
+from Figshare_desktop.background_jobs.bulk_job import error_message
+from Figshare_desktop.local_store.offline_mirror import (ARTICLE_UPDATE, is_offline_error)
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+# Milliseconds between attempts to send queued edits
+SEND_INTERVAL = 30000
+
+
+def edit_senders(OAuth_token: str):
+    """
+    Returns the functions that send each kind of queued edit to Figshare.
+
+    Args:
+        OAuth_token: Authentication token generated from Figshare login.
+
+    Returns:
+        senders (dict): Callables taking an object id and update dictionary, keyed by kind of edit.
+    """
+    projects = Projects(OAuth_token)
+    return {ARTICLE_UPDATE: partial(projects.update_article, OAuth_token)}
+
+
+class SyncWorker(QObject):
+    """
+    Worker object that refreshes mirrored listings and records from Figshare, to be moved to a QThread.
+    """
+
+    sig_changed = pyqtSignal(str, object)
+    sig_done = pyqtSignal()
+
+    def __init__(self, mirror, fetches: dict, max_workers: int=DEFAULT_MAX_WORKERS):
+        """
+        Args:
+            mirror: LocalMirror to refresh.
+            fetches: Callables taking no arguments and returning the value from Figshare, keyed by mirror key.
+            max_workers: Maximum number of concurrent requests.
+
+        Returns:
+            None
+        """
+        super().__init__()
+        self.mirror = mirror
+        self.fetches = fetches
+        self.max_workers = max_workers
+
+    @pyqtSlot()
+    def work(self):
+        """
+        Fetches each key and stores it in the mirror. Emits sig_changed with the key and new value of each that differs
+        from its mirrored copy. Keys that cannot be fetched keep their mirrored copy.
+        """
+        reached = False
+        unreachable = False
+        # Requests are already retried by the transport, and an unreachable Figshare should be reported straight away
+        for key, value, err in map_as_completed(lambda key: self.fetches[key](), list(self.fetches),
+                                                max_workers=self.max_workers, backoff=False):
+            if err is not None:
+                unreachable = unreachable or is_offline_error(err)
+                continue
+            reached = True
+            if self.mirror.store(key, value):
+                self.sig_changed.emit(key, value)
+
+        if reached:
+            self.mirror.offline = False
+        elif unreachable:
+            self.mirror.offline = True
+        self.sig_done.emit()
+
+
+class SendWorker(QObject):
+    """
+    Worker object that sends the queued edits to Figshare in the order they were made, to be moved to a QThread.
+    """
+
+    sig_done = pyqtSignal(list, list)
+
+    def __init__(self, mirror, senders: dict):
+        """
+        Args:
+            mirror: LocalMirror holding the queue.
+            senders: Callables taking an object id and update dictionary, keyed by kind of edit.
+
+        Returns:
+            None
+        """
+        super().__init__()
+        self.mirror = mirror
+        self.senders = senders
+
+    @pyqtSlot()
+    def work(self):
+        """
+        Sends each queued edit, stopping at the first that cannot reach Figshare. Emits sig_done with the ids of the
+        objects whose edits were sent and the error messages of any edits Figshare refused.
+        """
+        sent = []
+        errors = []
+        for edit in self.mirror.pending_edits():
+            send = self.senders.get(edit['kind'])
+            if send is None:
+                continue
+            try:
+                if not self.mirror.send_edit(edit, send):
+                    if self.mirror.offline:
+                        break
+                    # The edit is being sent by the window that made it
+                    continue
+                sent.append(edit['object_id'])
+            except Exception as err:
+                errors.append(error_message(edit['object_id'], err))
+        self.sig_done.emit(sent, errors)
+
+
+class MirrorSync(QObject):
+    """
+    Runs mirror refreshes and sends of queued edits in background threads.
+
+    sig_online_changed is emitted with False when Figshare can no longer be reached and True when it can again.
+    sig_edits_sent is emitted with the ids of the objects whose queued edits were sent and the error messages of any
+    that Figshare refused.
+    """
+
+    sig_online_changed = pyqtSignal(bool)
+    sig_edits_sent = pyqtSignal(list, list)
+
+    def __init__(self, mirror, senders: dict, max_workers: int=DEFAULT_MAX_WORKERS):
+        """
+        Args:
+            mirror: LocalMirror to keep up to date.
+            senders: Callables sending each kind of queued edit, as returned by edit_senders().
+            max_workers: Maximum number of concurrent requests of each refresh.
+
+        Returns:
+            None
+        """
+        super().__init__()
+
+        self.mirror = mirror
+        self.senders = senders
+        self.max_workers = max_workers
+
+        self.online = not mirror.offline
+        self.sending = False
+
+        self.__threads = []
+
+        # Queued edits are retried periodically, as nothing else tells us when the connection returns
+        self.send_timer = QTimer(self)
+        self.send_timer.setInterval(SEND_INTERVAL)
+        self.send_timer.timeout.connect(self.send_edits)
+        self.send_timer.start()
+
+    def start_worker(self, worker, done_signal):
+        """
+        Runs a worker in a new thread, discarding the threads of workers that have finished.
+        """
+        self.__threads = [(thread, w) for thread, w in self.__threads if thread.isRunning()]
+
+        thread = QThread()
+        self.__threads.append((thread, worker))
+        worker.moveToThread(thread)
+
+        done_signal.connect(thread.quit)
+        thread.started.connect(worker.work)
+        thread.start()
+
+    def check_online(self):
+        """
+        Emits sig_online_changed if Figshare has become reachable, or unreachable, since last checked. Queued edits are
+        sent as soon as it is reachable again.
+        """
+        online = not self.mirror.offline
+        if online != self.online:
+            self.online = online
+            self.sig_online_changed.emit(online)
+            if online:
+                self.send_edits()
+
+    #####
+    # Sync Functions
+    #####
+
+    def load(self, key: str, fetch, on_changed=None, default=None):
+        """
+        Returns the mirrored copy of a listing or record, and refreshes it from Figshare in the background. A key that
+        has never been mirrored is fetched straight away instead.
+
+        Args:
+            key: Mirror key.
+            fetch: Callable taking no arguments and returning the value from Figshare.
+            on_changed: Optional callable taking the key and new value, called if the refreshed value differs.
+            default: Value returned if the key has not been mirrored and Figshare cannot be reached.
+
+        Returns:
+            value
+        """
+        value = self.mirror.get(key)
+        if value is None:
+            value = self.mirror.read(key, fetch, default)
+            self.check_online()
+        else:
+            self.sync({key: fetch}, on_changed)
+        return value
+
+    def sync(self, fetches: dict, on_changed=None):
+        """
+        Refreshes mirrored listings and records from Figshare in a background thread.
+
+        Args:
+            fetches: Callables taking no arguments and returning the value from Figshare, keyed by mirror key.
+            on_changed: Optional callable taking a key and its new value, called for each value that has changed.
+
+        Returns:
+            None
+        """
+        worker = SyncWorker(self.mirror, fetches, max_workers=self.max_workers)
+        if on_changed is not None:
+            worker.sig_changed.connect(on_changed)
+        worker.sig_done.connect(self.check_online)
+        self.start_worker(worker, worker.sig_done)
+
+    def prefetch(self, fetches: dict):
+        """
+        Mirrors in the background any of the given keys that have never been mirrored, so that they can be opened
+        offline later.
+
+        Args:
+            fetches: Callables taking no arguments and returning the value from Figshare, keyed by mirror key.
+
+        Returns:
+            None
+        """
+        missing = self.mirror.missing(fetches)
+        if missing:
+            self.sync({key: fetch for key, fetch in fetches.items() if key in missing})
+
+    def send_edits(self):
+        """
+        Sends any queued edits in a background thread.
+        """
+        if self.sending or not self.mirror.pending_count():
+            return
+        self.sending = True
+        worker = SendWorker(self.mirror, self.senders)
+        worker.sig_done.connect(self.edits_sent)
+        self.start_worker(worker, worker.sig_done)
+
+    def edits_sent(self, sent: list, errors: list):
+        self.sending = False
+        self.check_online()
+        if sent or errors:
+            self.sig_edits_sent.emit(sent, errors)
@@ -0,0 +1,65 @@
+"""
+Publish Manager
+
+Publishes Figshare articles in a background thread, with a bounded number of publish requests in flight at once. Each
+article is only published; the local article is then marked as public from the outcome of its request rather than being
+rebuilt from Figshare, so publishing a large selection does not trigger a further set of metadata requests per article.
+"""
+
+# Figshare Desktop Imports
+from Figshare_desktop.background_jobs.bulk_job import (DEFAULT_JOB_WORKERS, ArticleJobManager)
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+# Default number of articles published concurrently
+DEFAULT_PUBLISH_WORKERS = DEFAULT_JOB_WORKERS
+
+
+def mark_published(article):
+    """
+    Updates a local article to match the public version created by publishing it. The new public version is a copy of
+    the current private version, so the article is up to date.
+
+    Args:
+        article: Figshare Desktop Article object.
+
+    Returns:
+        None
+    """
+    article.figshare_metadata['status'] = 'public'
+    article.figshare_desktop_metadata['public_modified_date'] = article.figshare_metadata['modified_date']
+    article.check_uptodate()
+
+
+class PublishManager(ArticleJobManager):
+    """
+    Runs article publishing in a background thread, showing its progress in a dialog owned by the given window.
+    sig_finished is emitted with the ids of the published articles and the error messages of any that failed.
+    """
+
+    title = 'Publishing Articles'
+    succeeded_text = 'Published'
+    failed_text = 'Failed to publish'
+
+    # A publish that failed with a server error or dropped connection may still have created the public version, so
+    # repeating it could publish a second version. It must not be retried by the job, as the transport only retries it
+    # when rate limited
+    backoff = False
+
+    def __init__(self, publish, parent, max_workers: int=DEFAULT_PUBLISH_WORKERS):
+        """
+        Args:
+            publish: Callable taking an article id and publishing the article on Figshare.
+            parent: Window from which articles are published.
+            max_workers: Maximum number of concurrent publish requests.
+
+        Returns:
+            None
+        """
+        super().__init__(publish, parent, max_workers)
@@ -0,0 +1,66 @@
+"""
+Save Manager
+
+Saves edited article metadata to Figshare in a background thread, with a bounded number of update requests in flight
+at once. Each article is saved with a single request holding both its Figshare fields and its custom fields.
+"""
+
+# Figshare Desktop Imports
+from Figshare_desktop.background_jobs.bulk_job import (DEFAULT_JOB_WORKERS, ArticleJobManager)
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+# Default number of articles saved concurrently
+DEFAULT_SAVE_WORKERS = DEFAULT_JOB_WORKERS
+
+
+def apply_update(article, update_dict: dict):
+    """
+    Applies a saved metadata update to the local version of an article, without fetching the article again. Values are
+    normalised by the article as when it was loaded, so that category and license names become ids and the next edit
+    is compared against the same form.
+
+    Args:
+        article: Figshare Desktop Article object.
+        update_dict: Update sent to Figshare. Custom fields are given under the 'custom_fields' key.
+
+    Returns:
+        None
+    """
+    values = {key: value for key, value in update_dict.items() if key != 'custom_fields'}
+    values.update(update_dict.get('custom_fields', {}))
+
+    article.update_info(values, fetch_public=False)
+
+    # The public version of a published article no longer matches the private version
+    if article.figshare_metadata['status'] == 'public':
+        article.figshare_metadata['up_to_date'] = False
+
+
+class SaveManager(ArticleJobManager):
+    """
+    Runs article metadata saves in a background thread, showing their progress in a dialog owned by the given window.
+    sig_finished is emitted with the ids of the saved articles and the error messages of any that failed.
+    """
+
+    title = 'Saving Articles'
+    succeeded_text = 'Saved'
+    failed_text = 'Failed to save'
+
+    def __init__(self, save, parent, max_workers: int=DEFAULT_SAVE_WORKERS):
+        """
+        Args:
+            save: Callable taking an article id and saving the article's update to Figshare.
+            parent: Window from which the articles are saved.
+            max_workers: Maximum number of concurrent update requests.
+
+        Returns:
+            None
+        """
+        super().__init__(save, parent, max_workers)
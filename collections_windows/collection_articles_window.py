@@ -12,7 +12,7 @@ Todo:
 
 # Standard Imports
 import os
-from requests import HTTPError
+from functools import partial
 
 # PyQt Imports
 from PyQt5.QtWidgets import (QWidget, QApplication, QPushButton, QMainWindow, QMessageBox, QFileDialog, QMdiSubWindow,
@@ -24,12 +24,14 @@ from PyQt5.QtCore import (Qt)
 from Figshare_desktop.custom_widgets.collection_article_list import ArticleList
 from Figshare_desktop.formatting.formatting import (press_button)
 from Figshare_desktop.article_edit_window.article_edit_window import ArticleEditWindow
-from Figshare_desktop.figshare_articles.determine_type import gen_article
-from Figshare_desktop.data_window.search_index import ArticleIndex
+from Figshare_desktop.data_window.search_index import (ArticleIndex, account_index_dir)
+from Figshare_desktop.background_jobs.download_manager import DownloadManager
+from Figshare_desktop.background_jobs.publish_manager import (PublishManager, mark_published)
+from Figshare_desktop.background_jobs.delete_manager import DeleteManager
+from Figshare_desktop.local_store.offline_mirror import mirror_key
 
 # Figshare API Imports
 from figshare_interface import (Collections)
-from figshare_interface.http_requests.figshare_requests import (download_file)
 
 __author__ = "Tobias Gill"
 __credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
@@ -74,6 +76,9 @@ class CollectionsArticlesWindow(QMdiSubWindow):
 
         self.collection_id = collection_id
 
+        # Article files are downloaded in the background, with a progress dialog for each download started
+        self.download_manager = DownloadManager(self.token, Collections(self.token).list_files, self)
+
         self.initFig(self.collection_id)
         self.initIndex()
         self.initUI()
@@ -89,8 +94,12 @@ class CollectionsArticlesWindow(QMdiSubWindow):
             None
         """
         collections = Collections(self.token)
-        self.collection_info = collections.get_info(collection_id)
-        self.article_list = collections.get_articles(collection_id)
+        # Read from the offline mirror. The article listing is refreshed in the background by the article list.
+        mirror = self.parent.local_mirror
+        info_key = mirror_key('collection', collection_id)
+        self.collection_info = mirror.read(info_key, partial(collections.get_info, collection_id))
+        articles_key = mirror_key('collection_articles', collection_id)
+        self.article_list = mirror.read(articles_key, partial(collections.get_articles, collection_id), default=[])
 
     def initIndex(self):
         """
@@ -102,7 +111,8 @@ class CollectionsArticlesWindow(QMdiSubWindow):
         if self.parent.figshare_article_index is None:
 
             # Create the Figshare article index
-            self.parent.figshare_article_index = ArticleIndex()
+            # The index is kept between sessions, with one per Figshare account
+            self.parent.figshare_article_index = ArticleIndex(account_index_dir(self.token))
 
             # Create the default Figshare metadata schema dictionary
             self.parent.figshare_article_index.create_schema('figshare_articles')
@@ -118,6 +128,8 @@ class CollectionsArticlesWindow(QMdiSubWindow):
             self.parent.figshare_article_index.add_ID('figshare_articles', 'defined_type')
             self.parent.figshare_article_index.add_TEXT('figshare_articles', 'funding')
             self.parent.figshare_article_index.add_ID('figshare_articles', 'license')
+            # Stored so that documents can be brought up to date with the articles on Figshare
+            self.parent.figshare_article_index.add_ID('figshare_articles', 'modified_date', stored=True)
 
             self.parent.figshare_article_index.document_types.add('article')
 
@@ -297,35 +309,42 @@ class CollectionsArticlesWindow(QMdiSubWindow):
             msg = "Are you sure you want to permanently DELETE {} articles?".format(n_articles)
             reply = QMessageBox.question(self, "Deletion Confirmation", msg, QMessageBox.Yes, QMessageBox.No)
 
-            # Upon a reply of Yes call the delete articles function
+            # Upon a reply of Yes delete the articles in the background
             if reply == QMessageBox.Yes:
-                all_errors = self.delete_multiple_articles(self.collection_id, article_ids)
-
-                # If any errors occured create a new dialog to notify the user
-                if all_errors != []:
-                    msg_box = QMessageBox()
-                    msg_box.setIcon(QMessageBox.Warning)
-                    msg_box.setWindowIcon(QIcon(os.path.normpath(__file__ + '/../../img/figshare_logo.png')))
-                    msg_box.setWindowTitle("Article Delete Errors")
-                    msg_box.setText("Error occurred while trying to delete articles.")
-                    detailed_msg = ""
-                    for err in all_errors:
-                        detailed_msg += err + '\n'
-                    msg_box.setDetailedText(detailed_msg)
-                    msg_box.setStandardButtons(QMessageBox.Ok)
-                    self.delete_msg_box = msg_box
-                    self.delete_msg_box.show()
-
-                    self.delete_msg_box.buttonClicked.connect(self.reopen_window)
-
-                # If no errors occured then create a new dialog to notify the user
-                else:
-                    msg = "All articles deleted"
-                    reply = QMessageBox.information(self, "Articles Deleted", msg, QMessageBox.Ok)
-                    if reply == QMessageBox.Ok:
-                        self.reopen_window()
-                    else:
-                        self.reopen_window()
+                self.delete_multiple_articles(self.collection_id, article_ids)
+
+    def on_delete_finished(self, deleted: list, errors: list):
+        """
+        Called once the articles have been deleted. Removes the deleted articles locally and reports any errors.
+
+        Args:
+            deleted: Figshare article ID numbers of the deleted articles.
+            errors: Error messages of the articles that could not be deleted.
+
+        Returns:
+            None
+        """
+        self.remove_deleted_articles(deleted)
+
+        # If any errors occured create a new dialog to notify the user
+        if errors:
+            msg_box = QMessageBox()
+            msg_box.setIcon(QMessageBox.Warning)
+            msg_box.setWindowIcon(QIcon(os.path.normpath(__file__ + '/../../img/figshare_logo.png')))
+            msg_box.setWindowTitle("Article Delete Errors")
+            msg_box.setText("Error occurred while trying to delete articles.")
+            msg_box.setDetailedText('\n'.join(errors))
+            msg_box.setStandardButtons(QMessageBox.Ok)
+            self.delete_msg_box = msg_box
+            self.delete_msg_box.show()
+
+            self.delete_msg_box.buttonClicked.connect(self.reopen_window)
+
+        # If no errors occured then create a new dialog to notify the user
+        else:
+            msg = "{} articles deleted".format(len(deleted))
+            QMessageBox.information(self, "Articles Deleted", msg, QMessageBox.Ok)
+            self.reopen_window()
 
     def on_publish_article_pressed(self):
         """
@@ -349,38 +368,41 @@ class CollectionsArticlesWindow(QMdiSubWindow):
         msg = "Are you sure you want to make {} articles public?".format(n_article)
         reply = QMessageBox.question(self, "Publish Confirmation", msg, QMessageBox.Yes, QMessageBox.No)
 
-        # If the reply confirmation is Yes then publish the selection
+        # If the reply confirmation is Yes then publish the selection in the background
         if reply == QMessageBox.Yes:
-            # Passes the set of article id numbers to the publish
-            errors = self.publish_articles(article_ids)
-
-            if errors is not None:
-                msg_box = QMessageBox()
-                msg_box.setIcon(QMessageBox.Warning)
-                msg_box.setText("Error occurred when publishing.")
-                detailed_msg = ""
-                for err in errors:
-                    for arg in err.args:
-                        detailed_msg += arg + '\n'
-                        detailed_msg += str(err.response.content)
-                    detailed_msg += '\n'
-                msg_box.setDetailedText(detailed_msg)
-                msg_box.setStandardButtons(QMessageBox.Ok)
-                self.publish_msg_box = msg_box
-                self.publish_msg_box.show()
-
-                self.publish_msg_box.buttonClicked.connect(self.reopen_window)
+            if not hasattr(self, 'publish_manager'):
+                self.publish_manager = PublishManager(partial(Collections.publish_article, self.token), self)
+                self.publish_manager.sig_finished.connect(self.on_publish_finished)
+            self.publish_manager.start(article_ids)
 
-            else:
-                msg = "All articles published"
-                reply = QMessageBox.information(self, "Articles Published", msg, QMessageBox.Ok)
-                if reply == QMessageBox.Ok:
-                    self.reopen_window()
-                else:
-                    self.reopen_window()
+    def on_publish_finished(self, published: list, errors: list):
+        """
+        Called once the articles have been published. Updates the local articles and reports any errors.
+
+        Args:
+            published: Figshare article ID numbers of the published articles.
+            errors: Error messages of the articles that could not be published.
+
+        Returns:
+            None
+        """
+        self.mark_articles_published(published)
+
+        if errors:
+            msg_box = QMessageBox()
+            msg_box.setIcon(QMessageBox.Warning)
+            msg_box.setText("Error occurred when publishing.")
+            msg_box.setDetailedText('\n\n'.join(errors))
+            msg_box.setStandardButtons(QMessageBox.Ok)
+            self.publish_msg_box = msg_box
+            self.publish_msg_box.show()
+
+            self.publish_msg_box.buttonClicked.connect(self.reopen_window)
 
         else:
-            pass
+            msg = "{} articles published".format(len(published))
+            QMessageBox.information(self, "Articles Published", msg, QMessageBox.Ok)
+            self.reopen_window()
 
     def reopen_window(self):
         """
@@ -392,14 +414,14 @@ class CollectionsArticlesWindow(QMdiSubWindow):
 
     def on_download_article_pressed(self):
         """
-        Called when the download article button is pressed.
+        Called when the download article button is pressed. The files are downloaded in the background.
         :return:
         """
         # Get the list of article id numbers from the selected items in the article list widget
         article_ids = self.article_list_widget.get_selection()
 
         # Ask if all articles are desired if there is no selection
-        if article_ids == []:
+        if not article_ids:
             reply = QMessageBox.question(self, "Download Confirmation", "Download All Articles?", QMessageBox.Yes,
                                          QMessageBox.No)
 
@@ -411,132 +433,79 @@ class CollectionsArticlesWindow(QMdiSubWindow):
         # If there are articles to download
         if article_ids is not None:
 
-            # Get a list of files from all articles
-            # keep the file names and the file download urls
-            downloads = []
-            for article in article_ids:
-                file_list = Collections(self.token).list_files(article)
-                for f in file_list:
-                    if f['name'][-4:] != '.png':
-                        downloads.append([f['name'], f['download_url']])
-
             # Ask the user to choose a download directory
             download_dir = str(QFileDialog.getExistingDirectory(self, "Select Directory"))
+            if download_dir == '':
+                return
 
-            # An empty list to record any download errors
-            download_statuses = []
-
-            # Download all files in the list
-            for f in downloads:
-                local_path = os.path.abspath(download_dir + '/' + f[0])
-                url = f[1]
-                status = download_file(url, local_path, self.token)
-
-                # If there is an error in any of the downloads record the file name
-                if status != 200:
-                    download_statuses.append(f[0])
+            # File lists are retrieved and the files downloaded in a background thread
+            self.download_manager.start(article_ids, download_dir)
 
-            # If there are any errors display a message that lists the affected files
-            if download_statuses != []:
-
-                msg = 'There was an error in downloading the following files.\n'
-                for f in download_statuses:
-                    msg += f + '\n'
-
-                reply = QMessageBox.warning(self, "Download Error", msg, QMessageBox.Ok)
-
-                if reply == QMessageBox.Ok:
-                    pass
-                else:
-                    pass
-
-            # Otherwise confirm that the downloads have been successful
-            else:
-                reply = QMessageBox.information(self, 'Download Confirmation', "All files downloaded", QMessageBox.Ok)
-
-                if reply == QMessageBox.Ok:
-                    pass
-                else:
-                    pass
-
-    def publish_articles(self, article_ids):
-        """
-        Publishes all articles given
-        :param article_ids: list of int. Figshare article id numbers.
-        :return:
-        """
-        errors = []
-        for article in article_ids:
-            error = self.publish_article(article)
-            if error is not None:
-                errors.append(error)
-
-        if errors != []:
-            return errors
-        else:
-            return None
-
-    def publish_article(self, article_id):
+    def mark_articles_published(self, article_ids):
         """
-        Publishes a single article
-        :param article_id: int. Figshare article id number
+        Marks local articles as public and up to date without fetching them again, then saves them to the article cache
+        and updates their index documents in single batches.
+        :param article_ids: list of str. Figshare article id numbers.
         :return:
         """
-        try:
-            Collections.publish_article(self.token, article_id)
-            self.create_local_article(article_id)
-            return None
-        except HTTPError as err:
-            return err
+        articles = []
+        for article_id in article_ids:
+            article = self.parent.figshare_articles.get(str(article_id))
+            if article is not None:
+                mark_published(article)
+                articles.append(article)
+        if not articles:
+            return
 
-    def create_local_article(self, article_id):
-        """
-        Given a Figshare article id number this function will create a local version if one does not already exist
-        :param figshare_article: Dict. Figshare article returned from Projects.list_articles()
-        :return:
-        """
-        # Get the article id number and title
-        article_id = str(article_id)  # Convert int to str
-        article_title = self.parent.figshare_articles[article_id].figshare_metadata['title']
+        self.parent.article_cache.store_many(articles)
 
-        article = gen_article(article_title, self.token, None, article_id)
-        self.parent.figshare_articles[article_id] = article
+        documents = []
+        for article in articles:
+            document_dict = {}
+            for d in article.input_dicts():
+                document_dict.update(d)
+            documents.append(document_dict)
+        self.parent.figshare_article_index.updateDocuments(schema='figshare_articles', data_dicts=documents)
 
     def delete_multiple_articles(self, collection_id: int, article_ids: set):
         """
-        Used to delete multiple articles from a given Figshare project.
+        Deletes multiple articles from a given Figshare collection in the background, sharing a single API interface
+        object between the delete requests. on_delete_finished is called once all requests have completed.
 
         Args:
-            project_id: Figshare project ID number article is within.
-            article_ids: Figshare article ID number.
+            collection_id: Figshare collection ID number the articles are within.
+            article_ids: Figshare article ID numbers.
 
         Returns:
-            error_msgs (list of str): List of error messages returned during deletion process.
+            None
         """
-        # Empty list to hold error messages if returned
-        error_msgs = []
-
-        # Go though set and attempt to delete each article
-        while article_ids:
-            article_id = article_ids.pop()
-            err_msg = self.delete_article(collection_id, article_id)
-            if err_msg != '' and err_msg is not None:
-                for arg in err_msg.args:
-                    error_msgs.append(str(article_id) + ': ' + arg)
+        if not hasattr(self, 'delete_manager'):
+            collections = Collections(self.token)
+            self.delete_manager = DeleteManager(partial(collections.delete_article, collection_id), self)
+            self.delete_manager.sig_finished.connect(self.on_delete_finished)
+        self.delete_manager.start(article_ids)
 
-        return error_msgs
-
-    def delete_article(self, collection_id: int, article_id: int):
+    def remove_deleted_articles(self, article_ids):
         """
-        Uses the Figshare API Interface package to delete the given article from Figshare.
+        Removes deleted articles from the local articles and the article cache, and their documents from the index in a
+        single batch.
 
         Args:
-            project_id: Figshare project ID number, article is within.
-            article_id: Figshare article ID number.
+            article_ids: Figshare article ID numbers.
 
         Returns:
-            err_msg (str): Either an empty string or contains an error message that occurred during deletion process.
+            None
         """
-        collections = Collections(self.token)
-        err_msg = collections.delete_article(collection_id, article_id)
-        return err_msg
+        article_ids = [str(article_id) for article_id in article_ids]
+        if not article_ids:
+            return
+
+        for article_id in article_ids:
+            self.parent.figshare_articles.pop(article_id, None)
+        self.parent.article_cache.remove(article_ids)
+        self.parent.figshare_article_index.removeDocumentsByTerm('figshare_articles', 'id', article_ids)
+
+        # Drop the deleted articles from the mirrored article listing
+        key = mirror_key('collection_articles', self.collection_id)
+        mirror = self.parent.local_mirror
+        mirror.store(key, [a for a in mirror.get(key) or [] if str(a['id']) not in article_ids])
@@ -8,6 +8,7 @@ ToDo:
 """
 
 # Standard Imports
+from functools import partial
 from requests import HTTPError
 
 # PyQt Imports
@@ -19,6 +20,7 @@ from Figshare_desktop.collections_windows.collection_articles_window import Coll
 from Figshare_desktop.custom_widgets.button_field import QButtonField
 from Figshare_desktop.custom_widgets.categories_field import CategoriesField
 from Figshare_desktop.custom_widgets.author_field import AuthorField
+from Figshare_desktop.local_store.offline_mirror import mirror_key
 
 # Figshare API imports
 from figshare_interface.figshare_structures.collections import Collections
@@ -46,7 +48,9 @@ class CollectionInfoWindow(ObjectInfoWindow):
             object_info (dict): Dictionary containing key, value pairs of metadata on the collection.
         """
         collections = Collections(self.token)
-        object_info = collections.get_info(self.object_id)
+        # Read from the offline mirror, which is refreshed from Figshare in the background
+        object_info = self.parent.mirror_sync.load(mirror_key('collection', self.object_id),
+                                                   partial(collections.get_info, self.object_id))
         return object_info
 
     def initUI(self):
@@ -360,4 +364,6 @@ class CollectionInfoWindow(ObjectInfoWindow):
         """
         collections = Collections(self.token)
         resp_code, resp_data = collections.update(self.object_id, update_dict)
+        # Fetch the updated collection when the window is reopened
+        self.parent.local_mirror.remove(mirror_key('collection', self.object_id))
         return resp_code, resp_data
@@ -5,6 +5,7 @@ This window presents a view of the collections in a users account and allows for
 Collections can then be opened to examine their contents, an action that creates new child windows.
 """
 # Standard Imports
+from functools import partial
 
 # PyQt Imports
 
@@ -12,6 +13,7 @@ Collections can then be opened to examine their contents, an action that creates
 from Figshare_desktop.abstract_windows.figshare_structure_list import FigshareObjectWindow
 from Figshare_desktop.collections_windows.collection_info_window import CollectionInfoWindow
 from Figshare_desktop.collections_windows.new_collection_window import NewCollectionWindow
+from Figshare_desktop.local_store.offline_mirror import (COLLECTIONS_KEY, mirror_key)
 from figshare_interface import Collections
 
 __author__ = "Tobias Gill"
@@ -116,6 +118,23 @@ class CollectionsWindow(FigshareObjectWindow):
     # Figshare API Interface Functions
     # ================================
 
+    def initFig(self):
+        """
+        Reads the collection list, and mirrors any collections not yet mirrored in the background.
+
+        Returns:
+            None
+        """
+        super().initFig()
+        self.mirror_objects(self.object_list)
+
+    def on_object_list_changed(self, key: str, object_list: list):
+        """
+        Mirrors any new collections, then redraws the collection buttons.
+        """
+        self.mirror_objects(object_list)
+        super().on_object_list_changed(key, object_list)
+
     def get_object_list(self):
         """
         Called to return a list of Figshare collections associated to the user.
@@ -124,9 +143,30 @@ class CollectionsWindow(FigshareObjectWindow):
             object_list (list of dicts): List of users Figshare objects.
         """
         collections = Collections(self.token)
-        object_list = collections.get_list()
+        # Read from the offline mirror, which is refreshed from Figshare in the background
+        object_list = self.parent.mirror_sync.load(COLLECTIONS_KEY, collections.get_list, self.on_object_list_changed,
+                                                   default=[])
         return object_list
 
+    def mirror_objects(self, object_list: list):
+        """
+        Mirrors in the background the info and article listing of any collections that have not been mirrored yet, so
+        that they can be opened offline.
+
+        Args:
+            object_list: List of Figshare collection dictionaries.
+
+        Returns:
+            None
+        """
+        collections = Collections(self.token)
+        fetches = {}
+        for collection in object_list:
+            c_id = collection['id']
+            fetches[mirror_key('collection', c_id)] = partial(collections.get_info, c_id)
+            fetches[mirror_key('collection_articles', c_id)] = partial(collections.get_articles, c_id)
+        self.parent.mirror_sync.prefetch(fetches)
+
     def search_objects(self, search_text: str):
         """
         Gets a list of objects matching the users search query.
@@ -139,9 +179,10 @@ class CollectionsWindow(FigshareObjectWindow):
                 or returns the full set if no matches found.
         """
         collections = Collections(self.token)
-        result = collections.search(search_text)
+        # Searches the titles of the mirrored collection list when offline
+        result = self.parent.local_mirror.search(COLLECTIONS_KEY, search_text, collections.search)
         if len(result) == 0:
-            result = collections.get_list()
+            result = self.get_object_list()
         return result
 
     def delete_object(self, object_id: int):
@@ -157,6 +198,8 @@ class CollectionsWindow(FigshareObjectWindow):
         collections = Collections(self.token)
         try:
             collections.delete(object_id, safe=False)  # Suppress command line confirmation
+            mirror = self.parent.local_mirror
+            mirror.store(COLLECTIONS_KEY, [c for c in mirror.get(COLLECTIONS_KEY) or [] if c['id'] != object_id])
             return True
         except:
             return False
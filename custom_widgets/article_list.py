@@ -3,15 +3,19 @@
 """
 import collections
 import time
+from functools import partial
 
-from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QProgressBar, QAbstractItemView, QTreeWidget, QTreeWidgetItem,
-                             QLineEdit, QHBoxLayout, QComboBox, QPushButton, QDialog, QGridLayout, QSizePolicy,
-                             QCheckBox)
-from PyQt5.QtCore import (QThread, pyqtSignal, pyqtSlot, QObject)
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QProgressBar, QLineEdit, QHBoxLayout, QComboBox, QPushButton,
+                             QDialog, QGridLayout, QSizePolicy, QCheckBox)
+from PyQt5.QtCore import (QThread, QTimer, pyqtSignal, pyqtSlot, QObject)
 
 from Figshare_desktop.formatting.formatting import (search_bar, search_combo, press_button)
 
 from Figshare_desktop.figshare_articles.determine_type import gen_article
+from Figshare_desktop.custom_widgets.article_table_model import ArticleTreeView
+from Figshare_desktop.custom_widgets.facet_sidebar import FacetSidebar
+from Figshare_desktop.background_jobs.concurrency import (map_as_completed, DEFAULT_MAX_WORKERS)
+from Figshare_desktop.local_store.offline_mirror import mirror_key
 from figshare_interface import Projects
 
 __author__ = "Tobias Gill"
@@ -22,18 +26,28 @@ __maintainer__ = "Tobias Gill"
 __email__ = "toby.gill.09@ucl.ac.uk"
 __status__ = "Development"
 
+# Time in milliseconds after the user stops typing before the search is run
+SEARCH_DELAY = 300
+
+# Fields offered in the facet sidebar, where they are keyword or id fields of the index
+FACET_FIELDS = ('defined_type', 'tags', 'categories', 'authors', 'users', 'sample', 'substrate', 'notebook')
+
 
 class ArticleList(QWidget):
 
-    def __init__(self, app, OAuth_token, project_id, parent):
+    def __init__(self, app, OAuth_token, project_id, parent, max_workers: int=DEFAULT_MAX_WORKERS):
         super().__init__()
 
         self.app = app
         self.token = OAuth_token
         self.project_id = project_id
         self.parent = parent
+        # Maximum number of concurrent Figshare requests made while loading articles
+        self.max_workers = max_workers
 
         self.__threads = []
+        # Worker loading the current article listing
+        self.load_worker = None
 
         self.initFig()
         self.initUI()
@@ -43,12 +57,28 @@ class ArticleList(QWidget):
         Initial data load from Figshare
         :return:
         """
-        # Get the list of articles from
+        # Get the list of articles from the offline mirror, which is refreshed from Figshare in the background
         projects = Projects(self.token)
-        articles = projects.list_articles(self.project_id)
-        n_articles = len(articles)
+        key = mirror_key('project_articles', self.project_id)
+        articles = self.parent.mirror_sync.load(key, partial(projects.list_articles, self.project_id),
+                                                self.on_articles_changed, default=[])
+        self.load_articles(articles)
 
-        worker = ArticleLoadWorker(self.app, self.token, self.parent, self.project_id, articles)
+    def load_articles(self, articles: list, refresh: bool=False):
+        """
+        Creates local versions of the given articles in a background thread, adding each to the tree once it is loaded.
+        :param articles: list of dicts. Figshare article listing
+        :param refresh: bool. If True articles that already have a local version are reloaded if they have been
+            modified on Figshare
+        :return:
+        """
+        # A loader of an older listing stops fetching articles, as any still listed are loaded by the new worker
+        if self.load_worker is not None:
+            self.load_worker.abort()
+
+        worker = ArticleLoadWorker(self.app, self.token, self.parent, self.project_id, articles,
+                                   max_workers=self.max_workers, refresh=refresh)
+        self.load_worker = worker
 
         thread = QThread()
         thread.setObjectName('thread_article_load')
@@ -57,6 +87,7 @@ class ArticleList(QWidget):
         worker.moveToThread(thread)
 
         worker.sig_step.connect(self.add_to_tree)
+        worker.sig_refreshed.connect(self.update_in_tree)
         worker.sig_done.connect(self.update_search_field)
         worker.sig_done.connect(self.enable_fields)
 
@@ -68,10 +99,44 @@ class ArticleList(QWidget):
         for article in articles:
             self.article_ids.add(article['id'])
 
+    def on_articles_changed(self, key: str, articles: list):
+        """
+        Called when a background sync of the offline mirror finds that the article listing has changed on Figshare.
+        Loads any new articles, reloads those modified since they were loaded, and removes those no longer listed from
+        the tree and the index.
+        :param key: str. Mirror key of the article listing
+        :param articles: list of dicts. Updated article listing
+        :return:
+        """
+        self.remove_unlisted_articles(articles)
+        self.load_articles(articles, refresh=True)
+        self.fill_tree(None, self.article_ids)
+
+    def remove_unlisted_articles(self, articles: list):
+        """
+        Removes articles that were in the previous listing, but have since been deleted or moved outside the app, from
+        the local articles, the article cache, and the persistent index. Articles still in another mirrored listing are
+        kept.
+        :param articles: list of dicts. Updated article listing
+        :return:
+        """
+        listed_ids = {str(article['id']) for article in articles}
+        listed_ids.update(self.parent.local_mirror.listed_article_ids())
+        article_ids = [str(article['id']) for article in self.articles if str(article['id']) not in listed_ids]
+        if not article_ids:
+            return
+
+        for article_id in article_ids:
+            self.parent.figshare_articles.pop(article_id, None)
+        self.parent.article_cache.remove(article_ids)
+        self.parent.figshare_article_index.removeDocumentsByTerm('figshare_articles', 'id', article_ids)
+
     def initUI(self):
 
         # Initialise the article QTree
         self.initTree()
+        # Initialise the facet sidebar used to filter the tree
+        self.initFacets()
 
         # Create horizontal layout for the search bar and fields
         search_layout = QHBoxLayout()
@@ -88,8 +153,11 @@ class ArticleList(QWidget):
 
         # Add the search layout to the vertical layout
         vbox.addLayout(search_layout)
-        # Add the Article tree to the layout
-        vbox.addWidget(self.tree)
+        # Add the facet sidebar and Article tree to the layout
+        tree_layout = QHBoxLayout()
+        tree_layout.addWidget(self.facet_sidebar, 1)
+        tree_layout.addWidget(self.tree, 4)
+        vbox.addLayout(tree_layout)
 
         # Set Widget layout
         self.setLayout(vbox)
@@ -104,22 +172,34 @@ class ArticleList(QWidget):
         :return:
         """
 
-        # Create instance of QTreeWidget
-        tree = QTreeWidget()
-        # Format tree to allow for multiple items to be selected
-        tree.setSelectionMode(QAbstractItemView.ExtendedSelection)
-        # Allow for sorting by clicking on headers
-        tree.setSortingEnabled(True)
-
         # Create the initial set of column headers
         headers = ['id', 'title', 'created_date', 'up_to_date', 'type', 'tags']
-        header_item = QTreeWidgetItem(headers)
-        tree.setHeaderItem(header_item)
+
+        # Create a sortable view of the Figshare articles. Rows are only generated as they are drawn.
+        tree = ArticleTreeView(self.parent.figshare_articles, headers)
 
         self.tree = tree
 
         self.tree_headers = headers
 
+    def initFacets(self):
+        """
+        Called to initialise the facet sidebar
+        :return:
+        """
+        # Article ids matching the current search, or None when not searching
+        self.search_ids = None
+
+        self.facet_sidebar = FacetSidebar()
+        self.facet_sidebar.sig_filter_changed.connect(self.apply_filters)
+
+    def article_index(self):
+        """
+        Returns the search index holding the articles of the list, and the name of its schema
+        :return: ArticleIndex, str
+        """
+        return self.parent.figshare_article_index, 'figshare_articles'
+
     def search_bar(self):
         """
         Creates a QLineEdit object for the user to enter a search query
@@ -139,6 +219,12 @@ class ArticleList(QWidget):
         edit.setToolTipDuration(2000)
         # Connect search function to the return key
         edit.returnPressed.connect(self.search_on_return)
+        # Also search as the user types, once they pause
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY)
+        self.search_timer.timeout.connect(self.search_on_return)
+        edit.textEdited.connect(lambda text: self.search_timer.start())
         # Connect the clear button to our own function
         edit.children()[2].triggered.connect(self.search_on_clear)
 
@@ -200,6 +286,9 @@ class ArticleList(QWidget):
         fields = self.parent.figshare_article_index.get_fields(schema='figshare_articles')
         self.search_field_combo.addItems(fields)
 
+        # New fields may have been added to the index, so refresh the facets
+        self.apply_filters()
+
     @pyqtSlot(bool)
     def enable_fields(self):
         """
@@ -223,38 +312,34 @@ class ArticleList(QWidget):
 
     def fill_tree(self, headers: list, article_ids: set):
         """
-        Called to fill the QTree with articles
+        Called to make the QTree hold the given articles. Only the rows that differ are inserted or removed.
 
         Args:
-            headers: Metadata key names in order to which appear in the QTreeWidget.
+            headers: Metadata key names in order to which appear in the tree.
             article_ids: Set of Figshare article ID numbers from to fill tree with.
 
         Returns:
             None
         """
-        self.tree.clear()
-        for article_id in article_ids:
-            self.add_to_tree(article_id)
+        self.tree.sync_articles(str(article_id) for article_id in article_ids)
 
     @pyqtSlot(int)
-    def add_to_tree(self, article_id: int, headers: list=None):
+    def add_to_tree(self, article_id: int):
         """
         Adds a single article to the QTree
         :param article_id: int. or str. figshare article id
         :return:
         """
-        if headers is None:
-            headers = self.tree_headers
-
-        article_id = str(article_id)
-
-        local_article = self.parent.figshare_articles[article_id]
-        local_article.gen_qtree_item(headers, local_article.input_dicts())
-        self.tree.addTopLevelItem(local_article.qtreeitem)
+        # Articles are inserted in batches and the columns resized once the batch has settled
+        self.tree.queue_article(str(article_id))
 
-        # Adjust the size of the columns to the contents
-        for column in range(self.tree.columnCount()):
-            self.tree.resizeColumnToContents(column)
+    def update_in_tree(self, article_ids: list):
+        """
+        Re-reads the rows of articles that have been reloaded
+        :param article_ids: list of str. figshare article ids
+        :return:
+        """
+        self.tree.update_articles(article_ids)
 
     def update_headers(self, headers):
         """
@@ -262,13 +347,7 @@ class ArticleList(QWidget):
         :param headers: list of strings. in Order for the different column headers
         :return:
         """
-        header_item = QTreeWidgetItem(headers)
-        self.tree.setHeaderItem(header_item)
-        self.tree.clear()
-        self.fill_tree(headers, self.article_ids)
-        # Adjust the size of the columns to the contents
-        for column in range(self.tree.columnCount()):
-            self.tree.resizeColumnToContents(column)
+        self.tree.set_headers(headers)
 
     def search_on_return(self):
         """
@@ -292,14 +371,43 @@ class ArticleList(QWidget):
                 if 'id' in val_dict:
                     self.result_ids.add(val_dict['id'])
 
-            self.fill_tree(self.tree_headers, self.result_ids)
+            # Hide the articles not in the results rather than refilling the tree
+            self.search_ids = {str(article_id) for article_id in self.result_ids}
+            self.apply_filters()
 
     def search_on_clear(self):
         """
         Called when the search bar is cleared.
         :return:
         """
-        self.fill_tree(self.tree_headers, self.article_ids)
+        self.search_ids = None
+        self.apply_filters()
+
+    def apply_filters(self):
+        """
+        Shows the articles matching both the current search and the facets checked in the sidebar. The facet counts are
+        updated to the articles in the list matching the search.
+        :return:
+        """
+        article_index, schema = self.article_index()
+        if article_index is None:
+            return
+        self.facet_sidebar.set_facets(article_index.facets(schema, FACET_FIELDS))
+
+        # The index may also hold articles that are not in this list
+        self.tree.flush()
+        scope = set(self.tree.source_model.ids())
+        if self.search_ids is not None:
+            scope &= self.search_ids
+        self.facet_sidebar.set_scope(scope)
+
+        facet_ids = self.facet_sidebar.filter_ids()
+        if self.search_ids is None and facet_ids is None:
+            self.tree.show_all()
+        elif facet_ids is None:
+            self.tree.show_only(scope)
+        else:
+            self.tree.show_only(scope & facet_ids)
 
     def on_headers_set_pressed(self):
         """
@@ -393,13 +501,7 @@ class ArticleList(QWidget):
         Can be called to return a list of the article id numbers of all selected articles
         :return:
         """
-        items = self.tree.selectedItems()
-
-        article_ids = set()
-        for item in items:
-            article_ids.add(int(item.text(0)))
-
-        return article_ids
+        return set(int(article_id) for article_id in self.tree.selected_ids())
 
     def get_all(self):
         """
@@ -407,13 +509,8 @@ class ArticleList(QWidget):
         :return:
         """
         self.tree.selectAll()
-        items = self.tree.selectedItems()
-
-        article_ids = set()
-        for item in items:
-            article_ids.add(int(item.text(0)))
 
-        return article_ids
+        return set(int(article_id) for article_id in self.tree.visible_ids())
 
     #####
     # Figshare API Functions
@@ -445,9 +542,11 @@ class ArticleList(QWidget):
 class ArticleLoadWorker(QObject):
 
     sig_step = pyqtSignal(int)
+    sig_refreshed = pyqtSignal(list)
     sig_done = pyqtSignal(bool)
 
-    def __init__(self, app, OAuth_token: str, parent, project_id: int, articles: list):
+    def __init__(self, app, OAuth_token: str, parent, project_id: int, articles: list,
+                 max_workers: int=DEFAULT_MAX_WORKERS, refresh: bool=False):
         super().__init__()
         self.__abort = False
 
@@ -456,84 +555,177 @@ class ArticleLoadWorker(QObject):
         self.parent = parent
         self.project_id = project_id
         self.articles = articles
+        self.max_workers = max_workers
+        # If True articles that already have a local version are reloaded if they have been modified on Figshare
+        self.refresh = refresh
 
         self.n_articles = len(articles)
 
+        # Figshare article id numbers of articles that could not be loaded
+        self.failed_ids = set()
+
     @pyqtSlot()
     def work(self):
         """
-
+        Creates local versions of the articles, fetching their metadata from Figshare concurrently. Articles are added
+        to the tree in the order in which their requests complete.
         :return:
         """
         if self.n_articles > 0:
+            # Index documents are collected and committed to the index in a single batch once all are loaded
+            documents = []
+
+            offline = self.parent.local_mirror.offline
+
+            # Articles that already have a local version can be added to the tree straight away, unless they are being
+            # refreshed and may have been modified on Figshare
+            to_load = []
+            existing_ids = set()
             for article in self.articles:
-                self.create_local_article(article)
+                if not self.does_article_exist_locally(article['id']):
+                    to_load.append(article)
+                elif self.refresh and not offline and not self.is_local_current(article):
+                    to_load.append(article)
+                    existing_ids.add(str(article['id']))
+                else:
+                    self.sig_step.emit(article['id'])
+
+            # Articles that have not been modified since they were last cached are restored without contacting Figshare.
+            # While Figshare is unreachable any cached copy is restored, as it cannot be checked
+            article_cache = self.parent.article_cache
+            cached, to_load = article_cache.partition(to_load, validate=not offline)
+            # Documents kept in the index from a previous session only need replacing if the article has since changed
+            indexed_dates = self.parent.figshare_article_index.stored_values('figshare_articles', 'id', 'modified_date')
+            # Ids of articles whose existing local version has been replaced
+            refreshed_ids = []
+            for article, cached_dicts in cached:
+                if str(article['id']) in existing_ids:
+                    refreshed_ids.append(str(article['id']))
+                local_article = self.restore_article(article, cached_dicts)
+                document = self.create_local_article(article, local_article)
+                if indexed_dates.get(str(article['id'])) != local_article.figshare_metadata['modified_date']:
+                    documents.append(document)
+                self.sig_step.emit(article['id'])
+
+            # Articles that are not cached cannot be loaded while Figshare is unreachable
+            if offline:
+                self.failed_ids.update(article['id'] for article in to_load)
+                to_load = []
+
+            # Fetch the remaining articles concurrently. Failed requests are retried by the transport
+            loaded = []
+            results = map_as_completed(self.load_article, to_load, max_workers=self.max_workers,
+                                       abort=self.is_aborted, backoff=False)
+            for article, local_article, err in results:
+                if err is not None:
+                    self.failed_ids.add(article['id'])
+                    if str(article['id']) in existing_ids:
+                        # The existing local version is kept if it could not be reloaded
+                        self.sig_step.emit(article['id'])
+                    continue
+                if local_article is self.parent.figshare_articles.get(str(article['id'])):
+                    # A refreshed article that has not been modified keeps its local version
+                    self.sig_step.emit(article['id'])
+                    continue
+                if str(article['id']) in existing_ids:
+                    refreshed_ids.append(str(article['id']))
+                documents.append(self.create_local_article(article, local_article))
+                loaded.append(local_article)
                 self.sig_step.emit(article['id'])
-                if self.__abort:
-                    break
 
+            # Save the newly downloaded articles for the next session
+            article_cache.store_many(loaded)
+
+            # Documents are updated by article id, replacing any kept from a previous session
+            self.parent.figshare_article_index.updateDocuments(schema='figshare_articles', data_dicts=documents)
+            # Rows of reloaded articles already in the tree are re-read together
+            self.sig_refreshed.emit(refreshed_ids)
             self.sig_done.emit(True)
 
     @pyqtSlot(bool)
     def abort(self):
         self.__abort = True
 
-    def create_local_article(self, article):
+    def is_aborted(self):
+        return self.__abort
+
+    def load_article(self, article):
         """
-        Given a Figshare article id number this function will create a local version if one does not already exist
+        Builds an article object from Figshare. Called from the worker thread pool, so it must not modify any shared
+        state.
+
+        Figshare listings do not give the modified date of their articles, so a local or cached copy of an article that
+        the listing could not validate is checked against the modified date of the article's own record. The local
+        version is returned unchanged, or the cached copy restored, if it is still up to date.
         :param article: Dict. Figshare article returned from Projects.list_articles()
-        :return:
+        :return: Article object
+        """
+        article_id = str(article['id'])  # Convert int to str
+        local_article = self.parent.figshare_articles.get(article_id)
+        if 'modified_date' not in article and (local_article is not None or
+                                               self.parent.article_cache.get(article_id) is not None):
+            modified_date = self.fetch_modified_date(article_id)
+            if local_article is not None and local_article.figshare_metadata['modified_date'] == modified_date:
+                return local_article
+            cached_dicts = self.parent.article_cache.get_valid(article, modified_date)
+            if cached_dicts is not None:
+                return self.restore_article(article, cached_dicts)
+        return gen_article(article['title'], self.token, self.project_id, article_id)
+
+    def fetch_modified_date(self, article_id: str):
+        """
+        Requests the current modified date of an article from Figshare.
+        :param article_id: str. Figshare article id number
+        :return: str. Modified date of the article
+        """
+        return Projects(self.token).get_article(self.project_id, article_id)['modified_date']
+
+    def restore_article(self, article, cached_dicts: list):
+        """
+        Builds an article object from cached metadata without contacting Figshare.
+        :param article: Dict. Figshare article returned from Projects.list_articles()
+        :param cached_dicts: List of cached metadata dictionaries from the ArticleCache
+        :return: Article object
         """
-        # Get the article id number and title
         article_id = str(article['id'])  # Convert int to str
-        article_title = article['title']
+        return gen_article(article['title'], self.token, self.project_id, article_id, cached_dicts)
 
-        # If article is not already stored locally create a
-        if not self.does_article_exist_locally(article_id):
-            article = gen_article(article_title, self.token, self.project_id, article_id)
-            self.parent.figshare_articles[article_id] = article
+    def create_local_article(self, article_info, article):
+        """
+        Stores a newly loaded article locally and makes sure the index schema can hold it
+        :param article_info: Dict. Figshare article returned from Projects.list_articles()
+        :param article: Article object created by load_article()
+        :return: Dict. Index document for the new article
+        """
+        # Get the article id number
+        article_id = str(article_info['id'])  # Convert int to str
+        self.parent.figshare_articles[article_id] = article
 
-            # Locally reference the Figshare Article Index
-            article_index = self.parent.figshare_article_index
+        # Locally reference the Figshare Article Index
+        article_index = self.parent.figshare_article_index
 
-            # Get the type of the article
-            article_type = article.get_type()
-
-            # Check to see if the article type has been added to the articles index.
-            # If note we will need to create new fields in the schema.
-            if article_type not in article_index.document_types:
-                # Add the new file type to the index schema
-                article_index.document_types.add(article_type)
-
-                # Define the schema we wish to add fields to
-                schema = 'figshare_articles'
-
-                # From the article type created get the index dictionary and add fields to the index
-                for field_name, field_type in article.index_schema().items():
-                    if field_name not in article_index.get_fields(schema):
-                        if field_type[0] == 'id':
-                            article_index.add_ID(schema=schema, field_name=field_name, stored=field_type[1],
-                                                 unique=True)
-                        elif field_type[0] == 'text':
-                            article_index.add_TEXT(schema, field_name, field_type[1])
-                        elif field_type[0] == 'keyword':
-                            article_index.add_KEYWORD(schema, field_name, field_type[1])
-                        elif field_type[0] == 'numeric':
-                            article_index.add_NUMERIC(schema, field_name, field_type[1])
-                        elif field_type[0] == 'datetime':
-                            article_index.add_DATETIME(schema, field_name, field_type[1])
-                        elif field_type[0] == 'boolean':
-                            article_index.add_BOOLEAN(schema, field_name, field_type[1])
-                        elif field_type[0] == 'ngram':
-                            article_index.add_NGRAM(schema, field_name, field_type[1])
-
-            # Get single dictionary of all fields associated to the article
-            document_dict = {}
-            for d in article.input_dicts():
-                document_dict = {**document_dict, **d}
-
-            # Add document to index
-            article_index.addDocument(schema='figshare_articles', data_dict=document_dict)
+        # Get the type of the article
+        article_type = article.get_type()
+
+        # Check to see if the article type has been added to the articles index.
+        # If note we will need to create new fields in the schema.
+        if article_type not in article_index.document_types:
+            # Add the new file type to the index schema
+            article_index.document_types.add(article_type)
+
+            # Define the schema we wish to add fields to
+            schema = 'figshare_articles'
+
+            # From the article type created get the index dictionary and add any missing fields in one commit
+            article_index.ensure_fields(schema, article.index_schema())
+
+        # Get single dictionary of all fields associated to the article
+        document_dict = {}
+        for d in article.input_dicts():
+            document_dict.update(d)
+
+        # Return the document to be added to the index
+        return document_dict
 
     def does_article_exist_locally(self, article_id):
         """
@@ -550,6 +742,16 @@ class ArticleLoadWorker(QObject):
         else:
             return False
 
+    def is_local_current(self, article):
+        """
+        Checks the local version of an article against the modified date given by the article listing.
+        :param article: Dict. Figshare article returned from Projects.list_articles()
+        :return: Bool. False if the listing gives a different modified date, or none to check against
+        """
+        local_article = self.parent.figshare_articles[str(article['id'])]
+        modified_date = article.get('modified_date')
+        return modified_date is not None and modified_date == local_article.figshare_metadata['modified_date']
+
 
 class OrderedSet(collections.OrderedDict, collections.MutableSet):
 
@@ -0,0 +1,608 @@
+"""
+Article Table Model
+
+Model/view replacement for filling a QTreeWidget with one QTreeWidgetItem per article. Article metadata is held in a
+column store, one list of raw values per header, and is only converted to display strings when the view asks for the
+rows it is drawing. Sorting requested through the proxy model is carried out on the column store in a single pass, rather
+than by a comparison per pair of rows through the Qt data roles, and new articles and column resizes are applied in
+batches, so that lists of tens of thousands of articles remain responsive.
+
+Rows are only ever inserted or removed by article id. Searches hide and show rows through the proxy model, so that the
+model itself is never rebuilt.
+"""
+
+import bisect
+
+from PyQt5.QtWidgets import (QTreeView, QAbstractItemView)
+from PyQt5.QtCore import (Qt, QAbstractTableModel, QSortFilterProxyModel, QModelIndex, QTimer)
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+# Data roles used in addition to the standard Qt roles
+ID_ROLE = Qt.UserRole
+SORT_ROLE = Qt.UserRole + 1
+
+# Time in milliseconds that queued articles are held before being inserted into the model as a single batch
+INSERT_INTERVAL = 50
+
+# Time in milliseconds after the last change before the columns are resized to their contents
+RESIZE_INTERVAL = 250
+
+
+def is_number(value):
+    """
+    Returns True for int and float values. Booleans are treated as text.
+    """
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def column_value(input_dicts: list, key: str):
+    """
+    Returns the value of a metadata key from the first of the input dictionaries that contains it.
+
+    Args:
+        input_dicts: List of article metadata dictionaries, as returned by Article.input_dicts().
+        key: Metadata key name.
+
+    Returns:
+        value: The metadata value, or None if no dictionary has the key.
+    """
+    for d in input_dicts:
+        if key in d:
+            return d[key]
+    return None
+
+
+class DescendingKeys(object):
+    """
+    Read only view of a list of sort keys in descending order as an ascending sequence, so that it can be searched with
+    the bisect module.
+    """
+
+    def __init__(self, keys: list):
+        self.keys = keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __getitem__(self, i):
+        return self.keys[len(self.keys) - 1 - i]
+
+
+def insertion_row(keys: list, key, order=Qt.AscendingOrder):
+    """
+    Returns the row at which a new row should be inserted to keep sorted rows in order. The new row is placed after any
+    rows with an equal key, as a stable sort would place it.
+
+    Args:
+        keys: Sort keys of the rows, in row order.
+        key: Sort key of the new row.
+        order: Order the rows are sorted in.
+
+    Returns:
+        row (int)
+    """
+    if order == Qt.DescendingOrder:
+        return len(keys) - bisect.bisect_left(DescendingKeys(keys), key)
+    return bisect.bisect_right(keys, key)
+
+
+class ArticleTableModel(QAbstractTableModel):
+    """
+    Table model of articles, with a row per article and a column per metadata header.
+    """
+
+    def __init__(self, articles: dict, headers: list, parent=None):
+        """
+        Args:
+            articles: Dictionary of article id: Article object pairs that rows are looked up from.
+            headers: Metadata key names in the order in which they appear as columns.
+            parent: Optional QObject parent.
+
+        Returns:
+            None
+        """
+        super().__init__(parent)
+
+        self.articles = articles
+        self.headers = list(headers)
+
+        # Article id of each row, and the row of each article id
+        self._ids = []
+        self._rows = {}
+        # Column store of raw metadata values, and whether each column holds only numbers
+        self._columns = [[] for _ in self.headers]
+        self._numeric = [True for _ in self.headers]
+
+        # Header and order the rows are currently sorted by, and the sort key of each row, or None when unsorted
+        self._sort_key = None
+        self._sort_order = Qt.AscendingOrder
+        self._sort_keys = None
+
+    #####
+    # Qt Model Functions
+    #####
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._ids)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole and section < len(self.headers):
+            return self.headers[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        column = index.column()
+
+        if role == Qt.DisplayRole or role == Qt.ToolTipRole:
+            value = self._columns[column][row]
+            return '' if value is None else str(value)
+        elif role == SORT_ROLE:
+            return self.sort_value(column, self._columns[column][row])
+        elif role == ID_ROLE:
+            return self._ids[row]
+        return None
+
+    def sort_value(self, column: int, value):
+        """
+        Returns the key a value is sorted by. Columns of numbers sort numerically, all others by their display text.
+        """
+        if self._numeric[column]:
+            return float('-inf') if value is None else float(value)
+        return '' if value is None else str(value).lower()
+
+    def sort(self, column: int, order=Qt.AscendingOrder):
+        """
+        Reorders the rows by the values of a column. The sort keys are computed once per row, and any persistent
+        indexes, such as the selection, are moved with their rows.
+        """
+        if column < 0 or column >= len(self.headers):
+            self._sort_key = None
+            self._sort_keys = None
+            return
+        self._sort_key = self.headers[column]
+        self._sort_order = order
+
+        values = self._columns[column]
+        keys = [self.sort_value(column, value) for value in values]
+        new_order = sorted(range(len(self._ids)), key=keys.__getitem__, reverse=order == Qt.DescendingOrder)
+
+        self.layoutAboutToBeChanged.emit()
+
+        new_rows = [0] * len(new_order)
+        for new_row, old_row in enumerate(new_order):
+            new_rows[old_row] = new_row
+        old_indexes = self.persistentIndexList()
+        new_indexes = [self.index(new_rows[index.row()], index.column()) for index in old_indexes]
+
+        self._ids = [self._ids[row] for row in new_order]
+        self._columns = [[column_values[row] for row in new_order] for column_values in self._columns]
+        self._rows = {a_id: row for row, a_id in enumerate(self._ids)}
+        self._sort_keys = [keys[row] for row in new_order]
+
+        self.changePersistentIndexList(old_indexes, new_indexes)
+        self.layoutChanged.emit()
+
+    def resort(self):
+        """
+        Sorts the rows again by the last sort column, if it is still shown.
+        """
+        if self._sort_key in self.headers:
+            self.sort(self.headers.index(self._sort_key), self._sort_order)
+        else:
+            self._sort_keys = None
+
+    #####
+    # Article Functions
+    #####
+
+    def article_id(self, row: int):
+        """
+        Returns the article id of a row.
+        """
+        return self._ids[row]
+
+    def row_of(self, article_id):
+        """
+        Returns the row of an article id, or None if the article is not in the model.
+        """
+        return self._rows.get(article_id)
+
+    def ids(self):
+        """
+        Returns a list of the article ids in the model in row order.
+        """
+        return list(self._ids)
+
+    def _extract(self, article_id):
+        """
+        Reads the header values of an article.
+        """
+        input_dicts = self.articles[article_id].input_dicts()
+        return [column_value(input_dicts, key) for key in self.headers]
+
+    def _append_values(self, values: list):
+        for column, value in enumerate(values):
+            self._columns[column].append(value)
+            if value is not None and not is_number(value):
+                self._numeric[column] = False
+
+    def add_articles(self, article_ids):
+        """
+        Adds articles to the model. If the rows are sorted each article is inserted at its sorted position, otherwise
+        the articles are appended as a single insertion. Articles already in the model are ignored.
+
+        Args:
+            article_ids: Iterable of article ids.
+
+        Returns:
+            None
+        """
+        new_ids = []
+        seen = set()
+        for article_id in article_ids:
+            if article_id not in self._rows and article_id not in seen and article_id in self.articles:
+                new_ids.append(article_id)
+                seen.add(article_id)
+        if not new_ids:
+            return
+        new_values = [self._extract(article_id) for article_id in new_ids]
+
+        if self._sort_keys is not None:
+            column = self.headers.index(self._sort_key)
+            # A text value in a column of numbers changes how the whole column sorts, so the rows are sorted again
+            if not (self._numeric[column] and any(values[column] is not None and not is_number(values[column])
+                                                  for values in new_values)):
+                self._insert_sorted(column, new_ids, new_values)
+                return
+
+        first = len(self._ids)
+        self.beginInsertRows(QModelIndex(), first, first + len(new_ids) - 1)
+        for row, (article_id, values) in enumerate(zip(new_ids, new_values), first):
+            self._ids.append(article_id)
+            self._rows[article_id] = row
+            self._append_values(values)
+        self.endInsertRows()
+
+        self.resort()
+
+    def _insert_sorted(self, column: int, new_ids: list, new_values: list):
+        """
+        Inserts rows at their sorted positions by the sort column, without sorting the existing rows again.
+        """
+        for article_id, values in zip(new_ids, new_values):
+            key = self.sort_value(column, values[column])
+            row = insertion_row(self._sort_keys, key, self._sort_order)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._ids.insert(row, article_id)
+            self._sort_keys.insert(row, key)
+            for i, value in enumerate(values):
+                self._columns[i].insert(row, value)
+                if value is not None and not is_number(value):
+                    self._numeric[i] = False
+            self.endInsertRows()
+
+        # Rows after each insertion have moved, so the rows of the articles are found once for the whole batch
+        self._rows = {a_id: row for row, a_id in enumerate(self._ids)}
+
+    def remove_articles(self, article_ids):
+        """
+        Removes articles from the model. Contiguous rows are removed together.
+
+        Args:
+            article_ids: Iterable of article ids.
+
+        Returns:
+            None
+        """
+        rows = sorted((self._rows[a_id] for a_id in set(article_ids) if a_id in self._rows), reverse=True)
+        if not rows:
+            return
+
+        # Group the rows into contiguous ranges, removing from the end so the earlier rows are not shifted
+        ranges = []
+        start = end = rows[0]
+        for row in rows[1:]:
+            if row == start - 1:
+                start = row
+            else:
+                ranges.append((start, end))
+                start = end = row
+        ranges.append((start, end))
+
+        for start, end in ranges:
+            self.beginRemoveRows(QModelIndex(), start, end)
+            del self._ids[start:end + 1]
+            for column in self._columns:
+                del column[start:end + 1]
+            if self._sort_keys is not None:
+                del self._sort_keys[start:end + 1]
+            self.endRemoveRows()
+
+        self._rows = {a_id: row for row, a_id in enumerate(self._ids)}
+
+    def update_articles(self, article_ids):
+        """
+        Re-reads the metadata of articles already in the model, for example after they have been edited.
+
+        Args:
+            article_ids: Iterable of article ids.
+
+        Returns:
+            None
+        """
+        for article_id in article_ids:
+            row = self._rows.get(article_id)
+            if row is None:
+                continue
+            for column, value in enumerate(self._extract(article_id)):
+                self._columns[column][row] = value
+                if value is not None and not is_number(value):
+                    self._numeric[column] = False
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.headers) - 1))
+
+        self.resort()
+
+    def set_articles(self, article_ids):
+        """
+        Replaces the contents of the model.
+
+        Args:
+            article_ids: Iterable of article ids.
+
+        Returns:
+            None
+        """
+        self.beginResetModel()
+        self._ids = []
+        self._rows = {}
+        self._columns = [[] for _ in self.headers]
+        self._numeric = [True for _ in self.headers]
+        for article_id in article_ids:
+            if article_id not in self._rows and article_id in self.articles:
+                self._rows[article_id] = len(self._ids)
+                self._ids.append(article_id)
+                self._append_values(self._extract(article_id))
+        self.endResetModel()
+
+        self.resort()
+
+    def set_headers(self, headers: list):
+        """
+        Changes the columns of the model, keeping the same articles.
+
+        Args:
+            headers: Metadata key names in the order in which they appear as columns.
+
+        Returns:
+            None
+        """
+        self.headers = list(headers)
+        self.set_articles(self._ids)
+
+
+class ArticleSortProxy(QSortFilterProxyModel):
+    """
+    Proxy model through which the view sorts articles.
+
+    Sorting with the default QSortFilterProxyModel compares rows through the SORT_ROLE of the source model, which calls
+    back into Python for every comparison. Sort requests are instead passed on to the ArticleTableModel, which orders its
+    column store in one pass, and the proxy presents the rows in source order.
+
+    The proxy also filters the rows down to a set of visible article ids, such as the results of a search.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSortRole(SORT_ROLE)
+
+        # Article ids to show, or None to show all articles
+        self.visible = None
+
+    def sort(self, column: int, order=Qt.AscendingOrder):
+        self.sourceModel().sort(column, order)
+
+    def set_visible_ids(self, article_ids):
+        """
+        Shows only the given articles.
+
+        Args:
+            article_ids: Iterable of article ids, or None to show all articles.
+
+        Returns:
+            None
+        """
+        self.visible = None if article_ids is None else set(article_ids)
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if self.visible is None:
+            return True
+        return self.sourceModel().article_id(source_row) in self.visible
+
+
+class ArticleTreeView(QTreeView):
+    """
+    Sortable, multiple selection view of an ArticleTableModel. Articles are queued and inserted in batches, and columns
+    are resized to their contents once changes have settled rather than after every insert.
+    """
+
+    def __init__(self, articles: dict, headers: list, parent=None):
+        """
+        Args:
+            articles: Dictionary of article id: Article object pairs that rows are looked up from.
+            headers: Metadata key names in the order in which they appear as columns.
+            parent: Optional QWidget parent.
+
+        Returns:
+            None
+        """
+        super().__init__(parent)
+
+        self.source_model = ArticleTableModel(articles, headers, self)
+        self.proxy_model = ArticleSortProxy(self)
+        self.proxy_model.setSourceModel(self.source_model)
+        self.setModel(self.proxy_model)
+
+        # Format tree to allow for multiple items to be selected
+        self.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.setSelectionBehavior(QAbstractItemView.SelectRows)
+        # Rows are flat and of equal height, which lets the view skip measuring each one
+        self.setRootIsDecorated(False)
+        self.setUniformRowHeights(True)
+        # Allow for sorting by clicking on headers
+        self.setSortingEnabled(True)
+        self.sortByColumn(-1, Qt.AscendingOrder)
+
+        self.pending_ids = []
+        self.insert_timer = QTimer(self)
+        self.insert_timer.setSingleShot(True)
+        self.insert_timer.setInterval(INSERT_INTERVAL)
+        self.insert_timer.timeout.connect(self.flush)
+
+        self.resize_timer = QTimer(self)
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.setInterval(RESIZE_INTERVAL)
+        self.resize_timer.timeout.connect(self.resize_columns)
+
+    #####
+    # Update Functions
+    #####
+
+    def queue_article(self, article_id):
+        """
+        Queues an article to be added to the view with the next batch.
+        """
+        self.pending_ids.append(article_id)
+        if not self.insert_timer.isActive():
+            self.insert_timer.start()
+
+    def flush(self):
+        """
+        Inserts all queued articles.
+        """
+        self.insert_timer.stop()
+        if self.pending_ids:
+            pending, self.pending_ids = self.pending_ids, []
+            self.source_model.add_articles(pending)
+            self.schedule_resize()
+
+    def set_articles(self, article_ids):
+        """
+        Replaces the articles shown in the view.
+        """
+        self.pending_ids = []
+        self.insert_timer.stop()
+        self.source_model.set_articles(article_ids)
+        self.schedule_resize()
+
+    def sync_articles(self, article_ids):
+        """
+        Makes the view hold exactly the given articles, inserting and removing only the rows that differ.
+        """
+        self.flush()
+        article_ids = list(article_ids)
+        target = set(article_ids)
+        current = set(self.source_model.ids())
+
+        self.source_model.remove_articles(current - target)
+        self.source_model.add_articles(a_id for a_id in article_ids if a_id not in current)
+        self.schedule_resize()
+
+    def remove_articles(self, article_ids):
+        """
+        Removes articles from the view.
+        """
+        article_ids = set(article_ids)
+        self.pending_ids = [a_id for a_id in self.pending_ids if a_id not in article_ids]
+        self.source_model.remove_articles(article_ids)
+
+    def update_articles(self, article_ids):
+        """
+        Re-reads the metadata of articles shown in the view.
+        """
+        self.source_model.update_articles(article_ids)
+        self.schedule_resize()
+
+    def show_only(self, article_ids):
+        """
+        Hides all articles other than those given, without removing any rows from the model.
+        """
+        self.flush()
+        self.proxy_model.set_visible_ids(article_ids)
+
+    def show_all(self):
+        """
+        Shows all articles hidden by show_only.
+        """
+        self.proxy_model.set_visible_ids(None)
+
+    def set_headers(self, headers: list):
+        """
+        Changes the columns shown in the view.
+        """
+        self.flush()
+        self.source_model.set_headers(headers)
+        self.schedule_resize()
+
+    def schedule_resize(self):
+        """
+        Restarts the timer after which the columns are resized.
+        """
+        self.resize_timer.start()
+
+    def resize_columns(self):
+        """
+        Adjusts the size of the columns to the contents.
+        """
+        for column in range(self.source_model.columnCount()):
+            self.resizeColumnToContents(column)
+
+    #####
+    # Selection Functions
+    #####
+
+    def selected_ids(self):
+        """
+        Returns the set of article ids of the selected rows.
+        """
+        ids = set()
+        for index in self.selectionModel().selectedRows(0):
+            ids.add(self.proxy_model.data(index, ID_ROLE))
+        return ids
+
+    def visible_ids(self):
+        """
+        Returns the list of article ids of all rows shown, in display order.
+        """
+        self.flush()
+        proxy = self.proxy_model
+        return [proxy.data(proxy.index(row, 0), ID_ROLE) for row in range(proxy.rowCount())]
+
+    def index_id(self, index):
+        """
+        Returns the article id of the row of a view index.
+        """
+        return self.proxy_model.data(index, ID_ROLE)
+
+    def row_count(self):
+        """
+        Returns the number of articles shown, or waiting to be shown, in the view.
+        """
+        return self.proxy_model.rowCount() + len(self.pending_ids)
@@ -3,15 +3,19 @@
 """
 import collections
 import time
+from functools import partial
 
-from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QProgressBar, QAbstractItemView, QTreeWidget, QTreeWidgetItem,
-                             QLineEdit, QHBoxLayout, QComboBox, QPushButton, QDialog, QGridLayout, QSizePolicy,
-                             QCheckBox)
-from PyQt5.QtCore import (QThread, pyqtSignal, pyqtSlot, QObject)
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QProgressBar, QLineEdit, QHBoxLayout, QComboBox, QPushButton,
+                             QDialog, QGridLayout, QSizePolicy, QCheckBox)
+from PyQt5.QtCore import (QThread, QTimer, pyqtSlot)
 
 from Figshare_desktop.formatting.formatting import (search_bar, search_combo, press_button)
 
-from Figshare_desktop.figshare_articles.determine_type import gen_article
+from Figshare_desktop.custom_widgets.article_table_model import ArticleTreeView
+from Figshare_desktop.custom_widgets.facet_sidebar import FacetSidebar
+from Figshare_desktop.custom_widgets.article_list import ArticleLoadWorker
+from Figshare_desktop.background_jobs.concurrency import DEFAULT_MAX_WORKERS
+from Figshare_desktop.local_store.offline_mirror import mirror_key
 from figshare_interface import Collections
 
 __author__ = "Tobias Gill"
@@ -22,18 +26,28 @@ __maintainer__ = "Tobias Gill"
 __email__ = "toby.gill.09@ucl.ac.uk"
 __status__ = "Development"
 
+# Time in milliseconds after the user stops typing before the search is run
+SEARCH_DELAY = 300
+
+# Fields offered in the facet sidebar, where they are keyword or id fields of the index
+FACET_FIELDS = ('defined_type', 'tags', 'categories', 'authors', 'users', 'sample', 'substrate', 'notebook')
+
 
 class ArticleList(QWidget):
 
-    def __init__(self, app, OAuth_token, collection_id, parent):
+    def __init__(self, app, OAuth_token, collection_id, parent, max_workers: int=DEFAULT_MAX_WORKERS):
         super().__init__()
 
         self.app = app
         self.token = OAuth_token
         self.collection_id = collection_id
         self.parent = parent
+        # Maximum number of concurrent Figshare requests made while loading articles
+        self.max_workers = max_workers
 
         self.__threads = []
+        # Worker loading the current article listing
+        self.load_worker = None
 
         self.initFig()
         self.initUI()
@@ -43,12 +57,28 @@ class ArticleList(QWidget):
         Initial data load from Figshare
         :return:
         """
-        # Get the list of articles from
+        # Get the list of articles from the offline mirror, which is refreshed from Figshare in the background
         collections = Collections(self.token)
-        articles = collections.get_articles(self.collection_id)
-        n_articles = len(articles)
+        key = mirror_key('collection_articles', self.collection_id)
+        articles = self.parent.mirror_sync.load(key, partial(collections.get_articles, self.collection_id),
+                                                self.on_articles_changed, default=[])
+        self.load_articles(articles)
+
+    def load_articles(self, articles: list, refresh: bool=False):
+        """
+        Creates local versions of the given articles in a background thread, adding each to the tree once it is loaded.
+        :param articles: list of dicts. Figshare article listing
+        :param refresh: bool. If True articles that already have a local version are reloaded if they have been
+            modified on Figshare
+        :return:
+        """
+        # A loader of an older listing stops fetching articles, as any still listed are loaded by the new worker
+        if self.load_worker is not None:
+            self.load_worker.abort()
 
-        worker = ArticleLoadWorker(self.app, self.token, self.parent, self.collection_id, articles)
+        worker = CollectionArticleLoadWorker(self.app, self.token, self.parent, self.collection_id, articles,
+                                             max_workers=self.max_workers, refresh=refresh)
+        self.load_worker = worker
 
         thread = QThread()
         thread.setObjectName('thread_article_load')
@@ -57,6 +87,7 @@ class ArticleList(QWidget):
         worker.moveToThread(thread)
 
         worker.sig_step.connect(self.add_to_tree)
+        worker.sig_refreshed.connect(self.update_in_tree)
         worker.sig_done.connect(self.update_search_field)
         worker.sig_done.connect(self.enable_fields)
 
@@ -68,10 +99,44 @@ class ArticleList(QWidget):
         for article in articles:
             self.article_ids.add(article['id'])
 
+    def on_articles_changed(self, key: str, articles: list):
+        """
+        Called when a background sync of the offline mirror finds that the article listing has changed on Figshare.
+        Loads any new articles, reloads those modified since they were loaded, and removes those no longer listed from
+        the tree and the index.
+        :param key: str. Mirror key of the article listing
+        :param articles: list of dicts. Updated article listing
+        :return:
+        """
+        self.remove_unlisted_articles(articles)
+        self.load_articles(articles, refresh=True)
+        self.fill_tree(None, self.article_ids)
+
+    def remove_unlisted_articles(self, articles: list):
+        """
+        Removes articles that were in the previous listing, but have since been deleted or moved outside the app, from
+        the local articles, the article cache, and the persistent index. Articles still in another mirrored listing are
+        kept.
+        :param articles: list of dicts. Updated article listing
+        :return:
+        """
+        listed_ids = {str(article['id']) for article in articles}
+        listed_ids.update(self.parent.local_mirror.listed_article_ids())
+        article_ids = [str(article['id']) for article in self.articles if str(article['id']) not in listed_ids]
+        if not article_ids:
+            return
+
+        for article_id in article_ids:
+            self.parent.figshare_articles.pop(article_id, None)
+        self.parent.article_cache.remove(article_ids)
+        self.parent.figshare_article_index.removeDocumentsByTerm('figshare_articles', 'id', article_ids)
+
     def initUI(self):
 
         # Initialise the article QTree
         self.initTree()
+        # Initialise the facet sidebar used to filter the tree
+        self.initFacets()
 
         # Create horizontal layout for the search bar and fields
         search_layout = QHBoxLayout()
@@ -88,8 +153,11 @@ class ArticleList(QWidget):
 
         # Add the search layout to the vertical layout
         vbox.addLayout(search_layout)
-        # Add the Article tree to the layout
-        vbox.addWidget(self.tree)
+        # Add the facet sidebar and Article tree to the layout
+        tree_layout = QHBoxLayout()
+        tree_layout.addWidget(self.facet_sidebar, 1)
+        tree_layout.addWidget(self.tree, 4)
+        vbox.addLayout(tree_layout)
 
         # Set Widget layout
         self.setLayout(vbox)
@@ -104,22 +172,34 @@ class ArticleList(QWidget):
         :return:
         """
 
-        # Create instance of QTreeWidget
-        tree = QTreeWidget()
-        # Format tree to allow for multiple items to be selected
-        tree.setSelectionMode(QAbstractItemView.ExtendedSelection)
-        # Allow for sorting by clicking on headers
-        tree.setSortingEnabled(True)
-
         # Create the initial set of column headers
         headers = ['id', 'title', 'created_date', 'up_to_date', 'type', 'tags']
-        header_item = QTreeWidgetItem(headers)
-        tree.setHeaderItem(header_item)
+
+        # Create a sortable view of the Figshare articles. Rows are only generated as they are drawn.
+        tree = ArticleTreeView(self.parent.figshare_articles, headers)
 
         self.tree = tree
 
         self.tree_headers = headers
 
+    def initFacets(self):
+        """
+        Called to initialise the facet sidebar
+        :return:
+        """
+        # Article ids matching the current search, or None when not searching
+        self.search_ids = None
+
+        self.facet_sidebar = FacetSidebar()
+        self.facet_sidebar.sig_filter_changed.connect(self.apply_filters)
+
+    def article_index(self):
+        """
+        Returns the search index holding the articles of the list, and the name of its schema
+        :return: ArticleIndex, str
+        """
+        return self.parent.figshare_article_index, 'figshare_articles'
+
     def search_bar(self):
         """
         Creates a QLineEdit object for the user to enter a search query
@@ -139,6 +219,12 @@ class ArticleList(QWidget):
         edit.setToolTipDuration(2000)
         # Connect search function to the return key
         edit.returnPressed.connect(self.search_on_return)
+        # Also search as the user types, once they pause
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY)
+        self.search_timer.timeout.connect(self.search_on_return)
+        edit.textEdited.connect(lambda text: self.search_timer.start())
         # Connect the clear button to our own function
         edit.children()[2].triggered.connect(self.search_on_clear)
 
@@ -199,6 +285,9 @@ class ArticleList(QWidget):
         fields = self.parent.figshare_article_index.get_fields(schema='figshare_articles')
         self.search_field_combo.addItems(fields)
 
+        # New fields may have been added to the index, so refresh the facets
+        self.apply_filters()
+
     @pyqtSlot(bool)
     def enable_fields(self):
         """
@@ -222,38 +311,34 @@ class ArticleList(QWidget):
 
     def fill_tree(self, headers: list, article_ids: set):
         """
-        Called to fill the QTree with articles
+        Called to make the QTree hold the given articles. Only the rows that differ are inserted or removed.
 
         Args:
-            headers: Metadata key names in order to which appear in the QTreeWidget.
+            headers: Metadata key names in order to which appear in the tree.
             article_ids: Set of Figshare article ID numbers from to fill tree with.
 
         Returns:
             None
         """
-        self.tree.clear()
-        for article_id in article_ids:
-            self.add_to_tree(article_id, headers=headers)
+        self.tree.sync_articles(str(article_id) for article_id in article_ids)
 
     @pyqtSlot(int)
-    def add_to_tree(self, article_id: int, headers: list=None):
+    def add_to_tree(self, article_id: int):
         """
         Adds a single article to the QTree
         :param article_id: int. or str. figshare article id
         :return:
         """
-        if headers is None:
-            headers = self.tree_headers
+        # Articles are inserted in batches and the columns resized once the batch has settled
+        self.tree.queue_article(str(article_id))
 
-        article_id = str(article_id)
-
-        local_article = self.parent.figshare_articles[article_id]
-        local_article.gen_qtree_item(headers, local_article.input_dicts())
-        self.tree.addTopLevelItem(local_article.qtreeitem)
-
-        # Adjust the size of the columns to the contents
-        for column in range(self.tree.columnCount()):
-            self.tree.resizeColumnToContents(column)
+    def update_in_tree(self, article_ids: list):
+        """
+        Re-reads the rows of articles that have been reloaded
+        :param article_ids: list of str. figshare article ids
+        :return:
+        """
+        self.tree.update_articles(article_ids)
 
     def update_headers(self, headers):
         """
@@ -261,13 +346,7 @@ class ArticleList(QWidget):
         :param headers: list of strings. in Order for the different column headers
         :return:
         """
-        header_item = QTreeWidgetItem(headers)
-        self.tree.setHeaderItem(header_item)
-        self.tree.clear()
-        self.fill_tree(headers, self.article_ids)
-        # Adjust the size of the columns to the contents
-        for column in range(self.tree.columnCount()):
-            self.tree.resizeColumnToContents(column)
+        self.tree.set_headers(headers)
 
     def search_on_return(self):
         """
@@ -291,7 +370,9 @@ class ArticleList(QWidget):
                 if 'id' in val_dict:
                     self.result_ids.add(val_dict['id'])
 
-            self.fill_tree(self.tree_headers, self.result_ids)
+            # Hide the articles not in the results rather than refilling the tree
+            self.search_ids = {str(article_id) for article_id in self.result_ids}
+            self.apply_filters()
 
     def search_on_clear(self):
         """
@@ -299,7 +380,34 @@ class ArticleList(QWidget):
         :param search_text: search bar text
         :return:
         """
-        self.fill_tree(self.tree_headers, self.article_ids)
+        self.search_ids = None
+        self.apply_filters()
+
+    def apply_filters(self):
+        """
+        Shows the articles matching both the current search and the facets checked in the sidebar. The facet counts are
+        updated to the articles in the list matching the search.
+        :return:
+        """
+        article_index, schema = self.article_index()
+        if article_index is None:
+            return
+        self.facet_sidebar.set_facets(article_index.facets(schema, FACET_FIELDS))
+
+        # The index may also hold articles that are not in this list
+        self.tree.flush()
+        scope = set(self.tree.source_model.ids())
+        if self.search_ids is not None:
+            scope &= self.search_ids
+        self.facet_sidebar.set_scope(scope)
+
+        facet_ids = self.facet_sidebar.filter_ids()
+        if self.search_ids is None and facet_ids is None:
+            self.tree.show_all()
+        elif facet_ids is None:
+            self.tree.show_only(scope)
+        else:
+            self.tree.show_only(scope & facet_ids)
 
     def on_headers_set_pressed(self):
         """
@@ -395,13 +503,7 @@ class ArticleList(QWidget):
         Can be called to return a list of the article id numbers of all selected articles
         :return:
         """
-        items = self.tree.selectedItems()
-
-        article_ids = set()
-        for item in items:
-            article_ids.add(int(item.text(0)))
-
-        return article_ids
+        return set(int(article_id) for article_id in self.tree.selected_ids())
 
     def get_all(self):
         """
@@ -409,13 +511,8 @@ class ArticleList(QWidget):
         :return:
         """
         self.tree.selectAll()
-        items = self.tree.selectedItems()
-
-        article_ids = set()
-        for item in items:
-            article_ids.add(int(item.text(0)))
 
-        return article_ids
+        return set(int(article_id) for article_id in self.tree.visible_ids())
 
     #####
     # Figshare API Functions
@@ -444,110 +541,24 @@ class ArticleList(QWidget):
             return []
 
 
-class ArticleLoadWorker(QObject):
-
-    sig_step = pyqtSignal(int)
-    sig_done = pyqtSignal(bool)
-
-    def __init__(self, app, OAuth_token: str, parent, collection_id: int, articles: list):
-        super().__init__()
-        self.__abort = False
+class CollectionArticleLoadWorker(ArticleLoadWorker):
+    """
+    Loads the articles of a collection. Collection articles do not belong to a project, so their modified dates are
+    requested through the collections interface.
+    """
 
-        self.app = app
-        self.token = OAuth_token
-        self.parent = parent
+    def __init__(self, app, OAuth_token: str, parent, collection_id: int, articles: list,
+                 max_workers: int=DEFAULT_MAX_WORKERS, refresh: bool=False):
+        super().__init__(app, OAuth_token, parent, None, articles, max_workers=max_workers, refresh=refresh)
         self.collection_id = collection_id
-        self.articles = articles
-
-        self.n_articles = len(articles)
-
-    @pyqtSlot()
-    def work(self):
-        """
 
-        :return:
+    def fetch_modified_date(self, article_id: str):
         """
-        if self.n_articles > 0:
-            for article in self.articles:
-                self.create_local_article(article)
-                self.sig_step.emit(article['id'])
-
-            self.sig_done.emit(True)
-
-    def abort(self):
-        self.__abort = True
-
-    def create_local_article(self, article):
+        Requests the current modified date of an article from Figshare.
+        :param article_id: str. Figshare article id number
+        :return: str. Modified date of the article
         """
-        Given a Figshare article id number this function will create a local version if one does not already exist
-        :param article: Dict. Figshare article returned from Projects.list_articles()
-        :return:
-        """
-        # Get the article id number and title
-        article_id = str(article['id'])  # Convert int to str
-        article_title = article['title']
-
-        # If article is not already stored locally create a
-        if not self.does_article_exist_locally(article_id):
-            article = gen_article(article_title, self.token, None, article_id)
-            self.parent.figshare_articles[article_id] = article
-
-            # Locally reference the Figshare Article Index
-            article_index = self.parent.figshare_article_index
-
-            # Get the type of the article
-            article_type = article.get_type()
-
-            # Check to see if the article type has been added to the articles index.
-            # If note we will need to create new fields in the schema.
-            if article_type not in article_index.document_types:
-                # Add the new file type to the index schema
-                article_index.document_types.add(article_type)
-
-                # Define the schema we wish to add fields to
-                schema = 'figshare_articles'
-
-                # From the article type created get the index dictionary and add fields to the index
-                for field_name, field_type in article.index_schema().items():
-                    if field_name not in article_index.get_fields(schema):
-                        if field_type[0] == 'id':
-                            article_index.add_ID(schema=schema, field_name=field_name, stored=field_type[1],
-                                             unique=True)
-                        elif field_type[0] == 'text':
-                            article_index.add_TEXT(schema, field_name, field_type[1])
-                        elif field_type[0] == 'keyword':
-                            article_index.add_KEYWORD(schema, field_name, field_type[1])
-                        elif field_type[0] == 'numeric':
-                            article_index.add_NUMERIC(schema, field_name, field_type[1])
-                        elif field_type[0] == 'datetime':
-                            article_index.add_DATETIME(schema, field_name, field_type[1])
-                        elif field_type[0] == 'boolean':
-                            article_index.add_BOOLEAN(schema, field_name, field_type[1])
-                        elif field_type[0] == 'ngram':
-                            article_index.add_NGRAM(schema, field_name, field_type[1])
-
-            # Get single dictionary of all fields associated to the article
-            document_dict = {}
-            for d in article.input_dicts():
-                document_dict = {**document_dict, **d}
-
-            # Add document to index
-            article_index.addDocument(schema='figshare_articles', data_dict=document_dict)
-
-    def does_article_exist_locally(self, article_id):
-        """
-        Checks to see if there is a local version of the article.
-        :param article_id: int. Figshare article id number
-        :return: Bool. Dependent on if local version of article exists or not
-        """
-
-        # Convert article id to a string. Should have already been done, but just in case we call it somewhere else
-        a_id = str(article_id)
-
-        if a_id in self.parent.figshare_articles:
-            return True
-        else:
-            return False
+        return Collections(self.token).get_article(article_id)['modified_date']
 
 
 class OrderedSet(collections.OrderedDict, collections.MutableSet):
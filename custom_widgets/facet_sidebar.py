@@ -0,0 +1,186 @@
+"""
+Facet Sidebar
+
+Tree of the values of the facet fields of an article index, with the number of articles holding each value. Checking
+values narrows the articles shown to those holding any checked value of a field, and all fields with checked values.
+Filtering and recounting are done by intersecting the sets of article ids of each value, so no search is run.
+"""
+
+from PyQt5.QtWidgets import (QTreeWidget, QTreeWidgetItem)
+from PyQt5.QtCore import (Qt, pyqtSignal, pyqtSlot)
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+
+class FacetSidebar(QTreeWidget):
+    """
+    Checkable tree of facet field values and their article counts.
+    """
+
+    sig_filter_changed = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.setHeaderHidden(True)
+        self.setRootIsDecorated(True)
+
+        # Article ids of each value of each field, as returned by ArticleIndex.facets()
+        self.facets = {}
+        # Article ids that the counts are restricted to, or None for all articles
+        self.scope = None
+        # Checked values of each field
+        self.selected = {}
+        # Tree items of each field value
+        self.value_items = {}
+
+        self.itemChanged.connect(self.on_item_changed)
+
+    #####
+    # Facet Functions
+    #####
+
+    def set_facets(self, facets: dict):
+        """
+        Replaces the facet values shown. Checked values that are still present stay checked.
+
+        Args:
+            facets: Dictionary of field name: {value: frozenset of article ids}.
+
+        Returns:
+            None
+        """
+        # The index caches its facets, so unchanged fields are the same objects as before
+        if facets.keys() == self.facets.keys() and all(facets[f] is self.facets[f] for f in facets):
+            return
+
+        self.facets = facets
+        self.selected = {field: {value for value in values if value in facets.get(field, {})}
+                         for field, values in self.selected.items() if field in facets}
+        self.rebuild()
+
+    def set_scope(self, article_ids):
+        """
+        Restricts the counts to a set of articles, such as those in the list and matching the current search.
+
+        Args:
+            article_ids: Set of article ids, or None to count all articles.
+
+        Returns:
+            None
+        """
+        self.scope = None if article_ids is None else frozenset(article_ids)
+        self.update_counts()
+
+    def field_filter(self, field: str):
+        """
+        Returns the ids of the articles holding any checked value of a field, or None if no value is checked.
+        """
+        values = self.selected.get(field)
+        if not values:
+            return None
+        groups = self.facets.get(field, {})
+        return frozenset().union(*(groups.get(value, frozenset()) for value in values))
+
+    def filter_ids(self, exclude: str=None):
+        """
+        Returns the ids of the articles passing the checked values of every field, or None if no value is checked.
+
+        Args:
+            exclude: Optional field whose checked values are ignored.
+
+        Returns:
+            frozenset or None
+        """
+        ids = None
+        for field in self.selected:
+            if field == exclude:
+                continue
+            field_ids = self.field_filter(field)
+            if field_ids is not None:
+                ids = field_ids if ids is None else ids & field_ids
+        return ids
+
+    def clear_selection(self):
+        """
+        Unchecks all values.
+        """
+        self.selected = {}
+        self.rebuild()
+        self.sig_filter_changed.emit()
+
+    #####
+    # Tree Functions
+    #####
+
+    def rebuild(self):
+        """
+        Recreates the tree items from the facets.
+        """
+        self.blockSignals(True)
+        self.clear()
+        self.value_items = {}
+
+        for field, groups in self.facets.items():
+            if not groups:
+                continue
+            field_item = QTreeWidgetItem(self, [field])
+            field_item.setFlags(Qt.ItemIsEnabled)
+            for value in sorted(groups, key=str):
+                item = QTreeWidgetItem(field_item, [str(value)])
+                item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsUserCheckable)
+                item.setData(0, Qt.UserRole, (field, value))
+                checked = value in self.selected.get(field, ())
+                item.setCheckState(0, Qt.Checked if checked else Qt.Unchecked)
+                self.value_items[(field, value)] = item
+            field_item.setExpanded(True)
+
+        self.blockSignals(False)
+        self.update_counts()
+
+    def update_counts(self):
+        """
+        Updates the count of each value to the number of articles in scope that also pass the checked values of the
+        other fields. Values with no such articles are hidden unless checked.
+        """
+        self.blockSignals(True)
+        for field, groups in self.facets.items():
+            # Checking a value of a field widens the results, so counts ignore the field's own checked values
+            within = self.filter_ids(exclude=field)
+            if self.scope is not None:
+                within = self.scope if within is None else within & self.scope
+
+            for value, ids in groups.items():
+                item = self.value_items.get((field, value))
+                if item is None:
+                    continue
+                count = len(ids) if within is None else len(ids & within)
+                item.setText(0, '{} ({})'.format(value, count))
+                item.setHidden(count == 0 and value not in self.selected.get(field, ()))
+        self.blockSignals(False)
+
+    @pyqtSlot(QTreeWidgetItem, int)
+    def on_item_changed(self, item: QTreeWidgetItem, column: int):
+        """
+        Called when a value is checked or unchecked.
+        """
+        key = item.data(0, Qt.UserRole)
+        if key is None:
+            return
+        field, value = key
+        values = self.selected.setdefault(field, set())
+        if item.checkState(0) == Qt.Checked:
+            values.add(value)
+        else:
+            values.discard(value)
+        if not values:
+            del self.selected[field]
+
+        self.update_counts()
+        self.sig_filter_changed.emit()
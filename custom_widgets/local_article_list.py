@@ -5,14 +5,14 @@ import collections
 import time
 from elasticsearch import Elasticsearch
 
-from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QProgressBar, QAbstractItemView, QTreeWidget, QTreeWidgetItem,
-                             QLineEdit, QHBoxLayout, QComboBox, QPushButton, QDialog, QGridLayout, QSizePolicy,
-                             QCheckBox)
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QProgressBar, QLineEdit, QHBoxLayout, QComboBox, QPushButton,
+                             QDialog, QGridLayout, QSizePolicy, QCheckBox)
 from PyQt5.QtCore import (QThread, pyqtSignal, pyqtSlot, QObject)
 
 from Figshare_desktop.formatting.formatting import (search_bar, search_combo, press_button)
 
 from Figshare_desktop.custom_widgets.article_list import ArticleList
+from Figshare_desktop.custom_widgets.article_table_model import ArticleTreeView
 from Figshare_desktop.figshare_articles.determine_type import gen_article
 from figshare_interface import Projects
 
@@ -44,20 +44,15 @@ class LocalArticleList(ArticleList):
 
     def initTree(self):
         """
-        Called to initalise the QTreeWidget
+        Called to initalise the article tree view
         :return:
         """
 
-        tree = QTreeWidget()
-        # Format tree to allow for multiple items to be selected
-        tree.setSelectionMode(QAbstractItemView.ExtendedSelection)
-        # Allow for sorting of columns
-        tree.setSortingEnabled(True)
-
         # Create the initial set of column headers
         headers = ['id', 'title', 'type', 'tags']
-        header_item = QTreeWidgetItem(headers)
-        tree.setHeaderItem(header_item)
+
+        # Create a sortable view of the local articles. Rows are only generated as they are drawn.
+        tree = ArticleTreeView(self.parent.local_articles, headers)
 
         self.tree = tree
         self.tree_headers = headers
@@ -82,22 +77,24 @@ class LocalArticleList(ArticleList):
         fields = self.parent.local_article_index.get_fields(schema='local_articles')
         self.search_field_combo.addItems(fields)
 
+        # New fields may have been added to the index, so refresh the facets
+        self.apply_filters()
+
+    def article_index(self):
+        """
+        Returns the search index holding the local articles, and the name of its schema
+        :return: ArticleIndex, str
+        """
+        return self.parent.local_article_index, 'local_articles'
+
     @pyqtSlot(str)
-    def add_to_tree(self, local_article_id: str, headers: list=None):
+    def add_to_tree(self, local_article_id: str):
         """
-        Attempts to parse and
-        :param local_article_id:
+        Queues a local article to be added to the tree
+        :param local_article_id: str. local article id
         :return:
         """
-        if headers is None:
-            headers = self.tree_headers
-
-        local_article = self.parent.local_articles[local_article_id]
-        local_article.gen_qtree_item(self.tree_headers, local_article.input_dicts())
-        self.tree.addTopLevelItem(local_article.qtreeitem)
-
-        for column in range(self.tree.columnCount()):
-            self.tree.resizeColumnToContents(column)
+        self.tree.queue_article(local_article_id)
 
     def search_on_return(self):
         """
@@ -120,7 +117,9 @@ class LocalArticleList(ArticleList):
                 if 'id' in val_dict:
                     self.result_ids.add(val_dict['id'])
 
-            self.fill_tree(self.tree_headers, self.result_ids)
+            # Hide the articles not in the results rather than refilling the tree
+            self.search_ids = {str(article_id) for article_id in self.result_ids}
+            self.apply_filters()
             self.parent.data_articles_window.check_edit()
 
     def search_on_clear(self):
@@ -128,7 +127,8 @@ class LocalArticleList(ArticleList):
         Called when the clear button is pressed within the search bar
         :return:
         """
-        self.fill_tree(self.tree_headers, self.article_ids)
+        self.search_ids = None
+        self.apply_filters()
         self.parent.data_articles_window.check_edit()
 
     def on_headers_set_pressed(self):
@@ -199,13 +199,7 @@ class LocalArticleList(ArticleList):
         Can be called to return a list of the article id numbers of all selected articles
         :return:
         """
-        items = self.tree.selectedItems()
-
-        article_ids = set()
-        for item in items:
-            article_ids.add(item.text(0))
-
-        return article_ids
+        return self.tree.selected_ids()
 
     def get_all(self):
         """
@@ -213,13 +207,8 @@ class LocalArticleList(ArticleList):
         :return:
         """
         self.tree.selectAll()
-        items = self.tree.selectedItems()
-
-        article_ids = set()
-        for item in items:
-            article_ids.add(item.text(0))
 
-        return article_ids
+        return set(self.tree.visible_ids())
 
     def add_to_articles(self, article_id):
         """
@@ -0,0 +1,303 @@
+"""
+Chunked Upload
+
+Uploads local files to Figshare using the Figshare multi-part upload API, recording each confirmed step in an
+UploadJournal. If an upload is interrupted, by a network drop or the application closing, it can be continued from the
+last confirmed file part, either by uploading the same file to the same project again or from the journal's list of
+incomplete uploads when the application next starts, rather than creating a second article and re-sending the whole
+file.
+
+The Figshare upload process is:
+
+    1. Create an article in the project.
+    2. Initiate a file upload with the file name, size, and md5 to get an upload url.
+    3. Ask the upload url for the list of file parts and send each part that is not yet complete.
+    4. Mark the file upload as complete.
+
+The API base url can be changed so that uploads can be tested against a local stand-in Figshare server.
+"""
+
+import os
+import hashlib
+
+from requests import HTTPError
+
+# Figshare Desktop Imports
+from Figshare_desktop.network.transport import default_transport
+from Figshare_desktop.local_store.upload_journal import (STATE_COMPLETE, STATE_CREATED, STATE_INITIATED)
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+FIGSHARE_API = 'https://api.figshare.com/v2'
+
+# Size of the blocks used when hashing files
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_md5(local_path: str):
+    """
+    Computes the MD5 hex digest of a file without reading it into memory all at once.
+
+    Args:
+        local_path: Path to the local file.
+
+    Returns:
+        md5 (str)
+    """
+    md5 = hashlib.md5()
+    with open(local_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            md5.update(block)
+    return md5.hexdigest()
+
+
+class ChunkedUploader(object):
+    """
+    Resumable uploader of single file articles.
+    """
+
+    def __init__(self, OAuth_token: str, journal, api_base: str=FIGSHARE_API, timeout: float=60.):
+        """
+        Args:
+            OAuth_token: Authentication token generated from Figshare login.
+            journal: UploadJournal in which upload progress is recorded.
+            api_base: Base url of the Figshare API.
+            timeout: Timeout in seconds of each request.
+
+        Returns:
+            None
+        """
+        self.token = OAuth_token
+        self.journal = journal
+        self.api_base = api_base.rstrip('/')
+        self.timeout = timeout
+
+    #####
+    # Upload Functions
+    #####
+
+    def upload(self, project_id: int, local_path: str, upload_dict: dict):
+        """
+        Uploads a file to a new article in the given project, resuming a previous attempt if one was interrupted.
+
+        Args:
+            project_id: Figshare project ID number.
+            local_path: Path to the local file.
+            upload_dict: Figshare metadata for the new article.
+
+        Returns:
+            article_id (int): Figshare article ID number.
+            bytes_sent (int): Number of file bytes sent. Less than the file size if the upload was resumed.
+
+        Raises:
+            FileExistsError: If the unchanged file has already been uploaded to an article the project still holds.
+            HTTPError: If a request to Figshare fails.
+        """
+        local_path = os.path.abspath(local_path)
+        stat = os.stat(local_path)
+
+        entry = self.journal.get(local_path, project_id)
+
+        if entry is not None and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+            if entry['state'] == STATE_COMPLETE:
+                if self.article_exists(entry['article_id']):
+                    raise FileExistsError('{} has already been uploaded to Figshare article {}'.format(
+                        os.path.basename(local_path), entry['article_id']))
+                # The article has since been deleted from Figshare, so the file is uploaded to a new one
+                self.journal.start(local_path, project_id, entry['size'], entry['mtime'], entry['md5'], upload_dict)
+                entry = self.journal.get(local_path, project_id)
+        else:
+            md5 = file_md5(local_path)
+            if entry is None or entry['state'] == STATE_COMPLETE:
+                # A new upload, or a changed file that should become a new article
+                self.journal.start(local_path, project_id, stat.st_size, stat.st_mtime, md5, upload_dict)
+            else:
+                # The file changed part way through an upload. Keep the article but send the new file contents
+                self.journal.update_file(local_path, project_id, stat.st_size, stat.st_mtime, md5)
+            entry = self.journal.get(local_path, project_id)
+
+        return self.resume(entry, upload_dict)
+
+    def resume_interrupted(self, entry: dict):
+        """
+        Continues an upload left incomplete by an earlier session, as returned by UploadJournal.incomplete(). The upload
+        is forgotten if its local file no longer exists.
+
+        Args:
+            entry: Journal entry of the upload.
+
+        Returns:
+            article_id (int): Figshare article ID number.
+            bytes_sent (int): Number of file bytes sent.
+
+        Raises:
+            FileNotFoundError: If the local file no longer exists.
+            HTTPError: If a request to Figshare fails.
+        """
+        if not os.path.isfile(entry['local_path']):
+            self.journal.remove(entry['local_path'], entry['project_id'])
+            raise FileNotFoundError('{} no longer exists'.format(entry['local_path']))
+
+        # Uploads started before the article metadata was journaled are given a title from the file name
+        upload_dict = entry['upload_dict'] or {'title': os.path.basename(entry['local_path'])}
+        return self.upload(entry['project_id'], entry['local_path'], upload_dict)
+
+    def resume(self, entry: dict, upload_dict: dict, restarted: bool=False):
+        """
+        Continues an upload from the last step recorded in its journal entry.
+
+        Args:
+            entry: Journal entry of the upload.
+            upload_dict: Figshare metadata for the new article.
+            restarted: True if the upload has already been restarted because Figshare no longer held its article.
+
+        Returns:
+            article_id (int): Figshare article ID number.
+            bytes_sent (int): Number of file bytes sent.
+        """
+        local_path = entry['local_path']
+        project_id = entry['project_id']
+
+        try:
+            if entry['state'] not in (STATE_CREATED, STATE_INITIATED):
+                article_id = self.create_article(project_id, upload_dict)
+                self.journal.article_created(local_path, project_id, article_id)
+                entry = self.journal.get(local_path, project_id)
+
+            if entry['state'] != STATE_INITIATED:
+                file_id, upload_url = self.initiate_file(entry['article_id'], os.path.basename(local_path),
+                                                         entry['size'], entry['md5'])
+                self.journal.file_initiated(local_path, project_id, file_id, upload_url)
+                entry = self.journal.get(local_path, project_id)
+
+            bytes_sent = self.upload_parts(entry)
+            self.complete_file(entry['article_id'], entry['file_id'])
+
+        except HTTPError as err:
+            # The article or file upload recorded in the journal may have since been deleted from Figshare, in which
+            # case the upload is started again from the beginning
+            not_found = err.response is not None and err.response.status_code == 404
+            if restarted or not not_found or entry['article_id'] is None:
+                raise
+            self.journal.start(local_path, project_id, entry['size'], entry['mtime'], entry['md5'], upload_dict)
+            return self.resume(self.journal.get(local_path, project_id), upload_dict, restarted=True)
+
+        self.journal.upload_complete(local_path, project_id)
+
+        return entry['article_id'], bytes_sent
+
+    def upload_parts(self, entry: dict):
+        """
+        Sends each file part that Figshare does not yet hold, recording each one in the journal as it is confirmed.
+
+        Args:
+            entry: Journal entry of an initiated upload.
+
+        Returns:
+            bytes_sent (int): Number of file bytes sent.
+        """
+        upload_info = self.request('GET', entry['upload_url'])
+
+        bytes_sent = 0
+        with open(entry['local_path'], 'rb') as f:
+            for part in upload_info['parts']:
+                part_no = part['partNo']
+                # Figshare is the authority on which parts it has received
+                if part['status'] == 'COMPLETE':
+                    if part_no not in entry['parts']:
+                        self.journal.part_confirmed(entry['local_path'], entry['project_id'], part_no)
+                    continue
+
+                f.seek(part['startOffset'])
+                data = f.read(part['endOffset'] - part['startOffset'] + 1)
+                self.request('PUT', '{}/{}'.format(entry['upload_url'], part_no), data=data)
+
+                self.journal.part_confirmed(entry['local_path'], entry['project_id'], part_no)
+                bytes_sent += len(data)
+
+        return bytes_sent
+
+    #####
+    # Figshare API Functions
+    #####
+
+    def request(self, method: str, url: str, data: bytes=None, json_data: dict=None):
+        """
+        Issues a request to Figshare.
+
+        Args:
+            method: HTTP method.
+            url: Either a full url, or an endpoint relative to the API base url.
+            data: Raw request body.
+            json_data: Dictionary to send as a JSON request body.
+
+        Returns:
+            Decoded JSON response, or an empty dictionary if the response has no JSON body.
+
+        Raises:
+            HTTPError: If Figshare returns an error status.
+        """
+        if not url.startswith('http'):
+            url = '{}/{}'.format(self.api_base, url)
+        headers = {'Authorization': 'token {}'.format(self.token)}
+
+        response = default_transport().request(method, url, headers=headers, data=data, json=json_data,
+                                               timeout=self.timeout)
+        response.raise_for_status()
+        try:
+            return response.json()
+        except ValueError:
+            return {}
+
+    def article_exists(self, article_id: int):
+        """
+        Checks that Figshare still holds an article.
+
+        Returns:
+            bool: False if Figshare reports the article as not found.
+        """
+        try:
+            self.request('GET', 'account/articles/{}'.format(article_id))
+        except HTTPError as err:
+            if err.response is not None and err.response.status_code == 404:
+                return False
+            raise
+        return True
+
+    def create_article(self, project_id: int, upload_dict: dict):
+        """
+        Creates a new article in a project. A creation that fails should not be repeated, as Figshare may have created
+        the article without the response arriving.
+
+        Returns:
+            article_id (int)
+        """
+        result = self.request('POST', 'account/projects/{}/articles'.format(project_id), json_data=upload_dict)
+        if 'entity_id' in result:
+            return int(result['entity_id'])
+        return int(result['location'].rstrip('/').split('/')[-1])
+
+    def initiate_file(self, article_id: int, name: str, size: int, md5: str):
+        """
+        Initiates a file upload to an article.
+
+        Returns:
+            file_id (int): Figshare file ID number.
+            upload_url (str): Url to which the file parts are sent.
+        """
+        result = self.request('POST', 'account/articles/{}/files'.format(article_id),
+                              json_data={'name': name, 'size': size, 'md5': md5})
+        file_info = self.request('GET', result['location'])
+        return int(file_info['id']), file_info['upload_url']
+
+    def complete_file(self, article_id: int, file_id: int):
+        """
+        Marks a file upload as complete once all of its parts have been sent.
+        """
+        self.request('POST', 'account/articles/{}/files/{}'.format(article_id, file_id))
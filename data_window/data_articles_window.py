@@ -48,8 +48,9 @@ class DataArticlesWindow(QMdiSubWindow):
             # Create the Article Index
             self.parent.local_article_index = ArticleIndex()
 
-            # Create the default figshare metadata schema dictionary
-            self.parent.local_article_index.create_schema('local_articles')
+            # Create the default figshare metadata schema dictionary. Local articles only last for the session, so any
+            # saved from a previous session are discarded.
+            self.parent.local_article_index.create_schema('local_articles', reuse=False)
 
             self.parent.local_article_index.add_ID(schema='local_articles', field_name='id', stored=True, unique=True)
             self.parent.local_article_index.add_TEXT('local_articles', 'title', True)
@@ -181,7 +182,7 @@ class DataArticlesWindow(QMdiSubWindow):
 
         :return:
         """
-        if self.article_tree.tree.topLevelItemCount() == 0:
+        if self.article_tree.tree.row_count() == 0:
             self.disable_edit()
         else:
             self.enable_edit()
@@ -212,6 +213,8 @@ class DataArticlesWindow(QMdiSubWindow):
             self.article_tree.article_ids.remove(article_id)
             # Remove article from the dictionary of local articles
             del(self.parent.local_articles[article_id])
+            # Forget the files the article was created from so they can be added again
+            self.parent.local_file_registry.remove(article_id)
 
             # Get the doc num for the article in the index
             results = self.parent.local_article_index.perform_search(schema='local_articles', field='id',
@@ -222,8 +225,8 @@ class DataArticlesWindow(QMdiSubWindow):
                 if val_dict['id'] == article_id:
                     self.parent.local_article_index.removeDocument(schema='local_articles', docnum=doc_num)
 
-        # Re-fill the tree
-        self.article_tree.fill_tree(self.article_tree.tree_headers, self.article_tree.articles_ids)
+        # Remove the deleted rows from the tree
+        self.article_tree.tree.remove_articles(selection_ids)
         self.check_edit()
 
     def on_edit_pressed(self):
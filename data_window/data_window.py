@@ -1,5 +1,6 @@
 import os
 import math
+import itertools
 from PyQt5.QtWidgets import (QMdiSubWindow, QWidget, QLabel, QPushButton, QAbstractItemView, QMessageBox, QMainWindow,
                              QFileDialog, QTreeWidgetItem, QHBoxLayout, QVBoxLayout, QSizePolicy, QTreeWidget,
                              QFileSystemModel, QTreeView)
@@ -8,7 +9,11 @@ from PyQt5.QtCore import (Qt, QObject, QThread, pyqtSignal, pyqtSlot)
 
 from Figshare_desktop.formatting.formatting import (press_button, checkable_button)
 
-from Figshare_desktop.figshare_articles.determine_type import gen_local_article
+from Figshare_desktop.figshare_articles.determine_type import (gen_local_article, data_file_extensions)
+from Figshare_desktop.data_window.file_scanner import FileScanner
+from Figshare_desktop.data_window.folder_watcher import FolderWatcher
+from Figshare_desktop.local_articles.local_stm_articles.topo_metadata import (METADATA_READERS, read_metadata)
+from Figshare_desktop.background_jobs.concurrency import (map_as_completed, DEFAULT_MAX_PROCESSES)
 from Figshare_desktop.data_window.data_articles_window import DataArticlesWindow
 from Figshare_desktop.article_edit_window.local_metadata_window import LocalMetadataWindow
 
@@ -34,6 +39,16 @@ class DataWindow(QMdiSubWindow):
 
         self.__threads = []
 
+        # Current root directory of the file browser
+        self.root_dir = os.path.expanduser("~")
+
+        # Watcher of the root directory for new data files, and the files it has found waiting to be added
+        self.folder_watcher = FolderWatcher(self.parent.local_file_registry, extensions=data_file_extensions(),
+                                            parent=self)
+        self.folder_watcher.sig_files_ready.connect(self.on_watched_files_ready)
+        self.watch_queue = []
+        self.watch_worker_running = False
+
         self.initUI()
 
     def initUI(self):
@@ -45,7 +60,11 @@ class DataWindow(QMdiSubWindow):
         hbox = QHBoxLayout()
 
         # Add the widgets
-        hbox.addWidget(self.set_directory_btn())
+        vbox = QVBoxLayout()
+        vbox.addWidget(self.set_directory_btn())
+        vbox.addWidget(self.watch_directory_btn())
+        vbox.addWidget(self.watch_upload_btn())
+        hbox.addLayout(vbox)
         hbox.addWidget(self.create_file_browser())
         hbox.addWidget(self.add_to_selection_btn())
 
@@ -56,6 +75,13 @@ class DataWindow(QMdiSubWindow):
         # Set the projects window widget
         self.setWidget(window_widget)
 
+    def closeEvent(self, event):
+        """
+        Stops watching the root directory when the window is closed
+        """
+        self.folder_watcher.stop()
+        super().closeEvent(event)
+
     def format_window(self):
         """
         Form the local data window
@@ -95,6 +121,38 @@ class DataWindow(QMdiSubWindow):
 
         return btn
 
+    def watch_directory_btn(self):
+        """
+        Creates a checkable QPushButton that turns on watching of the current root directory for new data files
+        :return: QPushButton
+        """
+        btn = QPushButton()
+        btn.setIcon(QIcon(os.path.normpath(__file__ + '/../../img/folder_fill.svg')))
+        checkable_button(self.app, btn)  # Format button
+        btn.setToolTip("Add new data files from the current directory as they are written")
+        btn.setToolTipDuration(1)
+
+        btn.toggled[bool].connect(self.on_watch_toggled)
+        self.watch_button = btn
+
+        return btn
+
+    def watch_upload_btn(self):
+        """
+        Creates a checkable QPushButton that sets whether articles of new files in the watched directory are added to the
+        upload queue
+        :return: QPushButton
+        """
+        btn = QPushButton()
+        btn.setIcon(QIcon(os.path.normpath(__file__ + '/../../img/figshare_upload.png')))
+        checkable_button(self.app, btn)  # Format button
+        btn.setToolTip("Add articles of new files in the watched directory to the upload queue")
+        btn.setToolTipDuration(1)
+
+        self.watch_upload_button = btn
+
+        return btn
+
     def create_file_browser(self):
         """
         Creates a QTreeView with a QFileSystemModel that is used as a file browser
@@ -105,8 +163,7 @@ class DataWindow(QMdiSubWindow):
 
         # Set the model of the QTreeView
         self.model = QFileSystemModel()
-        home_dir = os.path.expanduser("~")  # Define the initial root directory
-        self.model.setRootPath(home_dir)
+        self.model.setRootPath(self.root_dir)  # Define the initial root directory
         self.browser.setModel(self.model)
 
         # Resize the first column
@@ -144,7 +201,65 @@ class DataWindow(QMdiSubWindow):
         :return:
         """
         dir_name = self.user_set_dir()
+        if not dir_name:
+            return
         self.browser.setRootIndex(self.model.index(dir_name))
+        self.root_dir = dir_name
+
+        # Move an active watch to the new directory
+        if self.watch_button.isChecked():
+            self.folder_watcher.stop()
+            self.folder_watcher.watch(self.root_dir)
+
+    @pyqtSlot(bool)
+    def on_watch_toggled(self, checked: bool):
+        """
+        Called when the watch directory button is toggled
+        :param checked: bool.
+        :return:
+        """
+        if checked:
+            self.folder_watcher.watch(self.root_dir)
+        else:
+            self.folder_watcher.stop()
+            self.watch_queue.clear()
+
+    @pyqtSlot(list)
+    def on_watched_files_ready(self, file_paths: list):
+        """
+        Called when new files in the watched directory have been completely written. Files are added in batches, one
+        batch at a time.
+        :param file_paths: list.
+        :return:
+        """
+        self.watch_queue.extend(file_paths)
+        if not self.watch_worker_running:
+            self.create_watched_articles()
+
+    def create_watched_articles(self):
+        """
+        Creates articles for the files waiting in the watch queue
+        :return:
+        """
+        if not self.watch_queue:
+            self.watch_worker_running = False
+            return
+
+        file_paths, self.watch_queue = self.watch_queue, []
+        self.watch_worker_running = True
+
+        self.create_articles(file_paths, upload=self.watch_upload_button.isChecked(),
+                             on_done=self.on_watched_articles_done)
+
+    @pyqtSlot(bool)
+    def on_watched_articles_done(self, done: bool):
+        """
+        Called when a batch of articles from the watched directory have been created. Starts on any files that became
+        ready in the meantime.
+        :return:
+        """
+        self.watch_worker_running = False
+        self.create_watched_articles()
 
     def user_set_dir(self):
         """
@@ -158,9 +273,19 @@ class DataWindow(QMdiSubWindow):
         Called when the open selection button is clicked. Either open or closes the metadata window
         :return:
         """
-        # Retrieve a set of file paths
-        file_paths = self.get_selection_set()
+        # Selected directories are scanned for data files by the worker, which starts on the first file found
+        file_paths = FileScanner(self.get_selection_paths(), extensions=data_file_extensions())
+        self.create_articles(file_paths)
 
+    def create_articles(self, file_paths, upload: bool=False, on_done=None):
+        """
+        Starts a worker thread that creates local articles from a set of files
+        :param file_paths: iterable of file paths.
+        :param upload: bool. If True the articles are also added to the upload queue.
+        :param on_done: Optional slot connected to the worker's sig_done before the thread is started, so that it
+            cannot miss a worker that finishes straight away.
+        :return: ArticleCreationWorker
+        """
         # Locally reference the Article List Widget
         article_tree = self.parent.data_articles_window.article_tree
 
@@ -184,53 +309,37 @@ class DataWindow(QMdiSubWindow):
         worker.sig_done.connect(article_tree.enable_fields)
         worker.sig_done.connect(article_tree.update_search_field)
         worker.sig_done.connect(self.parent.data_articles_window.check_edit)
+        worker.sig_done.connect(self.check_scan_limit)
+        if upload:
+            worker.sig_step.connect(self.parent.figshare_add_window.upload_queue.add_to_tree)
+        if on_done is not None:
+            worker.sig_done.connect(on_done)
         load_articles_thread.started.connect(worker.work)
 
         # Begin worker thread
         load_articles_thread.start()
 
-    def get_selection_set(self):
+        return worker
+
+    def check_scan_limit(self):
         """
-        Creates a set of selected item file paths.
+        Called when an article creation worker finishes. Warns the user if not all of the files in the selected
+        directories were added.
         :return:
         """
-        # Get a list of selected items from the QTreeview
-        items = self.browser.selectedIndexes()
+        scanner = self.sender().file_paths
+        if isinstance(scanner, FileScanner) and scanner.truncated:
+            msg = "Only the first {} files were added. Select fewer directories to add the rest.".format(scanner.count)
+            QMessageBox.warning(self, "File Limit Reached", msg, QMessageBox.Ok)
 
-        # Create an empty set to add file paths to
-        file_paths = set()
-        for item in items:
-            # For items that are not directories
-            if not self.model.isDir(item):
-                file_paths.add(self.model.filePath(item))  # Add the item file path
-            else:
-                # Combine the current set with a set of files contained within the directory. Does not recursively
-                # open contained directories
-                contained_files = self.get_child_files(self.model.filePath(item))
-                if contained_files is not None:
-                    file_paths |= contained_files
-
-        return file_paths
-
-    @staticmethod
-    def get_child_files(path):
-        """
-        given a path to a directory will return a set of file paths contained within. Does not recursively open internal
-        directories
-        :param path: string. path to directory
-        :return: set. Containing file paths
-        """
-        dir = os.path.normpath(path)
-        if os.path.isdir(dir):
-            dir_contents = os.listdir(dir)
-
-            file_set = set()
-            for item in dir_contents:
-                if not os.path.isdir(item):
-                    file_set.add(os.path.join(dir, item))
-            return file_set
-        else:
-            return None
+    def get_selection_paths(self):
+        """
+        Creates a list of the selected file and directory paths.
+        :return: list.
+        """
+        # Get a list of selected items from the QTreeview. Each column of a selected row is a separate item.
+        items = self.browser.selectedIndexes()
+        return list(dict.fromkeys(self.model.filePath(item) for item in items))
 
 
 class ArticleCreationWorker(QObject):
@@ -238,32 +347,83 @@ class ArticleCreationWorker(QObject):
     sig_step = pyqtSignal(str)
     sig_done = pyqtSignal(bool)
 
-    def __init__(self, OAuth_token, parent, file_paths: set):
+    # Fewer data files than this are parsed in the worker thread, as starting the worker processes would take longer
+    MIN_PARALLEL_FILES = 4
+
+    def __init__(self, OAuth_token, parent, file_paths, max_processes: int=DEFAULT_MAX_PROCESSES):
         super().__init__()
 
         self.token = OAuth_token
         self.parent = parent
         self.file_paths = file_paths
+        self.max_processes = max_processes
 
     @pyqtSlot()
     def work(self):
         """
-
+        Creates local articles for each file. Data files with metadata to read are parsed in a pool of worker processes
+        and their articles are created in the order in which parsing completes. File paths may be given by a generator,
+        in which case files are processed as they are yielded.
         :return:
         """
-        while self.file_paths:
-            path = self.file_paths.pop()
-            local_id = self.create_local_article(path)
+        # Index documents are collected and committed to the index in a single batch once all files are processed
+        self.documents = []
+
+        to_parse = self.files_to_parse()
+
+        # Look ahead far enough to tell if the worker processes are worth starting
+        first_files = list(itertools.islice(to_parse, self.MIN_PARALLEL_FILES))
+        if len(first_files) < self.MIN_PARALLEL_FILES:
+            results = self.read_in_thread(first_files)
+        else:
+            results = map_as_completed(read_metadata, itertools.chain(first_files, to_parse),
+                                       max_workers=self.max_processes, backoff=False, processes=True)
+
+        for path, metadata, err in results:
+            if err is not None:
+                # Still create an article for a file that could not be parsed, but without its file metadata
+                metadata = {}
+            local_id = self.create_local_article(path, metadata)
             self.sig_step.emit(local_id)
+
+        # Re-adding files that all have articles already leaves the index untouched
+        if self.documents:
+            self.parent.local_article_index.addDocuments(schema='local_articles', data_dicts=self.documents)
         self.sig_done.emit(True)
 
-    def create_local_article(self, file_path):
+    def files_to_parse(self):
+        """
+        Creates articles for files that do not need parsing as they are reached, and yields the paths of new data files.
+        :return: generator.
+        """
+        for path in self.file_paths:
+            if os.path.splitext(path)[1] in METADATA_READERS and not self.does_local_article_exist(path)[0]:
+                yield path
+            else:
+                local_id = self.create_local_article(path)
+                self.sig_step.emit(local_id)
+
+    @staticmethod
+    def read_in_thread(file_paths: list):
+        """
+        Reads the metadata of each file in turn, yielding the outcomes in the same form as map_as_completed.
+        :param file_paths: list.
+        :return:
+        """
+        for path in file_paths:
+            try:
+                yield path, read_metadata(path), None
+            except Exception as err:
+                yield path, None, err
+
+    def create_local_article(self, file_path, metadata: dict=None):
         """
         Creates a local article of the given file
         :param file_path: string.
+        :param metadata: dict. File metadata already read from the file, if any.
         :return:
         """
-        # Check if an article does not already exist with the same title
+        # Check if an article does not already exist for the same file
         article_exists, local_id = self.does_local_article_exist(file_path)
 
         if not article_exists:
@@ -271,7 +431,7 @@ class ArticleCreationWorker(QObject):
             # set the local file id number
             local_id = 'local_' + str(self.parent.next_local_id)
             # Create local article
-            self.parent.local_articles[local_id] = gen_local_article(self.token, file_path)
+            self.parent.local_articles[local_id] = gen_local_article(self.token, file_path, metadata)
             # Set id number
             self.parent.local_articles[local_id].figshare_metadata['id'] = local_id
             # Increment next local id counter
@@ -293,32 +453,18 @@ class ArticleCreationWorker(QObject):
                 # Define the schema we wish to add fields to
                 schema = 'local_articles'
 
-                # From the article type created get the index dictionary and add fields to the index appropriately
-                for field_name, field_type in article.index_schema().items():
-                    if field_type[0] == 'id':
-                        local_article_index.add_ID(schema=schema, field_name=field_name, stored=field_type[1],
-                                                   unique=True)
-                    elif field_type[0] == 'text':
-                        local_article_index.add_TEXT(schema, field_name, field_type[1])
-                    elif field_type[0] == 'keyword':
-                        local_article_index.add_KEYWORD(schema, field_name, field_type[1])
-                    elif field_type[0] == 'numeric':
-                        local_article_index.add_NUMERIC(schema, field_name, field_type[1])
-                    elif field_type[0] == 'datetime':
-                        local_article_index.add_DATETIME(schema, field_name, field_type[1])
-                    elif field_type[0] == 'boolean':
-                        local_article_index.add_BOOLEAN(schema, field_name, field_type[1])
-                    elif field_type[0] == 'ngram':
-                        local_article_index.add_NGRAM(schema, field_name, field_type[1])
+                # From the article type created get the index dictionary and add any missing fields in one commit
+                local_article_index.ensure_fields(schema, article.index_schema())
 
             # Get a single dictionary of all fields associated to the article
             document_dict = {}
             for d in article.input_dicts():
-                document_dict = {**document_dict, **d}
-
-            # Add document to Index
-            local_article_index.addDocument(schema='local_articles', data_dict=document_dict)
+                document_dict.update(d)
 
+            # Stage the document to be added to the index once the batch is complete
+            self.documents.append(document_dict)
+            # Record the file so that adding it again finds this article
+            self.parent.local_file_registry.register(file_path, local_id)
 
             return local_id
 
@@ -328,40 +474,23 @@ class ArticleCreationWorker(QObject):
 
     def does_local_article_exist(self, file_path: str):
         """
-        Checks to see if an article already exists with the same title in the local article set.
+        Checks to see if an article has already been created from the file, or from an identical copy of it.
 
         Args:
             file_path: local path to the file from which to create an article.
 
         Returns:
             article_exits (bool): True of False depending on whether article already exists.
-            article_id (str): If article with same title is found returns the article ID, otherwise None is returned.
-        """
-        # Get the file name from the full path
-        file_name = os.path.split(file_path)[-1]
-
-        # locally define the local article index for convenience
-        local_article_index = self.parent.local_article_index
-
-        # If there is the local article schema present
-        if 'local_articles' in local_article_index.list_schema():
-
-            # Initially set article exists as False
-            exists = False
-
-            # Search for articles with the same title as the current file name
-            results = local_article_index.perform_search(schema='local_articles', field='title', query=file_name)
-
-            # Check in the results given if there is a document with the same title as the file name
-            for doc_num, val_dict in results.items():
-                # If one is found return true
-                if 'title' in val_dict:
-                    if val_dict['title'] == file_name:
-                        exists = True
-                        local_id = val_dict['id']
-                        break
-            if exists:
-                return True, local_id
-            # If we get here then no results had the same title (within the top ten hits) so return false
-            else:
-                return False, None
+            article_id (str): If an existing article is found returns the article ID, otherwise None is returned.
+        """
+        file_registry = self.parent.local_file_registry
+
+        local_id = file_registry.lookup(file_path)
+
+        # The article may have been deleted since the file was registered
+        if local_id is None or local_id not in self.parent.local_articles:
+            return False, None
+
+        # Register copies under the article too, so that adding them again is a direct lookup
+        file_registry.register(file_path, local_id)
+        return True, local_id
@@ -3,13 +3,13 @@
 """
 
 import os
-from PyQt5.QtWidgets import (QWidget, QPushButton, QLineEdit, QMessageBox, QFileDialog, QAbstractItemView,
-                             QTextEdit, QGridLayout, QHBoxLayout, QVBoxLayout, QSizePolicy, QTreeWidgetItem,
-                             QTreeWidget)
+from PyQt5.QtWidgets import (QWidget, QPushButton, QLineEdit, QMessageBox, QFileDialog, QTextEdit, QGridLayout,
+                             QHBoxLayout, QVBoxLayout, QSizePolicy)
 from PyQt5.QtGui import (QIcon, QFont, QPalette, QColor)
 from PyQt5.QtCore import (Qt, pyqtSlot, pyqtSignal, QObject)
 
 from Figshare_desktop.formatting.formatting import (press_button)
+from Figshare_desktop.custom_widgets.article_table_model import ArticleTreeView
 
 __author__ = "Tobias Gill"
 __credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
@@ -66,23 +66,17 @@ class ArticleList(QWidget):
 
     def initTree(self):
         """
-        Initialises the QTreeWidget to hold the articles prior to their upload to figshare
+        Initialises the tree view to hold the articles prior to their upload to figshare
         :return:
         """
-        tree = QTreeWidget()
-        # Format the tree to allow for multiple items to be selected
-        tree.setSelectionMode(QAbstractItemView.ExtendedSelection)
-        # Allow for sorting of columns
-        tree.setSortingEnabled(True)
-
         # Create the tree column headers
         headers = ['id', 'title']
-        header_item = QTreeWidgetItem(headers)
-        tree.setHeaderItem(header_item)
+
+        tree = ArticleTreeView(self.parent.local_articles, headers)
 
         self.tree = tree
 
-        self.tree.itemDoubleClicked.connect(self.item_double_clicked)
+        self.tree.doubleClicked.connect(self.item_double_clicked)
 
         return self.tree
 
@@ -92,22 +86,10 @@ class ArticleList(QWidget):
     @pyqtSlot(bool)
     def fill_tree(self):
         """
-        Clears and then re-fills the tree from the given set of local id numbers
-        :param article_id_set: set of article id numbers
+        Brings the tree in line with the set of local id numbers, inserting and removing only the rows that differ
         :return:
         """
-        self.tree.clear()
-        for a_id in self.local_ids:
-            # Create a tree widget item from the article id and title
-            title = self.parent.local_articles[a_id].figshare_metadata['title']
-            tree_item = QTreeWidgetItem([a_id, title])
-
-            # Add to the tree
-            self.tree.addTopLevelItem(tree_item)
-
-            # Resize columns to contents
-            for column in range(self.tree.columnCount()):
-                self.tree.resizeColumnToContents(column)
+        self.tree.sync_articles(self.local_ids)
 
     @pyqtSlot(str)
     def add_to_tree(self, local_article_id: str):
@@ -120,32 +102,24 @@ class ArticleList(QWidget):
             # Add the id to the local set
             self.local_ids.add(local_article_id )
 
-            # Create a tree widget item from the article id and title
-            title = self.parent.local_articles[local_article_id].figshare_metadata['title']
-            tree_item = QTreeWidgetItem([local_article_id, title])
-
-            # Add to the tree
-            self.tree.addTopLevelItem(tree_item)
-
-            # Resize columns to contents
-            for column in range(self.tree.columnCount()):
-                self.tree.resizeColumnToContents(column)
-
+            # Queue the article to be added to the tree with the next batch
+            self.tree.queue_article(local_article_id)
 
-    def item_double_clicked(self, item, column):
+    def item_double_clicked(self, index):
 
-        article_id = item.text(0)
+        article_id = self.tree.index_id(index)
         self.remove_from_tree(article_id)
 
     @pyqtSlot(str)
     def remove_from_tree(self, local_article_id):
         """
-        Attempts to remove an article from the tree
+        Attempts to remove an article from the tree. Articles that have already been taken from the queue for upload are
+        only removed from the tree.
         :param local_article_id: string containing the local article id number
         :return:
         """
-        self.local_ids.remove(local_article_id)
-        self.fill_tree()
+        self.local_ids.discard(local_article_id)
+        self.tree.remove_articles([local_article_id])
 
 
 class TreeAddWorker(QObject):
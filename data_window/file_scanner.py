@@ -0,0 +1,114 @@
+"""
+File Scanner
+
+Walks directory trees with os.scandir and yields the paths of matching files as they are found, so that files can be
+processed while the rest of the tree is still being scanned.
+"""
+
+import os
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+# Default number of directory levels below a selected directory that are scanned
+DEFAULT_MAX_DEPTH = 16
+
+# Default maximum number of files yielded from the directories of a single scan
+DEFAULT_MAX_FILES = 20000
+
+
+class FileScanner(object):
+    """
+    Iterable over the files within a set of paths. Files given directly are always included, while the contents of
+    directories are filtered by extension and limited in depth and number.
+    """
+
+    def __init__(self, paths, extensions=None, max_depth: int=DEFAULT_MAX_DEPTH, max_files: int=DEFAULT_MAX_FILES):
+        """
+        Args:
+            paths: Iterable of file and directory paths.
+            extensions: Collection of file extensions, such as '.Z_flat', to include from directories. None includes
+                every file.
+            max_depth: Number of levels of sub-directories to descend into. 0 only lists the given directories.
+            max_files: Maximum number of files to yield from directories. None for no limit.
+
+        Returns:
+            None
+        """
+        self.paths = paths
+        self.extensions = None if extensions is None else set(extensions)
+        self.max_depth = max_depth
+        self.max_files = max_files
+
+        # Set if files in directories were left out because the scan reached max_files
+        self.truncated = False
+        self.count = 0
+
+    def __iter__(self):
+        seen = set()
+        # Number of files found by walking directories. Only these are limited by max_files, so that files selected
+        # directly are added even if they come after a large directory
+        walked = 0
+        for path in self.paths:
+            path = os.path.abspath(path)
+            if os.path.isdir(path):
+                for file_path in self.walk(path):
+                    if file_path in seen:
+                        continue
+                    if self.max_files is not None and walked >= self.max_files:
+                        self.truncated = True
+                        break
+                    seen.add(file_path)
+                    walked += 1
+                    self.count += 1
+                    yield file_path
+            elif path not in seen:
+                seen.add(path)
+                self.count += 1
+                yield path
+
+    def matches(self, name: str):
+        """
+        Checks if a file name has one of the included extensions.
+        """
+        return self.extensions is None or os.path.splitext(name)[1] in self.extensions
+
+    def walk(self, root: str):
+        """
+        Yields the matching files below a directory, depth first. Symbolic links to directories are not followed, so
+        that links back up the tree cannot cause a loop.
+
+        Args:
+            root: Directory path.
+
+        Returns:
+            Generator of file paths.
+        """
+        stack = [(root, 0)]
+        while stack:
+            directory, depth = stack.pop()
+            try:
+                entries = os.scandir(directory)
+            except OSError:
+                # Unreadable directories are skipped rather than stopping the scan
+                continue
+
+            sub_directories = []
+            with entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if depth < self.max_depth:
+                                sub_directories.append(entry.path)
+                        elif entry.is_file() and self.matches(entry.name):
+                            yield entry.path
+                    except OSError:
+                        continue
+
+            # Reversed so that sub-directories are scanned in the order they were listed
+            stack.extend((path, depth + 1) for path in reversed(sub_directories))
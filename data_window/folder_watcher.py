@@ -0,0 +1,203 @@
+"""
+Folder Watcher
+
+Watches local directories for new data files, such as those written by an instrument during a measurement session.
+Bursts of file system events are gathered together before the directories are rescanned, and a new file is only
+reported once its size and modification time have stopped changing, so that files are not read while still being
+written.
+"""
+
+import os
+
+from PyQt5.QtCore import (QObject, QTimer, QFileSystemWatcher, pyqtSignal, pyqtSlot)
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+# Time in milliseconds after the last directory change before the directories are rescanned
+DEBOUNCE_INTERVAL = 1000
+
+# Time in milliseconds between checks of whether new files are still being written
+SETTLE_INTERVAL = 2000
+
+
+class FolderWatcher(QObject):
+    """
+    Reports files that appear in a set of watched directories, and their sub-directories, once they are complete.
+    """
+
+    sig_files_ready = pyqtSignal(list)
+
+    def __init__(self, file_registry, extensions=None, debounce_interval: int=DEBOUNCE_INTERVAL,
+                 settle_interval: int=SETTLE_INTERVAL, parent=None):
+        """
+        Args:
+            file_registry: FileRegistry of the files local articles have already been created from.
+            extensions: Collection of file extensions to report. None reports every file.
+            debounce_interval: Milliseconds to wait after a change before rescanning.
+            settle_interval: Milliseconds between checks that a new file has stopped changing.
+            parent: Parent QObject.
+
+        Returns:
+            None
+        """
+        super().__init__(parent)
+
+        self.file_registry = file_registry
+        self.extensions = None if extensions is None else set(extensions)
+
+        # (size, mtime) of each file seen in the watched directories
+        self.known = {}
+        # (size, mtime) of new files at the last check, while waiting for them to stop changing
+        self.pending = {}
+        # Directories with changes since the last scan
+        self.changed = set()
+
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.on_directory_changed)
+
+        self.debounce_timer = QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.setInterval(debounce_interval)
+        self.debounce_timer.timeout.connect(self.scan_changed)
+
+        self.settle_timer = QTimer(self)
+        self.settle_timer.setInterval(settle_interval)
+        self.settle_timer.timeout.connect(self.check_pending)
+
+    def directories(self):
+        return self.watcher.directories()
+
+    def is_watching(self):
+        return bool(self.watcher.directories())
+
+    def matches(self, name: str):
+        return self.extensions is None or os.path.splitext(name)[1] in self.extensions
+
+    #####
+    # Watch Control
+    #####
+
+    def watch(self, directory: str):
+        """
+        Starts watching a directory and its sub-directories. Files already in them are not reported.
+
+        Args:
+            directory: Directory path.
+
+        Returns:
+            None
+        """
+        self.scan_directory(os.path.abspath(directory), baseline=True)
+
+    def stop(self):
+        """
+        Stops watching all directories and forgets any files waiting to be reported.
+        """
+        directories = self.watcher.directories()
+        if directories:
+            self.watcher.removePaths(directories)
+        self.debounce_timer.stop()
+        self.settle_timer.stop()
+        self.known.clear()
+        self.pending.clear()
+        self.changed.clear()
+
+    #####
+    # Scanning
+    #####
+
+    @pyqtSlot(str)
+    def on_directory_changed(self, path: str):
+        """
+        Called for each change to a watched directory. Restarts the debounce timer so that a burst of changes leads to a
+        single scan.
+        """
+        self.changed.add(path)
+        self.debounce_timer.start()
+
+    def scan_changed(self):
+        """
+        Scans the directories that have changed since the last scan.
+        """
+        changed, self.changed = self.changed, set()
+        for directory in changed:
+            self.scan_directory(directory)
+
+    def scan_directory(self, directory: str, baseline: bool=False):
+        """
+        Records the files in a directory and watches any sub-directories not yet watched.
+
+        Args:
+            directory: Directory path.
+            baseline: If True files found are taken as already present rather than new.
+
+        Returns:
+            None
+        """
+        watched = set(self.watcher.directories())
+        stack = [directory]
+        while stack:
+            current = stack.pop()
+            if current not in watched:
+                if not self.watcher.addPath(current):
+                    continue
+                watched.add(current)
+            try:
+                entries = list(os.scandir(current))
+            except OSError:
+                continue
+
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        # Sub-directories created after watching started are new, and are scanned in full
+                        if entry.path not in watched:
+                            stack.append(entry.path)
+                    elif entry.is_file() and self.matches(entry.name):
+                        stat = entry.stat()
+                        self.record_file(entry.path, (stat.st_size, stat.st_mtime), baseline)
+                except OSError:
+                    continue
+
+        if self.pending and not self.settle_timer.isActive():
+            self.settle_timer.start()
+
+    def record_file(self, path: str, state: tuple, baseline: bool):
+        if baseline:
+            self.known[path] = state
+        elif self.known.get(path) != state and path not in self.pending:
+            self.pending[path] = state
+
+    def check_pending(self):
+        """
+        Reports the new files that have not changed since the last check.
+        """
+        ready = []
+        for path, state in list(self.pending.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # Removed before it was complete
+                del self.pending[path]
+                continue
+
+            current = (stat.st_size, stat.st_mtime)
+            if current != state or stat.st_size == 0:
+                self.pending[path] = current
+                continue
+
+            del self.pending[path]
+            self.known[path] = current
+            if not self.file_registry.is_registered(path):
+                ready.append(path)
+
+        if not self.pending:
+            self.settle_timer.stop()
+        if ready:
+            self.sig_files_ready.emit(ready)
@@ -3,27 +3,205 @@
 """
 
 import os
+import shutil
+import hashlib
+import threading
+import datetime
+import collections
 from whoosh.fields import *
-from whoosh.index import create_in
-from whoosh.qparser import QueryParser, MultifieldParser
+from whoosh.index import (create_in, open_dir, exists_in, IndexError as WhooshIndexError)
+from whoosh.qparser import (QueryParser, MultifieldParser, GtLtPlugin)
+from whoosh.qparser.dateparse import DateParserPlugin
+from whoosh.query import (NullQuery, Every)
+from whoosh import sorting
+from whoosh.qparser.common import QueryParserError
 
+from Figshare_desktop.local_store.user_data import user_data_dir
 
-class ArticleIndex(object):
+
+# Formats of date strings that are indexed in DATETIME fields, in addition to ISO 8601
+DATE_FORMATS = ('%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y', '%Y-%m-%d %H:%M:%S')
+
+
+def parse_date(value: str):
+    """
+    Parses a date string as given by Figshare or by a data file.
+    :param value: str.
+    :return: datetime or None if the string is not a recognised date
+    """
+    value = value.strip()
+    try:
+        # Figshare gives UTC times with a trailing Z
+        return datetime.datetime.fromisoformat(value[:-1] if value.endswith('Z') else value)
+    except ValueError:
+        pass
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+    return None
+
+
+def to_datetime(value):
+    if isinstance(value, datetime.datetime):
+        return value
+    if isinstance(value, datetime.date):
+        return datetime.datetime(value.year, value.month, value.day)
+    return parse_date(u"{}".format(value))
+
+
+def to_float(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value.strip()) if isinstance(value, str) else float(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def to_int(value):
+    number = to_float(value)
+    if number is None:
+        return None
+    try:
+        return int(number)
+    except (ValueError, OverflowError):
+        return None
+
+
+def to_boolean(value):
+    return value if isinstance(value, bool) else u"{}".format(value)
+
+
+def to_text(value):
+    # For lists create a string with comma separated tags.
+    if type(value) is list:
+        return ','.join('{}'.format(tag) for tag in value)
+    return u"{}".format(value)  # Convert value to unicode
+
+
+def field_converter(field):
+    """
+    Returns the function converting metadata values to the type indexed by a schema field. Numeric and date fields
+    need numbers and datetimes rather than strings to be searchable by range.
+    :param field: whoosh.fields.FieldType
+    :return: function taking a metadata value and returning the converted value, or None if it cannot be converted
+    """
+    # DATETIME is a subclass of NUMERIC so must be checked first
+    if isinstance(field, DATETIME):
+        return to_datetime
+    elif isinstance(field, NUMERIC):
+        return to_int if field.numtype is int else to_float
+    elif isinstance(field, BOOLEAN):
+        return to_boolean
+    return to_text
+
+
+def coerce_value(field, value):
+    """
+    Converts a metadata value to the type indexed by a schema field.
+    :param field: whoosh.fields.FieldType
+    :param value: metadata value
+    :return: converted value, or None if the value cannot be converted
+    """
+    return field_converter(field)(value)
+
+
+def compile_serializer(index_schema):
+    """
+    Builds a function extracting the schema relevant key, value pairs from a dictionary of article metadata. The
+    converter of each field is looked up once here rather than for every document.
+    :param index_schema: whoosh.fields.Schema
+    :return: function taking a metadata dictionary and returning a document dictionary
     """
+    converters = {name: field_converter(field) for name, field in index_schema.items()}
 
+    def serialize(data_dict: dict):
+        document_dict = {}
+        for key, value in data_dict.items():
+            convert = converters.get(key)
+            if convert is None or value is None or value == '' or value == []:
+                continue
+            value = convert(value)
+            if value is not None:
+                document_dict[key] = value
+        return document_dict
+
+    return serialize
+
+
+# Whoosh fields of the field type names used by the article index_schema() dictionaries. Each is given whether the
+# field is stored.
+FIELD_TYPES = {
+    'id': lambda stored: ID(stored=stored, unique=True),
+    'text': lambda stored: TEXT(stored=stored),
+    'keyword': lambda stored: KEYWORD(stored=stored, commas=True),
+    'numeric': lambda stored: NUMERIC(float, stored=stored),
+    'datetime': lambda stored: DATETIME(stored=stored),
+    'boolean': lambda stored: BOOLEAN(stored=stored),
+    'ngram': lambda stored: NGRAM(stored=stored)
+}
+
+
+def make_field(field_type):
     """
+    Creates a Whoosh field from an index_schema() entry.
+    :param field_type: tuple of (field type name, stored) or a whoosh.fields.FieldType
+    :return: whoosh.fields.FieldType, or None if the type name is not recognised
+    """
+    if isinstance(field_type, FieldType):
+        return field_type
+    type_name, stored = field_type
+    factory = FIELD_TYPES.get(type_name)
+    if factory is None:
+        return None
+    return factory(stored)
+
 
-    def __init__(self, index_dir: str='figshare_desktop_index'):
+def account_index_dir(OAuth_token: str):
+    """
+    Returns the index directory for the Figshare articles of a single account.
+    :param OAuth_token: Authentication token generated from Figshare login.
+    :return: str. path to the directory
+    """
+    token_hash = hashlib.sha1(OAuth_token.encode('utf-8')).hexdigest()
+    return user_data_dir('search_index', token_hash)
+
+
+class ArticleIndex(object):
+    """
+    Whoosh search index of article metadata. Each schema is kept as a separate index in its own sub-directory of the
+    index directory, so schemas persist between sessions and can be reopened without being rebuilt.
+    """
+
+    def __init__(self, index_dir: str=None, cache_size: int=64):
         super().__init__()
 
+        # Default to the per-user data directory
+        if index_dir is None:
+            index_dir = user_data_dir('search_index')
         self.index_dir = index_dir
         # If there is no index directory create it
-        if not os.path.exists(self.index_dir):
-            os.mkdir(self.index_dir)
+        os.makedirs(self.index_dir, exist_ok=True)
 
         self.schemas = {}
         self.document_types = set()
 
+        # Whoosh refuses a second writer while one is open, so writes from different threads are made one at a time
+        self._write_lock = threading.RLock()
+
+        # Long lived searchers, query parsers and recent search results of each schema
+        self.cache_size = cache_size
+        self._search_lock = threading.RLock()
+        self._searchers = {}
+        self._parsers = {}
+        self._result_cache = {}
+        # Article ids of the documents with each value of a facet field, by schema
+        self._facet_cache = {}
+        # Compiled document serializers of each schema, rebuilt when fields are added or removed
+        self._serializers = {}
+
     #####
     # Index Functions
     #####
@@ -43,30 +221,94 @@ class ArticleIndex(object):
         Called to remove the index from the disk.
         :return:
         """
+        for schema in list(self.schemas):
+            self.invalidate(schema, fields_changed=True)
+            self.schemas[schema].close()
+        self.schemas = {}
         if os.path.isdir(self.index_dir):
-            os.rmdir(self.index_dir)
+            shutil.rmtree(self.index_dir)
 
     #####
     # Schema Functions
     #####
 
-    def create_schema(self, schema_name: str):
+    def schema_dir(self, schema_name: str):
         """
-        Creates a schema and adds it to the index
+        Returns the directory holding the index of a schema
         :param schema_name:
-        :return:
+        :return: str
+        """
+        return os.path.join(self.index_dir, schema_name)
+
+    def create_schema(self, schema_name: str, reuse: bool=True):
         """
-        index = create_in(self.index_dir, Schema())
+        Creates a schema and adds it to the index. If the schema was saved by a previous session it is reopened along
+        with its fields and documents.
+        :param schema_name:
+        :param reuse: bool. If False any saved documents and fields of the schema are discarded.
+        :return: bool. True if a saved schema was reopened
+        """
+        schema_dir = self.schema_dir(schema_name)
+        os.makedirs(schema_dir, exist_ok=True)
+
+        index = None
+        if reuse and exists_in(schema_dir):
+            try:
+                index = open_dir(schema_dir)
+            except (WhooshIndexError, OSError, ValueError):
+                # An unreadable index is rebuilt from scratch
+                index = None
+
+        reopened = index is not None
+        if not reopened:
+            index = create_in(schema_dir, Schema())
+
         self.schemas[schema_name] = index
+        self.invalidate(schema_name, fields_changed=True)
+        return reopened
 
     def add_field(self, schema, field_name, field):
         """
-
+        Adds a field to the given schema. Fields already in the schema, such as those of a reopened schema, are kept.
         :return:
         """
-        writer = self.schemas[schema].writer()
-        writer.add_field(field_name, field)
-        writer.commit()
+        with self._write_lock:
+            if field_name in self.get_fields(schema):
+                return
+            writer = self.schemas[schema].writer()
+            writer.add_field(field_name, field)
+            writer.commit()
+            self.invalidate(schema, fields_changed=True)
+
+    def ensure_fields(self, schema: str, fields: dict):
+        """
+        Adds all the given fields missing from a schema with a single commit. Fields already in the schema are kept.
+
+        Args:
+            schema: Name of the Whoosh index schema.
+            fields: Dictionary of field name: field, where each field is a whoosh.fields.FieldType or an index_schema()
+                tuple of (field type name, stored). Fields of unrecognised types are left out.
+
+        Returns:
+            added (list): Names of the fields added.
+        """
+        with self._write_lock:
+            existing = set(self.get_fields(schema))
+            missing = {}
+            for field_name, field_type in fields.items():
+                if field_name not in existing:
+                    field = make_field(field_type)
+                    if field is not None:
+                        missing[field_name] = field
+
+            if missing:
+                writer = self.schemas[schema].writer()
+                for field_name, field in missing.items():
+                    writer.add_field(field_name, field)
+                writer.commit()
+                self.invalidate(schema, fields_changed=True)
+
+        return list(missing)
 
     def add_TEXT(self, schema, field_name: str, stored: bool=False):
         """
@@ -152,14 +394,49 @@ class ArticleIndex(object):
         :param field_name: name of the field to be removed
         :return:
         """
-        writer = self.schemas[schema].writer()
-        writer.remove_field(field_name)
-        writer.commit()
+        with self._write_lock:
+            writer = self.schemas[schema].writer()
+            writer.remove_field(field_name)
+            writer.commit()
+            self.invalidate(schema, fields_changed=True)
 
     #####
     # Document Functions
     #####
 
+    def document_dict(self, schema: str, data_dict: dict):
+        """
+        Extracts the schema relevant key, value pairs from a dictionary of article metadata.
+
+        Args:
+            schema: Name of the Whoosh index schema the document is intended for.
+            data_dict: Dictionary of document metadata.
+
+        Returns:
+            document_dict (dict): Field values keyed by schema field name. Values of numeric and date fields are
+                converted to numbers and datetimes, and all other values to unicode strings. Values that cannot be
+                converted to the field type are left out.
+        """
+        return self.document_serializer(schema)(data_dict)
+
+    def document_serializer(self, schema: str):
+        """
+        Returns the compiled document serializer of a schema. Serializers are cached until the fields of the schema
+        change, so bulk additions only read the schema once.
+
+        Args:
+            schema: Name of the Whoosh index schema.
+
+        Returns:
+            function taking a dictionary of document metadata and returning the document dictionary
+        """
+        with self._search_lock:
+            serializer = self._serializers.get(schema)
+            if serializer is None:
+                serializer = compile_serializer(self.schemas[schema].schema)
+                self._serializers[schema] = serializer
+            return serializer
+
     def addDocument(self, schema: str, data_dict: dict):
         """
         Adds a document to the index with fields from a dictionary
@@ -171,25 +448,8 @@ class ArticleIndex(object):
         Returns:
             None
         """
-        # Create an empty dictionary to hold schema relevant key, value pairs.
-        document_dict = {}
-
-        for key, value in data_dict.items():
-            # Check to see if key is in the schema.
-            if key in self.get_fields(schema):
-                if value is not None and value != '':
-                    # For lists create a string with comma separated tags.
-                    if type(value) is list and value != []:
-                        tags = ''
-                        for tag in value:
-                            tags += '{},'.format(tag)
-                        value = tags[:-1]  # Drop the last comma.
-                    document_dict[key] = u"{}".format(value)  # Convert value to unicode and add to the doc dict
-
-        # Add the new document to the inedx schema
-        writer = self.schemas[schema].writer()
-        writer.add_document(**document_dict)
-        writer.commit()
+        with self.batch(schema) as batch:
+            batch.addDocument(data_dict)
 
     def updateDocument(self, schema, data_dict: dict):
         """
@@ -198,19 +458,8 @@ class ArticleIndex(object):
         :param data_dict: must contain the th unique document identifier as a field
         :return:
         """
-        document_dict = {}
-        for key, value in data_dict.items():
-            if key in self.get_fields(schema):
-                if value is not None and value != '':
-                    if type(value) is list and value != []:
-                        tags = ''
-                        for tag in value:
-                            tags += '{},'.format(tag)
-                        value = tags[:-1]
-                    document_dict[key] = u"{}".format(value)
-        writer = self.schemas[schema].writer()
-        writer.update_document(**document_dict)
-        writer.commit()
+        with self.batch(schema) as batch:
+            batch.updateDocument(data_dict)
 
     def removeDocument(self, schema, docnum: int):
         """
@@ -218,62 +467,451 @@ class ArticleIndex(object):
         :param docnum: docnum
         :return:
         """
-        writer = self.schemas[schema].writer()
-        writer.delete_document(docnum)
-        writer.commit()
+        with self.batch(schema) as batch:
+            batch.removeDocument(docnum)
+
+    #####
+    # Batch Document Functions
+    #####
+
+    def batch(self, schema: str, optimize: bool=False):
+        """
+        Creates a context manager that stages document changes under a single index writer and commits them once on
+        exit. If an exception is raised within the context all staged changes are discarded.
+
+        Example:
+            with article_index.batch('local_articles') as batch:
+                for data_dict in documents:
+                    batch.addDocument(data_dict)
+
+        Args:
+            schema: Name of the Whoosh index schema to write to.
+            optimize: If True the index segments are merged into one when the batch is committed.
+
+        Returns:
+            IndexBatch
+        """
+        return IndexBatch(self, schema, optimize)
+
+    def addDocuments(self, schema: str, data_dicts, optimize: bool=False):
+        """
+        Adds multiple documents to the index with a single commit.
+
+        Args:
+            schema: Name of the Whoosh index schema to add documents to.
+            data_dicts: Iterable of document metadata dictionaries.
+            optimize: If True the index segments are merged once the documents are committed.
+
+        Returns:
+            n_docs (int): Number of documents added.
+        """
+        with self.batch(schema, optimize) as batch:
+            for data_dict in data_dicts:
+                batch.addDocument(data_dict)
+        return batch.n_docs
+
+    def updateDocuments(self, schema: str, data_dicts, optimize: bool=False):
+        """
+        Updates multiple existing documents with a single commit. Each dictionary must contain the unique document
+        identifier as a field.
+
+        Args:
+            schema: Name of the Whoosh index schema containing the documents.
+            data_dicts: Iterable of document metadata dictionaries.
+            optimize: If True the index segments are merged once the documents are committed.
+
+        Returns:
+            n_docs (int): Number of documents updated.
+        """
+        with self.batch(schema, optimize) as batch:
+            for data_dict in data_dicts:
+                batch.updateDocument(data_dict)
+        return batch.n_docs
+
+    def removeDocuments(self, schema: str, docnums, optimize: bool=False):
+        """
+        Removes multiple documents from the index by their document numbers with a single commit.
+
+        Args:
+            schema: Name of the Whoosh index schema containing the documents.
+            docnums: Iterable of document numbers.
+            optimize: If True the index segments are merged once the deletions are committed.
+
+        Returns:
+            n_docs (int): Number of documents removed.
+        """
+        with self.batch(schema, optimize) as batch:
+            for docnum in docnums:
+                batch.removeDocument(docnum)
+        return batch.n_docs
+
+    def removeDocumentsByTerm(self, schema: str, field: str, values, optimize: bool=False):
+        """
+        Removes all documents with any of the given values of a field with a single commit, for example removing
+        deleted articles by their article id.
+
+        Args:
+            schema: Name of the Whoosh index schema containing the documents.
+            field: Name of an indexed field, such as 'id'.
+            values: Iterable of field values. Values are converted to strings.
+            optimize: If True the index segments are merged once the deletions are committed.
+
+        Returns:
+            n_docs (int): Number of documents removed.
+        """
+        with self.batch(schema, optimize) as batch:
+            for value in values:
+                batch.removeDocumentsByTerm(field, value)
+        return batch.n_docs
+
+    def stored_values(self, schema: str, key_field: str, value_field: str):
+        """
+        Maps the stored values of one field to those of another across all documents of a schema, for example article
+        id to modified date, to find documents that are out of date.
+
+        Args:
+            schema: Name of the Whoosh index schema.
+            key_field: Stored field to key the mapping by.
+            value_field: Stored field to map to.
+
+        Returns:
+            values (dict): Values of value_field keyed by the values of key_field. Documents without the key are left out.
+        """
+        values = {}
+        with self._search_lock:
+            for fields in self.searcher(schema).all_stored_fields():
+                if key_field in fields:
+                    values[fields[key_field]] = fields.get(value_field)
+        return values
 
     #####
     # Search Functions
     #####
 
+    def searcher(self, schema: str):
+        """
+        Returns a long lived searcher of the given schema. The searcher is only replaced when the index has changed
+        since it was opened, at which point any cached results for the schema are discarded.
+
+        Args:
+            schema: Name of the Whoosh index schema to search.
+
+        Returns:
+            whoosh.searching.Searcher
+        """
+        with self._search_lock:
+            searcher = self._searchers.get(schema)
+            if searcher is None:
+                searcher = self.schemas[schema].searcher()
+            elif not searcher.up_to_date():
+                # Refreshing reuses the unchanged segments and closes the old reader
+                searcher = searcher.refresh()
+                self._result_cache.pop(schema, None)
+                self._facet_cache.pop(schema, None)
+            self._searchers[schema] = searcher
+            return searcher
+
+    def invalidate(self, schema: str, fields_changed: bool=False):
+        """
+        Discards the cached search results of a schema. Called whenever documents are written to the schema.
+
+        Args:
+            schema: Name of the Whoosh index schema.
+            fields_changed: If True the cached query parsers of the schema are also discarded.
+
+        Returns:
+            None
+        """
+        with self._search_lock:
+            self._result_cache.pop(schema, None)
+            self._facet_cache.pop(schema, None)
+            if fields_changed:
+                self._serializers.pop(schema, None)
+                for key in [key for key in self._parsers if key[0] == schema]:
+                    del self._parsers[key]
+                searcher = self._searchers.pop(schema, None)
+                if searcher is not None:
+                    searcher.close()
+
+    def parse_query(self, schema: str, field: str, query: str):
+        """
+        Parses a query string. A blank field searches all fields of the schema.
+
+        Args:
+            schema: Name of the Whoosh index schema.
+            field: Name of the field to search, or '' for all fields.
+            query: Query string.
+
+        Returns:
+            whoosh.query.Query
+        """
+        key = (schema, field)
+        with self._search_lock:
+            parser = self._parsers.get(key)
+            if parser is None:
+                index_schema = self.schemas[schema].schema
+                if field == '':
+                    parser = MultifieldParser(self.get_fields(schema=schema), index_schema)
+                else:
+                    parser = QueryParser(field, index_schema)
+                # Allow numeric and date comparisons such as xres:>=512 and date:>20170101, alongside ranges such as
+                # vgap:[0.5 TO 2]
+                parser.add_plugin(GtLtPlugin())
+                parser.add_plugin(DateParserPlugin())
+                self._parsers[key] = parser
+
+        # Comparisons need a field name before them, so a bare comparison is applied to the searched field
+        if field != '' and query.lstrip()[:1] in ('<', '>', '='):
+            query = '{}:{}'.format(field, query.lstrip())
+        try:
+            return parser.parse(query)
+        except (QueryParserError, IndexError, ValueError):
+            # Incomplete comparisons typed while searching as you type match nothing rather than failing
+            return NullQuery
+
+    def search_hits(self, schema: str, field: str, query: str, limit: int=None):
+        """
+        Returns the matching documents of a query, in order of relevance. The shared searcher is not thread safe, so
+        the hits are collected in full while other searches of the index wait, rather than handed out one at a time.
+
+        Args:
+            schema: Name of the Whoosh index schema to search.
+            field: Name of the field to search, or '' for all fields.
+            query: Query string.
+            limit: Maximum number of documents to return. None returns all matches.
+
+        Returns:
+            hits (list): (docnum, stored fields dict) tuples.
+        """
+        search_query = self.parse_query(schema, field, query)
+        with self._search_lock:
+            results = self.searcher(schema).search(search_query, limit=limit)
+            return [(hit.docnum, hit.fields()) for hit in results]
+
+    def search(self, schema: str, field: str, query: str):
+        """
+        Returns all documents matching a query. The query is parsed once and the results collected in a single pass.
+        Recent results are cached until the schema is next written to.
+
+        Args:
+            schema: Name of the Whoosh index schema to search.
+            field: Name of the field to search, or '' for all fields.
+            query: Query string.
+
+        Returns:
+            results (dict): Stored fields dictionaries keyed by document number, in order of relevance.
+        """
+        key = (field, query)
+        with self._search_lock:
+            # Refreshing the searcher clears the cache if the index has changed on disk
+            self.searcher(schema)
+
+            schema_cache = self._result_cache.setdefault(schema, collections.OrderedDict())
+            if key in schema_cache:
+                schema_cache.move_to_end(key)
+                return dict(schema_cache[key])
+
+            results = collections.OrderedDict(self.search_hits(schema, field, query))
+
+            schema_cache[key] = results
+            while len(schema_cache) > self.cache_size:
+                schema_cache.popitem(last=False)
+
+        return dict(results)
+
+    #####
+    # Facet Functions
+    #####
+
+    def facet_fields(self, schema: str):
+        """
+        Returns the names of the fields of a schema that can be faceted. These are the keyword, id and boolean fields,
+        whose indexed terms are whole values.
+
+        Args:
+            schema: Name of the Whoosh index schema.
+
+        Returns:
+            list of str
+        """
+        index_schema = self.schemas[schema].schema
+        return [name for name, field in index_schema.items() if isinstance(field, (KEYWORD, ID, BOOLEAN))]
+
+    def facets(self, schema: str, fields, id_field: str='id'):
+        """
+        Groups the documents of a schema by the values of each of the given fields. All fields not already cached are
+        grouped together in a single pass over the index. The groups are cached until the schema is next written to.
+
+        Args:
+            schema: Name of the Whoosh index schema.
+            fields: Names of the fields to facet. Fields that are not in the schema or cannot be faceted are left out.
+            id_field: Stored field identifying the documents in the returned groups.
+
+        Returns:
+            facets (dict): For each field, a dictionary of the field values to the frozenset of ids of the documents
+                with that value. A multi-valued keyword field puts a document into the group of each of its values.
+        """
+        facetable = set(self.facet_fields(schema))
+        fields = [field for field in fields if field in facetable]
+
+        with self._search_lock:
+            searcher = self.searcher(schema)
+            schema_cache = self._facet_cache.setdefault(schema, {})
+
+            missing = [field for field in fields if field not in schema_cache]
+            if missing:
+                groupedby = sorting.Facets()
+                for field in missing:
+                    groupedby.add_field(field, allow_overlap=True)
+                results = searcher.search(Every(), groupedby=groupedby, limit=None)
+
+                doc_ids = {docnum: stored[id_field] for docnum, stored in searcher.reader().iter_docs()
+                           if id_field in stored}
+
+                for field in missing:
+                    groups = {}
+                    for value, docnums in results.groups(field).items():
+                        if value is None:
+                            continue
+                        ids = frozenset(doc_ids[docnum] for docnum in docnums if docnum in doc_ids)
+                        if ids:
+                            groups[value] = ids
+                    schema_cache[field] = groups
+
+            return {field: schema_cache[field] for field in fields}
+
+    def facet_counts(self, schema: str, fields, within=None):
+        """
+        Counts the documents with each value of the given fields.
+
+        Args:
+            schema: Name of the Whoosh index schema.
+            fields: Names of the fields to count.
+            within: Optional set of document ids to restrict the counts to, such as the results of a search.
+
+        Returns:
+            counts (dict): For each field, a dictionary of field values to document counts. Values with no documents
+                are left out.
+        """
+        counts = {}
+        for field, groups in self.facets(schema, fields).items():
+            if within is None:
+                counts[field] = {value: len(ids) for value, ids in groups.items()}
+            else:
+                field_counts = {value: len(ids & within) for value, ids in groups.items()}
+                counts[field] = {value: n for value, n in field_counts.items() if n}
+        return counts
+
     def perform_search(self, schema, field: str, query: str, page: int=1, pagelen: int=20):
         """
         Performs a query of the index from the given field and query string
         :param schema:
-        :param field: String. Index field
+        :param field: String. Index field, or an empty string to search all fields
         :param query: String.
         :param page: int. starting page of results to return results from
-        :param pagelen: int. number of results to display per page
-        :return: list. results
+        :param pagelen: int. number of results per page
+        :return: dict. stored fields of the results keyed by document number
+        """
+        results = self.search(schema, field, query)
+        if page > 1:
+            results = dict(list(results.items())[(page - 1) * pagelen:])
+        return results
+
+
+class IndexBatch(object):
+    """
+    Stages document additions, updates and removals for one ArticleIndex schema under a single Whoosh writer. Created
+    through ArticleIndex.batch() and used as a context manager. Batches started from other threads wait until this one
+    is committed or cancelled.
+    """
+
+    def __init__(self, article_index: ArticleIndex, schema: str, optimize: bool=False):
         """
-        if field is '':
+        Args:
+            article_index: Index holding the schema to be written to.
+            schema: Name of the Whoosh index schema.
+            optimize: If True the index segments are merged into one on commit.
+        """
+        self.article_index = article_index
+        self.schema = schema
+        self.optimize = optimize
+
+        self.writer = None
+        self.serialize = None
+        self.n_docs = 0
+
+    def __enter__(self):
+        self.article_index._write_lock.acquire()
+        try:
+            self.serialize = self.article_index.document_serializer(self.schema)
+            self.writer = self.article_index.schemas[self.schema].writer()
+        except BaseException:
+            self.article_index._write_lock.release()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_type is None:
+                self.writer.commit(optimize=self.optimize)
+                self.article_index.invalidate(self.schema)
+            else:
+                self.writer.cancel()
+        finally:
+            self.writer = None
+            self.article_index._write_lock.release()
+        return False
+
+    def addDocument(self, data_dict: dict):
+        """
+        Stages a new document built from the schema relevant fields of the given dictionary.
 
-            # Get All Schema fields
-            fields = self.get_fields(schema=schema)
+        Args:
+            data_dict: Dictionary of document metadata.
 
-            results_dict = {}
+        Returns:
+            None
+        """
+        document_dict = self.serialize(data_dict)
+        self.writer.add_document(**document_dict)
+        self.n_docs += 1
 
-            with self.schemas[schema].searcher() as searcher:
-                last_page = False
-                while not last_page:
-                    parser = MultifieldParser(fields, self.schemas[schema].schema)
-                    search_query = parser.parse(query)
-                    results = searcher.search_page(search_query, page, pagelen)
+    def updateDocument(self, data_dict: dict):
+        """
+        Stages the replacement of an existing document, matched on the schema unique fields.
 
-                    if results.total > 0:
-                        for doc in range(results.pagelen):
-                            results_dict[results.docnum(doc)] = results.results.fields(doc)
+        Args:
+            data_dict: Dictionary of document metadata, must contain the unique document identifier.
 
-                    last_page = results.is_last_page()
-                    page += 1
+        Returns:
+            None
+        """
+        document_dict = self.serialize(data_dict)
+        self.writer.update_document(**document_dict)
+        self.n_docs += 1
 
-            return results_dict
+    def removeDocument(self, docnum: int):
+        """
+        Stages the removal of a document by its document number.
 
-        else:
-            results_dict = {}
+        Args:
+            docnum: Whoosh document number.
 
-            with self.schemas[schema].searcher() as searcher:
-                last_page = False
-                while not last_page:
-                    parser = QueryParser(field, self.schemas[schema].schema)
-                    search_query = parser.parse(query)
-                    results = searcher.search_page(search_query, page, pagelen)
+        Returns:
+            None
+        """
+        self.writer.delete_document(docnum)
+        self.n_docs += 1
 
-                    if results.total > 0:
-                        for doc in range(results.pagelen):
-                            results_dict[results.docnum(doc)] = results.results.fields(doc)
+    def removeDocumentsByTerm(self, field: str, value):
+        """
+        Stages the removal of all documents with the given value of a field.
 
-                    last_page = results.is_last_page()
-                    page += 1
+        Args:
+            field: Name of an indexed field.
+            value: Field value. Converted to a string.
 
-            return results_dict
+        Returns:
+            None
+        """
+        self.n_docs += self.writer.delete_by_term(field, u"{}".format(value))
@@ -3,17 +3,18 @@
 """
 
 import os
+import time
 
-from requests import HTTPError
-
-from PyQt5.QtWidgets import (QWidget, QPushButton, QLineEdit, QMessageBox, QFileDialog, QAbstractItemView,
+from PyQt5.QtWidgets import (QWidget, QPushButton, QLabel, QLineEdit, QMessageBox, QFileDialog, QAbstractItemView,
                              QTextEdit, QGridLayout, QHBoxLayout, QVBoxLayout, QSizePolicy, QTreeWidgetItem,
                              QInputDialog)
 from PyQt5.QtGui import (QIcon, QFont, QPalette, QColor)
-from PyQt5.QtCore import (Qt, QThread, pyqtSlot, pyqtSignal, QObject)
+from PyQt5.QtCore import (Qt, QThread, QTimer, pyqtSlot, pyqtSignal, QObject)
 
 from Figshare_desktop.formatting.formatting import (press_button)
-from figshare_interface.figshare_structures.projects import Projects
+from Figshare_desktop.background_jobs.concurrency import map_as_completed
+from Figshare_desktop.data_window.chunked_upload import ChunkedUploader
+from Figshare_desktop.local_store.upload_journal import UploadJournal
 from figshare_interface.figshare_structures.collections import Collections
 
 __author__ = "Tobias Gill"
@@ -24,20 +25,34 @@ __maintainer__ = "Tobias Gill"
 __email__ = "toby.gill.09@ucl.ac.uk"
 __status__ = "Development"
 
+# Default number of articles uploaded concurrently
+DEFAULT_UPLOAD_WORKERS = 4
+
 
 class UploadControl(QWidget):
 
-    def __init__(self, app, OAuth_token, parent):
+    def __init__(self, app, OAuth_token, parent, max_workers: int=DEFAULT_UPLOAD_WORKERS):
         super().__init__()
 
         self.app = app
         self.token = OAuth_token
         self.parent = parent
+        # Number of articles to upload concurrently
+        self.max_workers = max_workers
+
+        # Interrupted uploads are resumed from the journal, either when the same file is uploaded to the same project
+        # again or when the user accepts the offer to resume them made at startup
+        self.uploader = ChunkedUploader(self.token, UploadJournal(self.token))
 
         self.__threads = []
+        # Upload workers the stop button aborts
+        self.running_workers = set()
 
         self.initUI()
 
+        # The upload log is only created after this widget, so the offer waits for the event loop
+        QTimer.singleShot(0, self.offer_resume)
+
     #####
     # Widgets
     #####
@@ -48,6 +63,7 @@ class UploadControl(QWidget):
 
         vbox.addWidget(self.start_upload_btn())
         vbox.addWidget(self.stop_upload_btn())
+        vbox.addWidget(self.throughput_label())
 
         self.setLayout(vbox)
 
@@ -83,16 +99,62 @@ class UploadControl(QWidget):
         btn.setToolTipDuration(1)
         btn.setEnabled(False)
 
-        #btn.pressed.connect(self.stop_upload)
-
         self.stop_btn = btn
 
         return self.stop_btn
 
+    def throughput_label(self):
+        """
+        Creates a QLabel that displays the aggregate upload rate
+        :return: QLabel
+        """
+        lbl = QLabel()
+        lbl.setAlignment(Qt.AlignCenter)
+        lbl.setToolTip('Aggregate upload rate')
+
+        self.rate_lbl = lbl
+
+        return self.rate_lbl
+
     #####
     # Actions
     #####
 
+    @pyqtSlot(float, int)
+    def update_throughput(self, bytes_per_sec: float, total_bytes: int):
+        """
+        Called to update the displayed upload rate
+        :param bytes_per_sec: aggregate upload rate
+        :param total_bytes: total number of bytes uploaded
+        :return:
+        """
+        self.rate_lbl.setText('{:.2f} MB/s\n{:.1f} MB'.format(bytes_per_sec / 1e6, total_bytes / 1e6))
+
+    def watch_worker(self, worker):
+        """
+        Lets the stop button abort an upload worker until it is done. Uploads already started are finished, and the
+        rest are left in the queue
+        :param worker: UploadWorker
+        :return:
+        """
+        # The worker thread is busy running the uploads, so the abort is made directly rather than queued to it
+        self.stop_btn.clicked.connect(worker.abort, Qt.DirectConnection)
+        worker.sig_done.connect(self.worker_done)
+        self.running_workers.add(worker)
+        self.stop_btn.setEnabled(True)
+
+    @pyqtSlot(bool)
+    def worker_done(self, done: bool):
+        """
+        Called when an upload worker has finished
+        :return:
+        """
+        worker = self.sender()
+        if worker in self.running_workers:
+            self.running_workers.discard(worker)
+            self.stop_btn.clicked.disconnect(worker.abort)
+        self.stop_btn.setEnabled(bool(self.running_workers))
+
     def enable_start(self):
         """
         Called to enable the start upload button
@@ -100,6 +162,55 @@ class UploadControl(QWidget):
         """
         self.start_btn.setEnabled(True)
 
+    def offer_resume(self):
+        """
+        Asks whether to resume the uploads left incomplete when the application last closed, if there are any
+        :return:
+        """
+        entries = self.uploader.journal.incomplete()
+        if not entries:
+            return
+
+        msg_box = QMessageBox(self)
+        msg_box.setIcon(QMessageBox.Question)
+        msg_box.setWindowTitle('Resume Uploads')
+        msg_box.setText('{} uploads were interrupted before they completed. Resume them now?'.format(len(entries)))
+        msg_box.setInformativeText('Discarded uploads are started again from the beginning if re-queued.')
+        msg_box.setDetailedText('\n'.join(entry['local_path'] for entry in entries))
+        msg_box.setStandardButtons(QMessageBox.Yes | QMessageBox.No | QMessageBox.Discard)
+        msg_box.setDefaultButton(QMessageBox.Yes)
+
+        reply = msg_box.exec_()
+        if reply == QMessageBox.Yes:
+            self.resume_uploads(entries)
+        elif reply == QMessageBox.Discard:
+            for entry in entries:
+                self.uploader.journal.remove(entry['local_path'], entry['project_id'])
+
+    def resume_uploads(self, entries: list):
+        """
+        Resumes uploads left incomplete by an earlier session in a background thread
+        :param entries: upload journal entries, as returned by UploadJournal.incomplete()
+        :return:
+        """
+        upload_log = self.parent.figshare_add_window.upload_log
+
+        worker = ResumeWorker(self.token, self.parent, self.uploader, entries, max_workers=self.max_workers)
+
+        resume_thread = QThread()
+        self.__threads.append((resume_thread, worker))
+
+        worker.moveToThread(resume_thread)
+
+        worker.sig_step.connect(upload_log.add_success_log)
+        worker.sig_error.connect(upload_log.add_error_log)
+        worker.sig_throughput.connect(self.update_throughput)
+        worker.sig_done.connect(resume_thread.quit)
+        self.watch_worker(worker)
+
+        resume_thread.started.connect(worker.work)
+        resume_thread.start()
+
     def start_upload(self):
         """
         Starts the upload of articles to the defined figshare project
@@ -114,7 +225,7 @@ class UploadControl(QWidget):
         upload_log = figshare_add_window.upload_log
 
         # Setup the Upload Worker Thread
-        worker = UploadWorker(self.token, self.parent)
+        worker = UploadWorker(self.token, self.parent, self.uploader, max_workers=self.max_workers)
 
         upload_thread = QThread()
         self.__threads.append((upload_thread, worker))
@@ -123,13 +234,19 @@ class UploadControl(QWidget):
 
         # Remove local articles from the queue as they are uploaded
         worker.sig_step.connect(lambda local_article_id, figshare_article_id,
-                                       aritcle_title: upload_queue.fill_tree())
+                                       aritcle_title: upload_queue.remove_from_tree(local_article_id))
         # Log the upload
         worker.sig_step.connect(upload_log.add_success_log)
 
         # Log errors
         worker.sig_error.connect(upload_log.add_error_log)
-        worker.sig_error.connect(lambda local_id, title, errs: upload_queue.fill_tree())
+        worker.sig_error.connect(lambda local_id, title, errs: upload_queue.remove_from_tree(local_id))
+
+        # Display the aggregate upload rate
+        worker.sig_throughput.connect(self.update_throughput)
+
+        worker.sig_done.connect(upload_thread.quit)
+        self.watch_worker(worker)
 
         upload_thread.started.connect(worker.work)
         upload_thread.start()
@@ -141,17 +258,26 @@ class UploadWorker(QObject):
     sig_done = pyqtSignal(bool)
     sig_error = pyqtSignal(str, str, tuple)
     sig_abort = pyqtSignal(bool)
+    sig_throughput = pyqtSignal(float, int)
 
-    def __init__(self, OAuth_token, parent):
+    def __init__(self, OAuth_token, parent, uploader, max_workers: int=DEFAULT_UPLOAD_WORKERS):
         super().__init__()
+        self.__abort = False
 
         self.token = OAuth_token
         self.parent = parent
+        self.uploader = uploader
+        self.max_workers = max_workers
+
+        # Aggregate upload statistics
+        self.start_time = None
+        self.bytes_uploaded = 0
 
     @pyqtSlot()
     def work(self):
         """
-
+        Uploads the articles in the upload queue using a pool of concurrent uploads. Signals are emitted from this
+        thread as each article completes.
         :return:
         """
         # Locally define some windows and widgets
@@ -161,24 +287,69 @@ class UploadWorker(QObject):
         self.collection_id = figshare_add_window.upload_collection
 
         # Get the upload project id
-        if self.project_id is not None:
-            projects = Projects(self.token)
-        else:
+        if self.project_id is None:
             return self.sig_done.emit(True)
 
         if self.collection_id is not None and self.collection_id != '':
             collections = Collections(self.token)
 
+        self.start_time = time.time()
+        self.bytes_uploaded = 0
+
+        # Uploads are not retried as a whole, as an article creation that timed out may still have created the article
+        # without the journal recording it. The transport retries the requests that are safe to repeat, and a failed
+        # upload resumes from the last step confirmed in the journal when it is next uploaded
+        results = map_as_completed(self.project_upload, self.queued_ids(upload_queue), max_workers=self.max_workers,
+                                   abort=self.is_aborted, backoff=False)
+
+        for local_article_id, result, err in results:
+            if err is None:
+                figshare_article_id, article_title, n_bytes = result
+                self.bytes_uploaded += n_bytes
+                # Signal that the article has been created and uploaded
+                self.sig_step.emit(local_article_id, figshare_article_id, article_title)
+                self.sig_throughput.emit(self.throughput(), self.bytes_uploaded)
+            else:
+                article_title = self.parent.local_articles[local_article_id].figshare_metadata['title']
+                self.sig_error.emit(local_article_id, article_title, err.args)
+
+        self.sig_done.emit(True)
+
+    @pyqtSlot()
+    def abort(self):
+        self.__abort = True
+
+    def is_aborted(self):
+        return self.__abort
+
+    @staticmethod
+    def queued_ids(upload_queue):
+        """
+        Generator that removes local article ids from the upload queue as they are started
+        :param upload_queue: figshare_add_article_list.ArticleList
+        :return: str. local article id
+        """
         while upload_queue.local_ids:
-            local_article_id = upload_queue.local_ids.pop()
-            self.project_upload(projects, local_article_id)
+            yield upload_queue.local_ids.pop()
 
-    def project_upload(self, projects_instance, local_article_id: str):
+    def throughput(self):
+        """
+        Returns the aggregate upload rate since the upload was started
+        :return: float. bytes per second
+        """
+        if self.start_time is None:
+            return 0.
+        elapsed = time.time() - self.start_time
+        if elapsed <= 0:
+            return 0.
+        return self.bytes_uploaded / elapsed
+
+    def project_upload(self, local_article_id: str):
         """
-        Creates a new figshare article and uploads the file associated with it
-        :param projects_instance: Instance of the Figshare_API_Interface Projects Class
+        Creates a new figshare article and uploads the file associated with it, resuming any earlier interrupted upload
+        of the same file to the same project. Called from the upload thread pool.
         :param local_article_id: local id number of the article to be uploaded
-        :return:
+        :return: tuple. figshare article id, article title, and number of bytes sent
         """
 
         # Get the local article
@@ -191,22 +362,43 @@ class UploadWorker(QObject):
         # Get the local file location
         local_location = local_article.figshare_desktop_metadata['location']
 
-        # Upload file to the figshare project
-        try:
-            # Create a new figshare article in the given project
-            figshare_article_id = projects_instance.create_article(self.project_id, upload_dict)
-            # Upload files to the new article
-            projects_instance.upload_file(figshare_article_id, local_location)
-
-            # Signal that the article has been created and uploaded
-            self.sig_step.emit(local_article_id, figshare_article_id, article_title)
-
-        except FileExistsError as err:
-            err_args = err.args
-            self.sig_error.emit(local_article_id, article_title, err_args)
-        except HTTPError as err:
-            err_args = err.args
-            self.sig_error.emit(local_article_id, article_title, err_args)
-        except ValueError as err:
-            err_args = err.args
-            self.sig_error.emit(local_article_id, article_title, err_args)
+        # Create a new figshare article in the given project and upload the file parts to it
+        figshare_article_id, bytes_sent = self.uploader.upload(self.project_id, local_location, upload_dict)
+
+        return figshare_article_id, article_title, bytes_sent
+
+
+class ResumeWorker(UploadWorker):
+    """
+    Worker resuming the uploads left incomplete by an earlier session. Uploads are logged by local file path, as they
+    no longer have a local article.
+    """
+
+    def __init__(self, OAuth_token, parent, uploader, entries: list, max_workers: int=DEFAULT_UPLOAD_WORKERS):
+        super().__init__(OAuth_token, parent, uploader, max_workers=max_workers)
+        self.entries = entries
+
+    @pyqtSlot()
+    def work(self):
+        """
+        Resumes each journaled upload using a pool of concurrent uploads
+        :return:
+        """
+        self.start_time = time.time()
+        self.bytes_uploaded = 0
+
+        # As for new uploads, only the requests that are safe to repeat are retried, by the transport
+        results = map_as_completed(self.uploader.resume_interrupted, self.entries, max_workers=self.max_workers,
+                                   abort=self.is_aborted, backoff=False)
+
+        for entry, result, err in results:
+            article_title = (entry['upload_dict'] or {}).get('title', os.path.basename(entry['local_path']))
+            if err is None:
+                figshare_article_id, n_bytes = result
+                self.bytes_uploaded += n_bytes
+                self.sig_step.emit(entry['local_path'], figshare_article_id, article_title)
+                self.sig_throughput.emit(self.throughput(), self.bytes_uploaded)
+            else:
+                self.sig_error.emit(entry['local_path'], article_title, err.args)
+
+        self.sig_done.emit(True)
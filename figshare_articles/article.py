@@ -8,6 +8,8 @@ from figshare_interface.figshare_structures.projects import Projects
 from figshare_interface.figshare_structures.collections import Collections
 from figshare_interface.http_requests.figshare_requests import issue_request
 
+from Figshare_desktop.local_store.reference_data import get_reference_data
+
 __author__ = "Tobias Gill"
 __credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
 __license__ = ""
@@ -22,7 +24,7 @@ class Article(object):
     Figshare Article Base Class
     """
 
-    def __init__(self, OAuth_token: str, project_id: int, article_id: str):
+    def __init__(self, OAuth_token: str, project_id: int, article_id: str, cached_dicts: list=None):
         """
         Creates the base Figshare metadata dictionary for an article and fills all available information.
 
@@ -30,6 +32,8 @@ class Article(object):
             OAuth_token: Authentication token generated from Figshare login.
             project_id: ID number of Figshare project article is within.
             article_id: ID number of the Figshare article.
+            cached_dicts: Optional list of previously saved metadata dictionaries, in the order given by input_dicts().
+                If given the article is restored from them and no request is made to Figshare.
 
         Returns:
             None
@@ -72,18 +76,24 @@ class Article(object):
         # Initialize an empty object that will hold generated QTreeWidgetItem representations of the article
         self.qtreeitem = None
 
-        # Request the article information from Figshare and fill the initialised metadata dictionaries
-        self.fill_info()
+        if cached_dicts is not None:
+            # Restore the metadata dictionaries from a local cache
+            self.restore_info(cached_dicts)
+        else:
+            # Request the article information from Figshare and fill the initialised metadata dictionaries
+            self.fill_info()
 
         # Set the location field to Figshare to denote that it is not a local file
         self.figshare_desktop_metadata['location'] = 'Figshare'
 
-    def gen_figshare_metadata(self, input_dict: dict):
+    def gen_figshare_metadata(self, input_dict: dict, fetch_public: bool=True):
         """
         Fill values in basic figshare_metadata dictionary from an input dictionary.
 
         Args:
             input_dict: Common keys in input_dict and figshare_metadata dict have values set to those of input_dict
+            fetch_public: If False the modified date of a public article's public version is not requested from
+                Figshare, and the date already held is used.
 
         Returns:
             None
@@ -99,7 +109,7 @@ class Article(object):
                     self.figshare_metadata[key] = input_dict[key]
 
         # For published articles check to see if the public article is up-to-date
-        if self.figshare_metadata['status'] == 'public':
+        if self.figshare_metadata['status'] == 'public' and fetch_public:
             # Get the date of the last modification to the public article
             result = issue_request('GET', 'articles/{a_id}'.format(a_id=self.article_id), token=self.token)
             date = result['modified_date']
@@ -220,19 +230,37 @@ class Article(object):
         # Perform a check on the format of the filled information
         self.check_basic()
 
-    def update_info(self, input_dict: dict):
+    def restore_info(self, cached_dicts: list):
+        """
+        Fills the local metadata dictionaries from previously saved copies, without contacting Figshare.
+
+        Args:
+            cached_dicts: List of metadata dictionaries in the order given by input_dicts().
+
+        Returns:
+            None
+        Raises:
+            None
+        """
+        for local_dict, cached_dict in zip(self.input_dicts(), cached_dicts):
+            for key, value in cached_dict.items():
+                if key in local_dict:
+                    local_dict[key] = value
+
+    def update_info(self, input_dict: dict, fetch_public: bool=True):
         """
         Updates the local metadata dictionaries from a given input dictionary.
 
         Args:
             input_dict: Key, Value pairs to overwrite existing values in the article metadata dictionaries.
+            fetch_public: If False no request is made to Figshare for the public version of a public article.
         Returns:
             None
         Raises:
             None
         """
         # Use the input dictionary to fill the local metadata dictionaries
-        self.gen_figshare_metadata(input_dict)
+        self.gen_figshare_metadata(input_dict, fetch_public)
         # Perform a check on the format of the filled information
         self.check_basic()
 
@@ -342,11 +370,8 @@ class Article(object):
         # category names on Figshare.
         cats = self.figshare_metadata['categories']  # get the current value
         if cats is not None:
-            # Get a dictionary of categories from Figshare with id and name pairs
-            allowed_cats = issue_request(method='GET', endpoint='categories', token=self.token)
-            cat_dict = {}
-            for cat in allowed_cats:
-                cat_dict[cat['id']] = cat['title']
+            # Get the cached dictionary of Figshare categories with id and name pairs
+            cat_dict, cat_names = get_reference_data(self.token).get_categories()
 
             # If the current value of categories is a list check each of the items
             if type(cats) is list:
@@ -369,11 +394,8 @@ class Article(object):
                                 checked_cats.append(cat_id)
                         # If the string could not be converted check if the string is the name of a category
                         except:
-                            if cat in cat_dict.values():
-                                for key, value in cat_dict.items():
-                                    if value == cat:
-                                        checked_cats.append(key)
-                                        break
+                            if cat in cat_names:
+                                checked_cats.append(cat_names[cat])
                     # If the category value is an integer check to see if it is a valid ID
                     elif cat_type is int:
                         if cat in cat_dict:
@@ -478,14 +500,8 @@ class Article(object):
         # License should be a string of an integer corresponding to a predefined value
         lic = self.figshare_metadata['license'] # Get the current value of the license
 
-        # Retrieve a list of available licenses from Figshare
-        # Yields a list of dictionaries, with string-integer: name pairs
-        lics_list = issue_request(method='GET', endpoint='account/licenses', token=self.token)
-
-        # Convert the list of dictionaries into a single dictionary
-        allowed_lics = {}
-        for d in lics_list:
-            allowed_lics[d['value']] = d['name']
+        # Get the cached dictionary of available Figshare licenses, with string-integer: name pairs
+        allowed_lics, lic_names = get_reference_data(self.token).get_licenses()
 
         if lic is not None:
             lic_type = type(lic)  # get the type of the value
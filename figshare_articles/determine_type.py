@@ -20,35 +20,45 @@ __email__ = "toby.gill.09@ucl.ac.uk"
 __status__ = "Development"
 
 
-def gen_article(filename, OAuth_token, project_id, article_id):
+# Article classes of recognised data file types
+file_types = {
+              # OMICRON FLAT FILES
+              '.Z_flat': TopoArticle,
+              '.I(V)_flat': SpecArticle,
+              '.Aux1(V)_flat': SpecArticle,
+              '.Aux2(V)_flat': SpecArticle,
 
-    file_path, file_ext = splitext(filename)
+              # ZYVEX Files
+              '.zad': TopoArticle
+              }
+
+# Local article classes of recognised data file types
+local_file_types = {# OMICRON FLAT FILES
+                    '.Z_flat': LocalTopoArticle
+                    }
+
+
+def data_file_extensions():
+    """
+    Returns the set of file extensions recognised as data files.
+    """
+    return set(file_types) | set(local_file_types)
 
-    file_types = {
-                  # OMICRON FLAT FILES
-                  '.Z_flat': TopoArticle,
-                  '.I(V)_flat': SpecArticle,
-                  '.Aux1(V)_flat': SpecArticle,
-                  '.Aux2(V)_flat': SpecArticle,
 
-                  # ZYVEX Files
-                  '.zad': TopoArticle
-                  }
+def gen_article(filename, OAuth_token, project_id, article_id, cached_dicts=None):
+
+    file_path, file_ext = splitext(filename)
 
     if file_ext in file_types:
-        return file_types[file_ext](OAuth_token, project_id, article_id)
+        return file_types[file_ext](OAuth_token, project_id, article_id, cached_dicts)
     else:
-        return Article(OAuth_token, project_id, article_id)
+        return Article(OAuth_token, project_id, article_id, cached_dicts)
 
 
-def gen_local_article(OAuth_token, filename):
+def gen_local_article(OAuth_token, filename, metadata=None):
     file_path, file_ext = splitext(filename)
 
-    file_types = {# OMICRON FLAT FILES
-                  '.Z_flat': LocalTopoArticle
-    }
-
-    if file_ext in file_types:
-        return file_types[file_ext](OAuth_token, filename, file_ext)
+    if file_ext in local_file_types:
+        return local_file_types[file_ext](OAuth_token, filename, file_ext, metadata)
     else:
         return LocalArticle(OAuth_token, filename)
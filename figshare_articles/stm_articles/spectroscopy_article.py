@@ -16,7 +16,7 @@ __status__ = "Development"
 
 class SpecArticle(Article):
 
-    def __init__(self, OAuth_token, project_id, article_id):
+    def __init__(self, OAuth_token, project_id, article_id, cached_dicts=None):
         # Initialize STM topography metadata dictionary.
         self.stm_spec_metadata = {'type': None,
                                   'vgap': None,
@@ -44,7 +44,7 @@ class SpecArticle(Article):
                                   'harm': None
                                   }
 
-        super().__init__(OAuth_token, project_id, article_id)
+        super().__init__(OAuth_token, project_id, article_id, cached_dicts)
 
     def gen_stm_spec_metadata(self, input_dict):
         """
@@ -69,8 +69,8 @@ class SpecArticle(Article):
         self.gen_stm_spec_metadata(stm_top_info)
         self.check_basic()
 
-    def update_info(self, input_dict):
-        self.gen_figshare_metadata(input_dict)
+    def update_info(self, input_dict, fetch_public=True):
+        self.gen_figshare_metadata(input_dict, fetch_public)
         self.gen_stm_spec_metadata(input_dict)
         self.check_basic()
 
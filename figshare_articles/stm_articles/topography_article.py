@@ -15,7 +15,7 @@ __status__ = "Development"
 
 class TopoArticle(Article):
 
-    def __init__(self, OAuth_token, project_id, article_id):
+    def __init__(self, OAuth_token, project_id, article_id, cached_dicts=None):
 
         # Initialize STM topography metadata dictionary.
         self.stm_topo_metadata = {'type': None,
@@ -40,7 +40,7 @@ class TopoArticle(Article):
                                   'notes': None
                                   }
 
-        super().__init__(OAuth_token, project_id, article_id)
+        super().__init__(OAuth_token, project_id, article_id, cached_dicts)
 
     def gen_stm_topo_metadata(self, input_dict):
         """
@@ -65,8 +65,8 @@ class TopoArticle(Article):
         self.gen_stm_topo_metadata(stm_topo_info)
         self.check_basic()
 
-    def update_info(self, input_dict):
-        self.gen_figshare_metadata(input_dict)
+    def update_info(self, input_dict, fetch_public=True):
+        self.gen_figshare_metadata(input_dict, fetch_public)
         self.gen_stm_topo_metadata(input_dict)
         self.check_basic()
 
@@ -0,0 +1,166 @@
+"""
+Topography Metadata Benchmark
+
+Compares reading the topography metadata of flat files from their headers with loading the whole files, and reports
+any field on which the two disagree.
+
+Usage:
+    python -m Figshare_desktop.local_articles.local_stm_articles.benchmark_metadata [files ...] [--synthetic N]
+
+Without files a set of synthetic flat files is written to a temporary directory and used instead.
+"""
+
+import os
+import sys
+import time
+import struct
+import argparse
+import tempfile
+
+from .flat_header import (FLAT_MAGIC, VALUE_DOUBLE, read_flat_header, topo_metadata)
+from .topo_metadata import load_flat_metadata
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+
+#####
+# Synthetic Files
+#####
+
+def pack_string(value: str):
+    return struct.pack('<I', len(value)) + value.encode('utf-16-le')
+
+
+def pack_axis(name: str, trigger: str, clock_count: int, increment: float):
+    return (pack_string(name) + pack_string(trigger) + pack_string('m') +
+            struct.pack('<IiiddII', clock_count, 0, 1, 0., increment, 1, 0))
+
+
+def write_flat_file(path: str, res: int=512, increment: float=2e-10, vgap: float=1.5, current: float=1e-10):
+    """
+    Writes a topography flat file with mirrored x and y axes holding four scan directions of zeros.
+
+    Args:
+        path: Path of the file to write.
+        res: Number of points along each axis and direction.
+        increment: Physical distance between points.
+        vgap: Gap voltage recorded in the experiment parameters.
+        current: Current setpoint recorded in the experiment parameters.
+
+    Returns:
+        None
+    """
+    item_count = 4 * res * res
+    parts = [FLAT_MAGIC,
+             struct.pack('<I', 2),
+             pack_axis('X', 'X', 2 * res, increment),
+             pack_axis('Y', 'Y', 2 * res, increment),
+             pack_string('Z'), pack_string('TFF_Linear1D'), pack_string('m'),
+             struct.pack('<I', 2), pack_string('Factor'), struct.pack('<d', 1.), pack_string('Offset'),
+             struct.pack('<d', 0.),
+             struct.pack('<II', 1, 1),
+             struct.pack('<Q', int(time.time())), pack_string(''),
+             struct.pack('<II', item_count, item_count), bytes(4 * item_count),
+             struct.pack('<I', 0)]
+    for value in ('STM', '1.0', '', '', '', '', 'user', 'account', ''):
+        parts.append(pack_string(value))
+    parts.append(struct.pack('<III', 1, 1, 2))
+    for element, name, value in (('GapVoltageControl', 'Voltage', vgap), ('Regulator', 'Setpoint_1', current)):
+        parts += [pack_string(element), struct.pack('<I', 1), pack_string(name), struct.pack('<I', VALUE_DOUBLE),
+                  pack_string(''), struct.pack('<d', value)]
+    parts.append(struct.pack('<I', 0))
+
+    with open(path, 'wb') as f:
+        f.write(b''.join(parts))
+
+
+#####
+# Benchmark
+#####
+
+def time_reader(reader, paths: list, repeat: int=3):
+    """
+    Times a metadata reader over a set of files, keeping the fastest of several passes.
+
+    Args:
+        reader: Callable taking a file path and returning a metadata dictionary.
+        paths: Files to read.
+        repeat: Number of passes.
+
+    Returns:
+        seconds (float), results (dict): Fastest pass time and the metadata returned for each file.
+    """
+    best = None
+    results = {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for path in paths:
+            results[path] = reader(path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, results
+
+
+def compare(header_results: dict, full_results: dict):
+    """
+    Lists the fields on which the header and full readers disagree.
+
+    Returns:
+        list of (path, key, header value, full value) tuples
+    """
+    differences = []
+    for path, full in full_results.items():
+        header = header_results.get(path, {})
+        for key in sorted(set(full) | set(header)):
+            if header.get(key) != full.get(key):
+                differences.append((path, key, header.get(key), full.get(key)))
+    return differences
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('files', nargs='*', help='Flat files to read.')
+    parser.add_argument('--synthetic', type=int, default=20, help='Number of synthetic files used without files.')
+    parser.add_argument('--res', type=int, default=512, help='Resolution of the synthetic files.')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed passes.')
+    parser.add_argument('--no-mmap', action='store_true', help='Read headers with plain file reads.')
+    args = parser.parse_args(argv)
+
+    paths = args.files
+    if not paths:
+        directory = tempfile.mkdtemp(prefix='flat_benchmark_')
+        paths = [os.path.join(directory, 'synthetic_{}.Z_flat'.format(n)) for n in range(args.synthetic)]
+        for path in paths:
+            write_flat_file(path, res=args.res)
+
+    size = sum(os.path.getsize(path) for path in paths)
+    print('{} files, {:.1f} MB'.format(len(paths), size / 1e6))
+
+    def header_reader(path):
+        return topo_metadata(read_flat_header(path, use_mmap=not args.no_mmap))
+
+    header_time, header_results = time_reader(header_reader, paths, args.repeat)
+    print('header only: {:.4f} s ({:.3f} ms per file)'.format(header_time, 1000 * header_time / len(paths)))
+
+    try:
+        full_time, full_results = time_reader(load_flat_metadata, paths, args.repeat)
+    except Exception as err:
+        print('full load failed: {!r}'.format(err))
+        return 1
+    print('full load:   {:.4f} s ({:.3f} ms per file)'.format(full_time, 1000 * full_time / len(paths)))
+    print('speedup:     {:.1f}x'.format(full_time / header_time if header_time else float('inf')))
+
+    differences = compare(header_results, full_results)
+    for path, key, header_value, full_value in differences:
+        print('{}: {} header={!r} full={!r}'.format(os.path.basename(path), key, header_value, full_value))
+    return 1 if differences else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
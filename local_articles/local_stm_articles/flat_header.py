@@ -0,0 +1,290 @@
+"""
+Omicron Flat File Header Reader
+
+Reads the descriptive parts of an Omicron MATRIX flat file without decoding its data. A flat file is laid out as
+
+    identification, axis hierarchy, channel, creation information, data brick, offsets, experiment information,
+    experiment element parameters, deployment parameters
+
+so the scan parameters needed for the topography metadata sit on either side of the data brick. The brick length is
+given just before it, which lets the reader seek straight past the data. When the file is memory mapped none of the
+data pages are read from disk at all.
+"""
+
+import mmap
+import struct
+import datetime
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+FLAT_MAGIC = b'FLAT0100'
+
+# Experiment element parameter value types
+VALUE_INTEGER = 1
+VALUE_DOUBLE = 2
+VALUE_BOOLEAN = 3
+VALUE_ENUM = 4
+VALUE_STRING = 5
+
+# Experiment element parameters holding the topography metadata fields
+ELEMENT_PARAMETERS = {'vgap': ('GapVoltageControl', 'Voltage'),
+                      'current': ('Regulator', 'Setpoint_1')
+                      }
+
+
+class FlatHeaderError(ValueError):
+    """
+    Raised when a file does not follow the flat file layout.
+    """
+    pass
+
+
+class FlatHeader(object):
+    """
+    Descriptive contents of a flat file.
+    """
+
+    def __init__(self):
+        self.axes = []
+        self.channel = {}
+        self.created = None
+        self.comment = ''
+        self.brick_length = 0
+        self.item_count = 0
+        self.offsets = {}
+        self.experiment = {}
+        self.parameters = {}
+
+    def axis(self, n: int):
+        """
+        Returns the n-th axis of the hierarchy, or None if the file has fewer axes.
+        """
+        if n < len(self.axes):
+            return self.axes[n]
+        return None
+
+    def parameter(self, element: str, name: str):
+        """
+        Returns the value of an experiment element parameter, or None if it was not recorded.
+        """
+        return self.parameters.get(element, {}).get(name)
+
+
+class FlatHeaderReader(object):
+    """
+    Sequential reader of the little endian values a flat file is made of.
+    """
+
+    def __init__(self, source):
+        """
+        Args:
+            source: Readable and seekable binary object, such as an open file or an mmap.
+
+        Returns:
+            None
+        """
+        self.source = source
+
+    def read(self, n: int):
+        data = self.source.read(n)
+        if len(data) != n:
+            raise FlatHeaderError('Unexpected end of file')
+        return data
+
+    def skip(self, n: int):
+        self.source.seek(n, 1)
+
+    def uint32(self):
+        return struct.unpack('<I', self.read(4))[0]
+
+    def int32(self):
+        return struct.unpack('<i', self.read(4))[0]
+
+    def uint64(self):
+        return struct.unpack('<Q', self.read(8))[0]
+
+    def double(self):
+        return struct.unpack('<d', self.read(8))[0]
+
+    def string(self):
+        """
+        Reads a string stored as its length in characters followed by UTF-16 characters.
+        """
+        length = self.uint32()
+        try:
+            return self.read(2 * length).decode('utf-16-le')
+        except UnicodeDecodeError as err:
+            raise FlatHeaderError('Invalid string: {}'.format(err))
+
+    def value(self, value_type: int):
+        if value_type == VALUE_DOUBLE:
+            return self.double()
+        elif value_type == VALUE_STRING:
+            return self.string()
+        elif value_type in (VALUE_INTEGER, VALUE_ENUM):
+            return self.int32()
+        elif value_type == VALUE_BOOLEAN:
+            return bool(self.uint32())
+        raise FlatHeaderError('Unknown parameter value type {}'.format(value_type))
+
+    #####
+    # Sections
+    #####
+
+    def read_axis(self):
+        axis = {'name': self.string(),
+                'trigger': self.string(),
+                'unit': self.string(),
+                'clock_count': self.uint32(),
+                'raw_start': self.int32(),
+                'raw_increment': self.int32(),
+                'start': self.double(),
+                'increment': self.double(),
+                'mirrored': bool(self.uint32())
+                }
+        # Table sets describe scan sub-regions, which are not needed for the metadata
+        for _ in range(self.uint32()):
+            self.string()
+            self.skip(12 * self.uint32())
+        return axis
+
+    def read_channel(self):
+        channel = {'name': self.string(),
+                   'transfer_function': self.string(),
+                   'unit': self.string(),
+                   'parameters': {}
+                   }
+        for _ in range(self.uint32()):
+            name = self.string()
+            channel['parameters'][name] = self.double()
+        # Data view types
+        self.skip(4 * self.uint32())
+        return channel
+
+    def read_header(self):
+        """
+        Reads a whole flat file apart from its data.
+
+        Returns:
+            FlatHeader
+        """
+        if self.read(len(FLAT_MAGIC)) != FLAT_MAGIC:
+            raise FlatHeaderError('Not a flat file')
+
+        header = FlatHeader()
+        header.axes = [self.read_axis() for _ in range(self.uint32())]
+        header.channel = self.read_channel()
+
+        timestamp = self.uint64()
+        try:
+            header.created = datetime.datetime.fromtimestamp(timestamp)
+        except (OverflowError, OSError, ValueError):
+            raise FlatHeaderError('Invalid creation time {}'.format(timestamp))
+        header.comment = self.string()
+
+        # Skip over the data brick of 32 bit integers
+        header.brick_length = self.uint32()
+        header.item_count = self.uint32()
+        self.skip(4 * header.item_count)
+
+        for _ in range(self.uint32()):
+            name = self.string()
+            header.offsets[name] = self.double()
+
+        for key in ('name', 'version', 'description', 'file_spec', 'file_creator_id', 'result_file_creator_id',
+                    'user_name', 'account_name', 'result_data_file_spec'):
+            header.experiment[key] = self.string()
+        header.experiment['run_cycle'] = self.uint32()
+        header.experiment['scan_cycle'] = self.uint32()
+
+        for _ in range(self.uint32()):
+            element = self.string()
+            parameters = header.parameters.setdefault(element, {})
+            for _ in range(self.uint32()):
+                name = self.string()
+                value_type = self.uint32()
+                self.string()  # Unit
+                parameters[name] = self.value(value_type)
+
+        return header
+
+
+def read_flat_header(filename: str, use_mmap: bool=True):
+    """
+    Reads the header of a flat file.
+
+    Args:
+        filename: Local path to the file.
+        use_mmap: If True the file is memory mapped, so that only the pages holding the header are read from disk.
+
+    Returns:
+        FlatHeader
+
+    Raises:
+        FlatHeaderError: If the file does not follow the flat file layout, or its header is damaged.
+    """
+    with open(filename, 'rb') as f:
+        if not use_mmap:
+            return FlatHeaderReader(f).read_header()
+        try:
+            source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            raise FlatHeaderError('Empty file')
+        with source:
+            return FlatHeaderReader(source).read_header()
+
+
+def scan_directions(header: FlatHeader):
+    """
+    Lists the scan directions recorded in a topography file, in the order the data holds them.
+
+    Args:
+        header: Header of a topography flat file.
+
+    Returns:
+        list of str
+    """
+    x_axis, y_axis = header.axis(0), header.axis(1)
+    x_directions = ['forward', 'backward'] if x_axis is not None and x_axis['mirrored'] else ['forward']
+    y_directions = ['up', 'down'] if y_axis is not None and y_axis['mirrored'] else ['up']
+    return ['{}/{}'.format(y, x) for y in y_directions for x in x_directions]
+
+
+def topo_metadata(header: FlatHeader):
+    """
+    Extracts the topography metadata fields from the header of a topography flat file.
+
+    Args:
+        header: Header of a topography flat file.
+
+    Returns:
+        metadata (dict): Values converted to strings, as returned by the full file readers.
+    """
+    metadata = {'unit': header.channel.get('unit'),
+                'date': header.created.strftime('%d/%m/%Y %H:%M:%S'),
+                'users': header.experiment.get('user_name')
+                }
+
+    for key, axis in (('x', header.axis(0)), ('y', header.axis(1))):
+        if axis is None:
+            continue
+        # Mirrored axes record the forward and backward scan lines one after the other
+        res = axis['clock_count'] // 2 if axis['mirrored'] else axis['clock_count']
+        metadata[key + 'res'] = res
+        metadata[key + 'inc'] = axis['increment']
+        metadata[key + 'real'] = axis['increment'] * res
+        metadata['unitxy'] = axis['unit']
+
+    for key, (element, name) in ELEMENT_PARAMETERS.items():
+        metadata[key] = header.parameter(element, name)
+
+    metadata['direction'] = ''.join(direction + ', ' for direction in scan_directions(header))
+
+    return {key: str(value) for key, value in metadata.items() if value is not None}
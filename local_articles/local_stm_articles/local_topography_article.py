@@ -3,10 +3,9 @@
 """
 from os.path import splitext
 from figshare_interface.figshare_structures.projects import Projects
-from figshare_interface.file_parsers import flatfile_3 as FlatFile
-from figshare_interface.file_parsers.zyvex_parser import ZyvexFile
 from ...figshare_articles.stm_articles.topography_article import TopoArticle
 from ..local_article import LocalArticle
+from .topo_metadata import read_metadata
 
 __author__ = "Tobias Gill"
 __credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
@@ -19,7 +18,7 @@ __status__ = "Development"
 
 class LocalTopoArticle(TopoArticle, LocalArticle):
 
-    def __init__(self, OAuth_token, filename, file_ext):
+    def __init__(self, OAuth_token, filename, file_ext, metadata: dict=None):
 
         # Initialize STM topography metadata dictionary
         self.stm_topo_metadata = {'type': None,
@@ -48,7 +47,11 @@ class LocalTopoArticle(TopoArticle, LocalArticle):
 
         LocalArticle.__init__(self, OAuth_token, filename)
 
-        self.read_file(filename)
+        # Metadata may already have been read from the file, for example by a worker process
+        if metadata is None:
+            self.read_file(filename)
+        else:
+            self.set_topo_metadata(metadata)
         self.figshare_metadata['type'] = 'topo'
 
     def read_file(self, filename):
@@ -57,31 +60,19 @@ class LocalTopoArticle(TopoArticle, LocalArticle):
         :param filename: str. Local path to file.
         :return:
         """
+        metadata = read_metadata(filename)
+        if metadata is not None:
+            self.set_topo_metadata(metadata)
 
-        file_types = {
-            # OMICRON FLAT FILES
-            '.Z_flat': FlatFile,
-
-            # ZYVEX Files
-            '.zad': ZyvexFile
-        }
-        if self.file_ext in file_types:
-            if self.file_ext == '.Z_flat':
-                file_data = file_types[self.file_ext].load(filename)
-                file_info = file_data[0].info
-
-                directions_str = ''
-                for direction in file_data:
-                    directions_str += direction.info['direction'] + ', '
-                self.stm_topo_metadata['direction'] = directions_str
-            else:
-                file_data = file_types[self.file_ext].load(filename)
-                file_info = file_data.info
-
-            for key in file_info:
-                if key in self.stm_topo_metadata:
-                    # Added string to comply with new figshare custom fields formatting
-                    self.stm_topo_metadata[key] = str(file_info[key])
+    def set_topo_metadata(self, metadata: dict):
+        """
+        Fills the stm_topo_metadata fields from a dictionary returned by a topography metadata reader.
+        :param metadata: dict.
+        :return:
+        """
+        for key in metadata:
+            if key in self.stm_topo_metadata:
+                self.stm_topo_metadata[key] = metadata[key]
 
     def index_schema(self):
         """
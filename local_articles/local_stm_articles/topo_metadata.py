@@ -0,0 +1,123 @@
+"""
+STM Topography Metadata Readers
+
+Functions extracting the stm_topo_metadata fields of a local topography file. They only return plain dictionaries of
+strings and do not import any Qt modules, so that they can be run in worker processes while a batch of files is added.
+"""
+
+from os.path import splitext
+
+from figshare_interface.file_parsers import flatfile_3 as FlatFile
+from figshare_interface.file_parsers.zyvex_parser import ZyvexFile
+
+from .flat_header import (FlatHeaderError, read_flat_header, topo_metadata)
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+# Fields of the stm_topo_metadata dictionary of a LocalTopoArticle
+TOPO_METADATA_KEYS = ('type', 'vgap', 'current', 'xres', 'yres', 'xinc', 'yinc', 'xreal', 'yreal', 'unit', 'unitxy',
+                      'date', 'direction', 'sample', 'users', 'substrate', 'adsorbate', 'prep', 'notebook', 'notes')
+
+
+def filter_info(file_info: dict):
+    """
+    Keeps the topography metadata fields of a parsed file info dictionary.
+
+    Args:
+        file_info: Info dictionary from a file parser.
+
+    Returns:
+        metadata (dict): Values converted to strings to comply with the figshare custom fields formatting.
+    """
+    return {key: str(value) for key, value in file_info.items() if key in TOPO_METADATA_KEYS}
+
+
+# If True flat file metadata is read from the header alone rather than by loading the whole file. The mapping of the
+# header to the metadata fields has only been checked against synthetic files, so the full loader stays the default
+# until it has been compared on real files, with benchmark_metadata or tests/test_flat_header.py
+FLAT_HEADER_ONLY = False
+
+
+def read_flat_metadata(filename: str):
+    """
+    Reads the topography metadata of an Omicron flat file. If FLAT_HEADER_ONLY is set the header alone is read, falling
+    back to loading the whole file if the header cannot be read.
+
+    Args:
+        filename: Local path to the file.
+
+    Returns:
+        metadata (dict)
+    """
+    if FLAT_HEADER_ONLY:
+        try:
+            return topo_metadata(read_flat_header(filename))
+        except FlatHeaderError:
+            pass
+    return load_flat_metadata(filename)
+
+
+def load_flat_metadata(filename: str):
+    """
+    Reads the topography metadata of an Omicron flat file by loading all of its data.
+
+    Args:
+        filename: Local path to the file.
+
+    Returns:
+        metadata (dict)
+    """
+    file_data = FlatFile.load(filename)
+    metadata = filter_info(file_data[0].info)
+
+    directions_str = ''
+    for direction in file_data:
+        directions_str += direction.info['direction'] + ', '
+    metadata['direction'] = directions_str
+
+    return metadata
+
+
+def read_zyvex_metadata(filename: str):
+    """
+    Reads the topography metadata of a Zyvex file.
+
+    Args:
+        filename: Local path to the file.
+
+    Returns:
+        metadata (dict)
+    """
+    return filter_info(ZyvexFile.load(filename).info)
+
+
+# Metadata readers by file extension
+METADATA_READERS = {
+    # OMICRON FLAT FILES
+    '.Z_flat': read_flat_metadata,
+
+    # ZYVEX Files
+    '.zad': read_zyvex_metadata
+}
+
+
+def read_metadata(filename: str):
+    """
+    Reads the topography metadata of a file using the reader for its extension.
+
+    Args:
+        filename: Local path to the file.
+
+    Returns:
+        metadata (dict or None): None if there is no reader for the file type.
+    """
+    reader = METADATA_READERS.get(splitext(filename)[1])
+    if reader is None:
+        return None
+    return reader(filename)
@@ -0,0 +1,193 @@
+"""
+Figshare Article Cache
+
+A persistent SQLite store of Figshare article metadata keyed by article id. Each entry records the modified date of the
+article at the time it was cached, so that when an article list is reopened only the articles that Figshare reports as
+changed need to be downloaded again.
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+# Figshare Desktop Imports
+from Figshare_desktop.local_store.user_data import user_data_dir
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+
+class ArticleCache(object):
+    """
+    On disk store of article metadata dictionaries for a single Figshare account.
+    """
+
+    def __init__(self, OAuth_token: str, db_path: str=None):
+        """
+        Opens, or creates, the article cache database.
+
+        Args:
+            OAuth_token: Authentication token generated from Figshare login.
+            db_path: Path to the SQLite database file. Defaults to a file in the user data directory.
+
+        Returns:
+            None
+        """
+        if db_path is None:
+            # Keep a separate database per account
+            token_hash = hashlib.sha1(OAuth_token.encode('utf-8')).hexdigest()
+            db_path = os.path.join(user_data_dir('article_cache'), '{}.sqlite'.format(token_hash))
+        self.db_path = db_path
+
+        # The cache is written to from worker threads, so a single connection is shared behind a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS articles (
+                                  article_id TEXT PRIMARY KEY,
+                                  title TEXT,
+                                  modified_date TEXT,
+                                  metadata TEXT NOT NULL,
+                                  cached_at REAL NOT NULL)""")
+        self._conn.commit()
+
+    def close(self):
+        """
+        Closes the database connection.
+        """
+        with self._lock:
+            self._conn.close()
+
+    #####
+    # Cache Functions
+    #####
+
+    def get(self, article_id):
+        """
+        Returns the cached metadata dictionaries of an article.
+
+        Args:
+            article_id: Figshare article ID number.
+
+        Returns:
+            entry (dict or None): Dictionary with title, modified_date, and metadata keys, or None if not cached.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT title, modified_date, metadata FROM articles WHERE article_id = ?",
+                                     (str(article_id),)).fetchone()
+        if row is None:
+            return None
+        return {'title': row[0], 'modified_date': row[1], 'metadata': json.loads(row[2])}
+
+    def get_valid(self, article: dict, modified_date: str=None):
+        """
+        Returns the cached metadata dictionaries of an article only if they are still up to date.
+
+        Args:
+            article: Dictionary describing the article, as returned from a Figshare article listing.
+            modified_date: Current modified date of the article, for listings that do not give one. If neither the
+                listing nor this argument give a modified date the cached copy cannot be validated and None is returned.
+
+        Returns:
+            metadata (list or None): List of metadata dictionaries, in the order given by Article.input_dicts().
+        """
+        modified_date = article.get('modified_date', modified_date)
+        if modified_date is None:
+            return None
+
+        entry = self.get(article['id'])
+        if entry is None or entry['modified_date'] != modified_date:
+            return None
+        return entry['metadata']
+
+    def store(self, article):
+        """
+        Saves the metadata dictionaries of an article, replacing any existing entry.
+
+        Args:
+            article: Figshare Desktop Article object.
+
+        Returns:
+            None
+        """
+        self.store_many([article])
+
+    def store_many(self, articles):
+        """
+        Saves the metadata dictionaries of multiple articles in a single transaction.
+
+        Args:
+            articles: Iterable of Figshare Desktop Article objects.
+
+        Returns:
+            None
+        """
+        now = time.time()
+        rows = []
+        for article in articles:
+            figshare_metadata = article.figshare_metadata
+            rows.append((str(article.article_id), figshare_metadata['title'], figshare_metadata['modified_date'],
+                         json.dumps(article.input_dicts()), now))
+
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO articles VALUES (?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def remove(self, article_ids):
+        """
+        Removes articles from the cache.
+
+        Args:
+            article_ids: Iterable of Figshare article ID numbers.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._conn.executemany("DELETE FROM articles WHERE article_id = ?",
+                                   [(str(a_id),) for a_id in article_ids])
+            self._conn.commit()
+
+    def clear(self):
+        """
+        Removes all articles from the cache.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM articles")
+            self._conn.commit()
+
+    def partition(self, articles: list, validate: bool=True):
+        """
+        Splits an article listing into the articles that can be restored from the cache and those that need to be
+        downloaded from Figshare.
+
+        Args:
+            articles: List of article dictionaries as returned from a Figshare article listing.
+            validate: If False any cached copy is restored, whether or not it is up to date. Used while Figshare is
+                unreachable, when an old copy is better than none.
+
+        Returns:
+            cached (list): Tuples of (article dict, list of cached metadata dictionaries).
+            stale (list): Article dicts that are not cached, have been modified since they were cached, or whose
+                listing does not give a modified date to validate against.
+        """
+        cached = []
+        stale = []
+        for article in articles:
+            if validate:
+                metadata = self.get_valid(article)
+            else:
+                entry = self.get(article['id'])
+                metadata = None if entry is None else entry['metadata']
+            if metadata is None:
+                stale.append(article)
+            else:
+                cached.append((article, metadata))
+        return cached, stale
@@ -0,0 +1,194 @@
+"""
+Local File Registry
+
+Records which local files have already been made into local articles. Files are keyed by their absolute path, size, and
+modification time, so checking an unchanged file is a dictionary lookup. A content hash is only computed, by streaming
+the file from disk, when another registered file has the same size, which allows the same file copied under a different
+name to be recognised without hashing every file that is added.
+"""
+
+import os
+import threading
+
+# Figshare Desktop Imports
+from Figshare_desktop.data_window.chunked_upload import file_md5
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+
+class FileEntry(object):
+    """
+    Registry record of a single local file.
+    """
+
+    __slots__ = ('path', 'size', 'mtime', 'local_id', 'content_hash')
+
+    def __init__(self, path: str, size: int, mtime: float, local_id: str=None, content_hash: str=None):
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+        self.local_id = local_id
+        self.content_hash = content_hash
+
+    def key(self):
+        return self.path, self.size, self.mtime
+
+
+class FileRegistry(object):
+    """
+    In memory registry of the files from which local articles have been created.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+        # Registered entries by path, and by file size for finding possible content duplicates
+        self._by_path = {}
+        self._by_size = {}
+        self._by_id = {}
+
+        # Hashes of unregistered files computed during a lookup, kept so the file is not read again on registration
+        self._hashes = {}
+
+    def __len__(self):
+        return len(self._by_path)
+
+    @staticmethod
+    def stat_entry(path: str):
+        """
+        Creates an unregistered entry for a file from its current size and modification time.
+
+        Args:
+            path: Path to the local file.
+
+        Returns:
+            FileEntry
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        return FileEntry(path, stat.st_size, stat.st_mtime)
+
+    def content_hash(self, entry: FileEntry):
+        """
+        Returns the content hash of an entry, computing it if it is not yet known.
+        """
+        if entry.content_hash is None:
+            key = entry.key()
+            if key in self._hashes:
+                entry.content_hash = self._hashes.pop(key)
+            else:
+                entry.content_hash = file_md5(entry.path)
+        return entry.content_hash
+
+    #####
+    # Registry Functions
+    #####
+
+    def lookup(self, path: str):
+        """
+        Finds the local article already created from a file, or from an identical copy of it.
+
+        Args:
+            path: Path to the local file.
+
+        Returns:
+            local_id (str or None): Local article id, or None if the file has not been registered.
+        """
+        entry = self.stat_entry(path)
+
+        with self._lock:
+            registered = self._by_path.get(entry.path)
+            if registered is not None and registered.key() == entry.key():
+                return registered.local_id
+
+            # Only files of the same size can have the same contents
+            candidates = [e for e in self._by_size.get(entry.size, ()) if e.path != entry.path]
+            if not candidates:
+                return None
+
+            content_hash = self.content_hash(entry)
+            for candidate in candidates:
+                try:
+                    # A registered file that has since been modified no longer holds the contents of its article
+                    if candidate.content_hash is None and self.stat_entry(candidate.path).key() != candidate.key():
+                        continue
+                    if self.content_hash(candidate) == content_hash:
+                        return candidate.local_id
+                except OSError:
+                    # The registered file has since been moved or deleted
+                    continue
+            # Keep the hash for when the file is registered as a new article
+            self._hashes[entry.key()] = content_hash
+        return None
+
+    def is_registered(self, path: str):
+        """
+        Checks if a file is registered unchanged under its own path. Unlike lookup no file contents are read.
+
+        Args:
+            path: Path to the local file.
+
+        Returns:
+            bool
+        """
+        entry = self.stat_entry(path)
+        with self._lock:
+            registered = self._by_path.get(entry.path)
+            return registered is not None and registered.key() == entry.key()
+
+    def register(self, path: str, local_id: str):
+        """
+        Records that a local article has been created from a file. Any previous record of the same path is replaced.
+
+        Args:
+            path: Path to the local file.
+            local_id: Local article id.
+
+        Returns:
+            None
+        """
+        entry = self.stat_entry(path)
+        entry.local_id = local_id
+
+        with self._lock:
+            entry.content_hash = self._hashes.pop(entry.key(), None)
+            self._discard(self._by_path.get(entry.path))
+            self._by_path[entry.path] = entry
+            self._by_size.setdefault(entry.size, []).append(entry)
+            self._by_id.setdefault(local_id, []).append(entry)
+
+    def remove(self, local_id: str):
+        """
+        Forgets all files registered to a local article, for example when the article is deleted.
+
+        Args:
+            local_id: Local article id.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            for entry in list(self._by_id.get(local_id, ())):
+                self._discard(entry)
+
+    def _discard(self, entry: FileEntry):
+        if entry is None:
+            return
+        if self._by_path.get(entry.path) is entry:
+            del self._by_path[entry.path]
+        same_size = self._by_size.get(entry.size, [])
+        if entry in same_size:
+            same_size.remove(entry)
+            if not same_size:
+                del self._by_size[entry.size]
+        same_id = self._by_id.get(entry.local_id, [])
+        if entry in same_id:
+            same_id.remove(entry)
+            if not same_id:
+                del self._by_id[entry.local_id]
@@ -0,0 +1,392 @@
+"""
+Offline Mirror
+
+A persistent SQLite mirror of what the application browses on Figshare: the project and collection lists, the info of
+each project and collection, and the article listing of each. Windows read from the mirror first, so they open straight
+away and stay browsable without a connection, while a background sync refreshes the mirror from Figshare. Article
+metadata, including each article's file listing, is kept by the ArticleCache.
+
+Edits are written to the mirror before they are sent. An edit that cannot reach Figshare stays queued, and the queue is
+replayed in order once the connection returns. Queued edits to the same object are merged, so only the latest value of
+each field is sent.
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+from requests import (ConnectionError as RequestsConnectionError, Timeout)
+
+# Figshare Desktop Imports
+from Figshare_desktop.local_store.user_data import user_data_dir
+from Figshare_desktop.network.transport import single_attempt
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+# Keys of the mirrored project and collection lists
+PROJECTS_KEY = 'projects'
+COLLECTIONS_KEY = 'collections'
+
+# Kinds of mirrored article listing
+ARTICLE_LISTING_KINDS = ('project_articles', 'collection_articles')
+
+# Kinds of queued edit
+ARTICLE_UPDATE = 'article_update'
+
+
+def mirror_key(kind: str, object_id):
+    """
+    Returns the key under which a record of a single Figshare object is mirrored.
+
+    Args:
+        kind: Type of record, such as 'project', 'project_articles', 'collection', or 'collection_articles'.
+        object_id: Figshare ID number of the object.
+
+    Returns:
+        key (str), such as 'project_articles/1234'
+    """
+    return '{}/{}'.format(kind, object_id)
+
+
+def is_offline_error(err: Exception):
+    """
+    Returns True if a request failed because Figshare could not be reached, rather than because it refused the request.
+    """
+    return isinstance(err, (RequestsConnectionError, Timeout, ConnectionError, TimeoutError))
+
+
+def merge_edits(queued: dict, update: dict):
+    """
+    Merges a new update into an update already queued for the same object. Values of the new update take precedence,
+    and custom fields are merged field by field.
+
+    Args:
+        queued: Update waiting in the queue.
+        update: Newer update of the same object.
+
+    Returns:
+        merged (dict)
+    """
+    merged = dict(queued)
+    merged.update(update)
+    if 'custom_fields' in queued and 'custom_fields' in update:
+        merged['custom_fields'] = dict(queued['custom_fields'], **update['custom_fields'])
+    return merged
+
+
+def search_titles(items: list, search_text: str):
+    """
+    Returns the items of a mirrored listing whose title contains each word of the search text. Used in place of a
+    Figshare search when offline.
+    """
+    words = search_text.lower().split()
+    return [item for item in items if all(word in str(item.get('title', '')).lower() for word in words)]
+
+
+class LocalMirror(object):
+    """
+    On disk mirror of Figshare listings, and queue of pending edits, for a single Figshare account.
+    """
+
+    def __init__(self, OAuth_token: str, db_path: str=None):
+        """
+        Opens, or creates, the mirror database.
+
+        Args:
+            OAuth_token: Authentication token generated from Figshare login.
+            db_path: Path to the SQLite database file. Defaults to a file in the user data directory.
+
+        Returns:
+            None
+        """
+        if db_path is None:
+            # Keep a separate database per account
+            token_hash = hashlib.sha1(OAuth_token.encode('utf-8')).hexdigest()
+            db_path = os.path.join(user_data_dir('offline_mirror'), '{}.sqlite'.format(token_hash))
+        self.db_path = db_path
+
+        # True once a request has failed to reach Figshare, until one succeeds again
+        self.offline = False
+
+        # Ids of the queued edits being sent. Edits are sent both by the window that made them and by the background
+        # sync, and an edit is only sent by whichever claims it first
+        self._sending = set()
+
+        # The mirror is read and written from worker threads, so a single connection is shared behind a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS records (
+                                  key TEXT PRIMARY KEY,
+                                  value TEXT NOT NULL,
+                                  synced_at REAL NOT NULL)""")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS pending_edits (
+                                  edit_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                  kind TEXT NOT NULL,
+                                  object_id TEXT NOT NULL,
+                                  payload TEXT NOT NULL,
+                                  queued_at REAL NOT NULL)""")
+        self._conn.commit()
+
+    def close(self):
+        """
+        Closes the database connection.
+        """
+        with self._lock:
+            self._conn.close()
+
+    #####
+    # Mirror Functions
+    #####
+
+    def get(self, key: str):
+        """
+        Returns the mirrored copy of a listing or record.
+
+        Args:
+            key: Mirror key, such as PROJECTS_KEY or a key from mirror_key().
+
+        Returns:
+            value (list, dict, or None): None if the key has never been mirrored.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM records WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def store(self, key: str, value):
+        """
+        Saves a listing or record fetched from Figshare, replacing any existing copy.
+
+        Args:
+            key: Mirror key.
+            value: JSON serialisable listing or record.
+
+        Returns:
+            changed (bool): True if the value differs from the copy it replaced.
+        """
+        encoded = json.dumps(value, sort_keys=True)
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM records WHERE key = ?", (key,)).fetchone()
+            self._conn.execute("INSERT OR REPLACE INTO records VALUES (?, ?, ?)", (key, encoded, time.time()))
+            self._conn.commit()
+        return row is None or row[0] != encoded
+
+    def missing(self, keys):
+        """
+        Returns the keys that have never been mirrored.
+
+        Args:
+            keys: Iterable of mirror keys.
+
+        Returns:
+            missing (set)
+        """
+        keys = set(keys)
+        with self._lock:
+            rows = self._conn.execute("SELECT key FROM records").fetchall()
+        return keys - {r[0] for r in rows}
+
+    def listed_article_ids(self):
+        """
+        Returns the ids of the articles in any mirrored project or collection article listing.
+
+        Returns:
+            article_ids (set of str)
+        """
+        kinds = " OR ".join("key LIKE ?" for _ in ARTICLE_LISTING_KINDS)
+        with self._lock:
+            rows = self._conn.execute("SELECT value FROM records WHERE " + kinds,
+                                      [mirror_key(kind, '%') for kind in ARTICLE_LISTING_KINDS]).fetchall()
+        return {str(article['id']) for row in rows for article in json.loads(row[0])}
+
+    def remove(self, key: str):
+        """
+        Removes a listing or record, so that it is next fetched from Figshare.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM records WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def read(self, key: str, fetch, default=None):
+        """
+        Returns the mirrored copy of a listing or record, fetching it from Figshare only if it has never been mirrored.
+
+        Args:
+            key: Mirror key.
+            fetch: Callable taking no arguments and returning the value from Figshare.
+            default: Value returned if the key has not been mirrored and Figshare cannot be reached.
+
+        Returns:
+            value
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        if self.offline:
+            return default
+        try:
+            # The GUI waits on the fetch, so an unreachable Figshare is not retried
+            with single_attempt():
+                value = fetch()
+        except Exception as err:
+            if not is_offline_error(err):
+                raise
+            self.offline = True
+            return default
+        self.offline = False
+        self.store(key, value)
+        return value
+
+    def search(self, key: str, search_text: str, search):
+        """
+        Searches Figshare, or the titles of a mirrored listing when Figshare cannot be reached.
+
+        Args:
+            key: Mirror key of the listing to search offline.
+            search_text: Figshare style elastic search string.
+            search: Callable taking the search text and returning the matching items from Figshare.
+
+        Returns:
+            result (list of dicts)
+        """
+        if not self.offline:
+            try:
+                with single_attempt():
+                    return search(search_text)
+            except Exception as err:
+                if not is_offline_error(err):
+                    raise
+                self.offline = True
+        return search_titles(self.get(key) or [], search_text)
+
+    #####
+    # Edit Queue Functions
+    #####
+
+    def queue_edit(self, kind: str, object_id, payload: dict):
+        """
+        Adds an edit to the queue, merging it into any edit of the same object that is already queued.
+
+        Args:
+            kind: Kind of edit, such as ARTICLE_UPDATE.
+            object_id: Figshare ID number of the edited object.
+            payload: Update dictionary of the edit.
+
+        Returns:
+            edit (dict): The queued edit, with edit_id, kind, object_id, and payload keys.
+        """
+        object_id = str(object_id)
+        with self._lock:
+            row = self._conn.execute("SELECT edit_id, payload FROM pending_edits WHERE kind = ? AND object_id = ?",
+                                     (kind, object_id)).fetchone()
+            if row is None:
+                cursor = self._conn.execute("INSERT INTO pending_edits (kind, object_id, payload, queued_at) "
+                                            "VALUES (?, ?, ?, ?)", (kind, object_id, json.dumps(payload), time.time()))
+                edit_id = cursor.lastrowid
+            else:
+                edit_id = row[0]
+                payload = merge_edits(json.loads(row[1]), payload)
+                self._conn.execute("UPDATE pending_edits SET payload = ? WHERE edit_id = ?",
+                                   (json.dumps(payload), edit_id))
+            self._conn.commit()
+        return {'edit_id': edit_id, 'kind': kind, 'object_id': object_id, 'payload': payload}
+
+    def pending_edits(self):
+        """
+        Returns the queued edits, oldest first.
+
+        Returns:
+            list of dicts with edit_id, kind, object_id, and payload keys.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT edit_id, kind, object_id, payload FROM pending_edits "
+                                      "ORDER BY edit_id").fetchall()
+        return [{'edit_id': r[0], 'kind': r[1], 'object_id': r[2], 'payload': json.loads(r[3])} for r in rows]
+
+    def pending_ids(self, kind: str):
+        """
+        Returns the ids of the objects with an edit of the given kind in the queue.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT object_id FROM pending_edits WHERE kind = ?", (kind,)).fetchall()
+        return {r[0] for r in rows}
+
+    def pending_count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pending_edits").fetchone()[0]
+
+    def remove_edit(self, edit: dict):
+        """
+        Removes an edit from the queue once it has been sent. An edit merged with a newer update since it was read from
+        the queue is kept, so that the newer update is still sent.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM pending_edits WHERE edit_id = ? AND payload = ?",
+                               (edit['edit_id'], json.dumps(edit['payload'])))
+            self._conn.commit()
+
+    def claim_edit(self, edit: dict):
+        """
+        Marks a queued edit as being sent.
+
+        Args:
+            edit: Queued edit, as returned by queue_edit() or pending_edits().
+
+        Returns:
+            claimed (bool): False if the edit is already being sent.
+        """
+        with self._lock:
+            if edit['edit_id'] in self._sending:
+                return False
+            self._sending.add(edit['edit_id'])
+            return True
+
+    def release_edit(self, edit: dict):
+        """
+        Marks a claimed edit as no longer being sent.
+        """
+        with self._lock:
+            self._sending.discard(edit['edit_id'])
+
+    def send_edit(self, edit: dict, send):
+        """
+        Sends a queued edit to Figshare and removes it from the queue. If Figshare cannot be reached the edit is left
+        queued. If Figshare refuses the edit it is removed, as sending it again would fail the same way. An edit that is
+        already being sent is not sent again, and is left queued so that any update merged into it since is sent later.
+
+        Args:
+            edit: Queued edit, as returned by queue_edit() or pending_edits().
+            send: Callable taking an object id and update dictionary and making the Figshare request.
+
+        Returns:
+            sent (bool): False if the edit was left queued.
+
+        Raises:
+            Exception: Any error of a refused edit.
+        """
+        if not self.claim_edit(edit):
+            return False
+        try:
+            try:
+                send(edit['object_id'], edit['payload'])
+            except Exception as err:
+                if is_offline_error(err):
+                    self.offline = True
+                    return False
+                self.remove_edit(edit)
+                raise
+            self.offline = False
+            self.remove_edit(edit)
+            return True
+        finally:
+            self.release_edit(edit)
@@ -0,0 +1,255 @@
+"""
+Figshare Reference Data
+
+Figshare categories and account licenses change rarely, but are needed every time an article is validated. This module
+keeps a single process-wide copy of them for each OAuth token. The data is fetched once, written to disk with an expiry
+time, and refreshed in a background thread once it has gone stale, so that article validation never has to wait on the
+network after the first session.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+
+# Figshare API Imports
+from figshare_interface.http_requests.figshare_requests import issue_request
+
+# Figshare Desktop Imports
+from Figshare_desktop.local_store.user_data import user_data_dir
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+# Time in seconds after which cached reference data is considered stale
+DEFAULT_TTL = 24 * 60 * 60
+
+# Process-wide ReferenceData instances keyed by OAuth token
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+class ReferenceData(object):
+    """
+    Cached Figshare categories and licenses for a single OAuth token.
+    """
+
+    def __init__(self, OAuth_token: str, cache_dir: str=None, ttl: float=DEFAULT_TTL):
+        """
+        Loads any existing on disk cache. No request is made to Figshare until the data is first accessed.
+
+        Args:
+            OAuth_token: Authentication token generated from Figshare login.
+            cache_dir: Directory in which to keep the cache file. Defaults to the user data directory.
+            ttl: Time in seconds after which the cached data should be refreshed.
+
+        Returns:
+            None
+        """
+        self.token = OAuth_token
+        self.ttl = ttl
+
+        if cache_dir is None:
+            cache_dir = user_data_dir('reference_data')
+        # Licenses are account specific so the cache file is keyed by a hash of the token
+        token_hash = hashlib.sha1(OAuth_token.encode('utf-8')).hexdigest()
+        self.cache_path = os.path.join(cache_dir, '{}.json'.format(token_hash))
+
+        self._lock = threading.RLock()
+        self._refresh_thread = None
+
+        self.fetched = None
+        self.categories = None
+        self.licenses = None
+
+        self.id_categories = {}
+        self.name_categories = {}
+        self.id_licenses = {}
+        self.name_licenses = {}
+
+        self.load()
+
+    #####
+    # Cache Functions
+    #####
+
+    def load(self):
+        """
+        Reads the reference data from the on disk cache if it exists.
+
+        Returns:
+            loaded (bool): True if the cache file was read.
+        """
+        try:
+            with open(self.cache_path, 'r') as f:
+                cached = json.load(f)
+            self.set_data(cached['categories'], cached['licenses'], cached['fetched'])
+            return True
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+
+    def save(self):
+        """
+        Writes the current reference data to the on disk cache.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            cached = {'fetched': self.fetched, 'categories': self.categories, 'licenses': self.licenses}
+
+        # Write to a temporary file first so that a crash mid-write never leaves a corrupt cache behind
+        tmp_path = self.cache_path + '.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(cached, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            pass
+
+    def set_data(self, categories: list, licenses: list, fetched: float):
+        """
+        Replaces the reference data and rebuilds the lookup dictionaries.
+
+        Args:
+            categories: List of category dictionaries as returned from the Figshare categories endpoint.
+            licenses: List of license dictionaries as returned from the Figshare account/licenses endpoint.
+            fetched: Epoch time at which the data was retrieved from Figshare.
+
+        Returns:
+            None
+        """
+        id_categories = {}
+        name_categories = {}
+        for cat in categories:
+            id_categories[cat['id']] = cat['title']
+            name_categories[cat['title']] = cat['id']
+
+        id_licenses = {}
+        name_licenses = {}
+        for lic in licenses:
+            id_licenses[lic['value']] = lic['name']
+            name_licenses[lic['name']] = lic['value']
+
+        # Swap all references at once so readers in other threads never see a half built set of dictionaries
+        with self._lock:
+            self.categories = categories
+            self.licenses = licenses
+            self.fetched = fetched
+            self.id_categories = id_categories
+            self.name_categories = name_categories
+            self.id_licenses = id_licenses
+            self.name_licenses = name_licenses
+
+    def is_loaded(self):
+        """
+        Returns True if any reference data, stale or not, is available.
+        """
+        return self.fetched is not None
+
+    def is_stale(self):
+        """
+        Returns True if the reference data is missing or older than the ttl.
+        """
+        return self.fetched is None or (time.time() - self.fetched) > self.ttl
+
+    #####
+    # Figshare API Functions
+    #####
+
+    def refresh(self):
+        """
+        Retrieves the categories and licenses from Figshare and updates the cache. Blocks until complete.
+
+        Returns:
+            None
+        """
+        categories = issue_request(method='GET', endpoint='categories', token=self.token)
+        licenses = issue_request(method='GET', endpoint='account/licenses', token=self.token)
+        self.set_data(categories, licenses, time.time())
+        self.save()
+
+    def refresh_async(self):
+        """
+        Starts a background refresh of the reference data if one is not already running.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+            self._refresh_thread = threading.Thread(target=self._background_refresh, name='reference_data_refresh',
+                                                    daemon=True)
+            self._refresh_thread.start()
+
+    def _background_refresh(self):
+        """
+        Target of the background refresh thread. Failures leave the stale data in place to be retried later.
+        """
+        try:
+            self.refresh()
+        except Exception:
+            pass
+
+    def ensure(self):
+        """
+        Makes sure that reference data is available. If there is no data at all it is fetched synchronously, while
+        stale data is returned as is and refreshed in the background.
+
+        Returns:
+            None
+        """
+        if not self.is_loaded():
+            with self._lock:
+                # Another thread may have completed the fetch while we waited on the lock
+                if not self.is_loaded():
+                    self.refresh()
+        elif self.is_stale():
+            self.refresh_async()
+
+    #####
+    # Lookup Functions
+    #####
+
+    def get_categories(self):
+        """
+        Returns:
+            id_categories (dict): Category id: title pairs.
+            name_categories (dict): Category title: id pairs.
+        """
+        self.ensure()
+        with self._lock:
+            return self.id_categories, self.name_categories
+
+    def get_licenses(self):
+        """
+        Returns:
+            id_licenses (dict): License value: name pairs.
+            name_licenses (dict): License name: value pairs.
+        """
+        self.ensure()
+        with self._lock:
+            return self.id_licenses, self.name_licenses
+
+
+def get_reference_data(OAuth_token: str):
+    """
+    Returns the process-wide ReferenceData instance for the given token, creating it on first use.
+
+    Args:
+        OAuth_token: Authentication token generated from Figshare login.
+
+    Returns:
+        ReferenceData
+    """
+    with _instances_lock:
+        if OAuth_token not in _instances:
+            _instances[OAuth_token] = ReferenceData(OAuth_token)
+        return _instances[OAuth_token]
@@ -0,0 +1,232 @@
+"""
+Upload Journal
+
+An on disk record of the progress of each file upload to Figshare. Uploads are keyed by the local file path and the
+target project, and move through the following states as each step is confirmed by Figshare:
+
+    queued -> created -> initiated -> complete
+
+Once an article has been created its id is recorded, once the file upload has been initiated the upload url is
+recorded, and each file part is recorded as it is confirmed. An upload interrupted at any point can then be resumed from
+the last confirmed step rather than creating a new article and re-sending the whole file.
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+# Figshare Desktop Imports
+from Figshare_desktop.local_store.user_data import user_data_dir
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+# Upload states in the order in which they are reached
+STATE_QUEUED = 'queued'
+STATE_CREATED = 'created'
+STATE_INITIATED = 'initiated'
+STATE_COMPLETE = 'complete'
+
+ENTRY_FIELDS = ('local_path', 'project_id', 'size', 'mtime', 'md5', 'article_id', 'file_id', 'upload_url', 'state',
+                'updated', 'upload_dict')
+
+
+class UploadJournal(object):
+    """
+    Persistent record of upload progress for a single Figshare account.
+    """
+
+    def __init__(self, OAuth_token: str, db_path: str=None):
+        """
+        Opens, or creates, the upload journal database.
+
+        Args:
+            OAuth_token: Authentication token generated from Figshare login.
+            db_path: Path to the SQLite database file. Defaults to a file in the user data directory.
+
+        Returns:
+            None
+        """
+        if db_path is None:
+            token_hash = hashlib.sha1(OAuth_token.encode('utf-8')).hexdigest()
+            db_path = os.path.join(user_data_dir('upload_journal'), '{}.sqlite'.format(token_hash))
+        self.db_path = db_path
+
+        # Uploads run concurrently from a thread pool, so a single connection is shared behind a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS uploads (
+                                  local_path TEXT NOT NULL,
+                                  project_id INTEGER NOT NULL,
+                                  size INTEGER,
+                                  mtime REAL,
+                                  md5 TEXT,
+                                  article_id INTEGER,
+                                  file_id INTEGER,
+                                  upload_url TEXT,
+                                  state TEXT NOT NULL,
+                                  updated REAL NOT NULL,
+                                  upload_dict TEXT,
+                                  PRIMARY KEY (local_path, project_id))""")
+        # Journals written before the article metadata was recorded lack its column
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(uploads)")]
+        if 'upload_dict' not in columns:
+            self._conn.execute("ALTER TABLE uploads ADD COLUMN upload_dict TEXT")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS parts (
+                                  local_path TEXT NOT NULL,
+                                  project_id INTEGER NOT NULL,
+                                  part_no INTEGER NOT NULL,
+                                  PRIMARY KEY (local_path, project_id, part_no))""")
+        self._conn.commit()
+
+    def close(self):
+        """
+        Closes the database connection.
+        """
+        with self._lock:
+            self._conn.close()
+
+    #####
+    # Journal Functions
+    #####
+
+    def get(self, local_path: str, project_id: int):
+        """
+        Returns the journal entry of an upload.
+
+        Args:
+            local_path: Absolute path to the local file.
+            project_id: Figshare project ID number the file is being uploaded to.
+
+        Returns:
+            entry (dict or None): Journal entry keyed by ENTRY_FIELDS, with an additional parts set of confirmed part
+                numbers. upload_dict is None for uploads started before the metadata was recorded. None if the upload
+                has never been started.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM uploads WHERE local_path = ? AND project_id = ?",
+                                     (local_path, project_id)).fetchone()
+            if row is None:
+                return None
+            parts = self._conn.execute("SELECT part_no FROM parts WHERE local_path = ? AND project_id = ?",
+                                       (local_path, project_id)).fetchall()
+        entry = dict(zip(ENTRY_FIELDS, row))
+        if entry['upload_dict'] is not None:
+            entry['upload_dict'] = json.loads(entry['upload_dict'])
+        entry['parts'] = {p[0] for p in parts}
+        return entry
+
+    def start(self, local_path: str, project_id: int, size: int, mtime: float, md5: str, upload_dict: dict=None):
+        """
+        Records a new upload in the queued state, discarding any previous record of the same file and project.
+
+        Args:
+            local_path: Absolute path to the local file.
+            project_id: Figshare project ID number the file is being uploaded to.
+            size: File size in bytes.
+            mtime: File modification time.
+            md5: MD5 hex digest of the file contents.
+            upload_dict: Figshare metadata for the new article, kept so that the upload can be resumed after a restart.
+
+        Returns:
+            None
+        """
+        encoded = None if upload_dict is None else json.dumps(upload_dict)
+        with self._lock:
+            self._conn.execute("DELETE FROM parts WHERE local_path = ? AND project_id = ?", (local_path, project_id))
+            self._conn.execute("INSERT OR REPLACE INTO uploads VALUES (?, ?, ?, ?, ?, NULL, NULL, NULL, ?, ?, ?)",
+                               (local_path, project_id, size, mtime, md5, STATE_QUEUED, time.time(), encoded))
+            self._conn.commit()
+
+    def update_file(self, local_path: str, project_id: int, size: int, mtime: float, md5: str):
+        """
+        Records that the local file has changed since the upload was started. Any existing article is kept, but the
+        file upload must be initiated again.
+
+        Args:
+            local_path: Absolute path to the local file.
+            project_id: Figshare project ID number the file is being uploaded to.
+            size: File size in bytes.
+            mtime: File modification time.
+            md5: MD5 hex digest of the file contents.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM parts WHERE local_path = ? AND project_id = ?", (local_path, project_id))
+            self._conn.execute("""UPDATE uploads SET size = ?, mtime = ?, md5 = ?, file_id = NULL, upload_url = NULL,
+                                  state = CASE WHEN article_id IS NULL THEN ? ELSE ? END, updated = ?
+                                  WHERE local_path = ? AND project_id = ?""",
+                               (size, mtime, md5, STATE_QUEUED, STATE_CREATED, time.time(), local_path, project_id))
+            self._conn.commit()
+
+    def article_created(self, local_path: str, project_id: int, article_id: int):
+        """
+        Records that the Figshare article for an upload has been created.
+        """
+        self._set(local_path, project_id, article_id=article_id, state=STATE_CREATED)
+
+    def file_initiated(self, local_path: str, project_id: int, file_id: int, upload_url: str):
+        """
+        Records that the file upload has been initiated and where its parts should be sent.
+        """
+        self._set(local_path, project_id, file_id=file_id, upload_url=upload_url, state=STATE_INITIATED)
+
+    def part_confirmed(self, local_path: str, project_id: int, part_no: int):
+        """
+        Records that a file part has been received by Figshare.
+        """
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO parts VALUES (?, ?, ?)", (local_path, project_id, part_no))
+            self._conn.execute("UPDATE uploads SET updated = ? WHERE local_path = ? AND project_id = ?",
+                               (time.time(), local_path, project_id))
+            self._conn.commit()
+
+    def upload_complete(self, local_path: str, project_id: int):
+        """
+        Records that the upload has been completed. The confirmed parts are no longer needed and are discarded.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM parts WHERE local_path = ? AND project_id = ?", (local_path, project_id))
+        self._set(local_path, project_id, state=STATE_COMPLETE)
+
+    def remove(self, local_path: str, project_id: int):
+        """
+        Removes all record of an upload.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM parts WHERE local_path = ? AND project_id = ?", (local_path, project_id))
+            self._conn.execute("DELETE FROM uploads WHERE local_path = ? AND project_id = ?", (local_path, project_id))
+            self._conn.commit()
+
+    def incomplete(self):
+        """
+        Returns the journal entries of all uploads that were started but not completed.
+
+        Returns:
+            entries (list of dict)
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT local_path, project_id FROM uploads WHERE state != ?",
+                                      (STATE_COMPLETE,)).fetchall()
+        return [self.get(local_path, project_id) for local_path, project_id in rows]
+
+    def _set(self, local_path: str, project_id: int, **values):
+        """
+        Updates columns of an upload entry.
+        """
+        columns = ', '.join('{} = ?'.format(key) for key in values)
+        params = list(values.values()) + [time.time(), local_path, project_id]
+        with self._lock:
+            self._conn.execute("UPDATE uploads SET {}, updated = ? WHERE local_path = ? AND project_id = ?".format(
+                columns), params)
+            self._conn.commit()
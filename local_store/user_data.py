@@ -0,0 +1,47 @@
+"""
+User Data Paths
+
+Resolves the per-user directory in which Figshare Desktop keeps data that should persist between sessions, such as
+cached Figshare reference data.
+"""
+
+import os
+import sys
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+APP_DIR_NAME = 'Figshare_desktop'
+
+
+def user_data_dir(*sub_dirs: str):
+    """
+    Returns the path to the per-user Figshare Desktop data directory, creating it if it does not yet exist.
+
+    Args:
+        sub_dirs: Optional sub directory names to append to the data directory path.
+
+    Returns:
+        path (str): Absolute path to the requested directory.
+    """
+    # The FIGSHARE_DESKTOP_DATA environment variable can be used to relocate all persistent data
+    base = os.environ.get('FIGSHARE_DESKTOP_DATA')
+
+    if base is None:
+        if sys.platform.startswith('win'):
+            base = os.path.join(os.environ.get('APPDATA', os.path.expanduser('~')), APP_DIR_NAME)
+        elif sys.platform == 'darwin':
+            base = os.path.join(os.path.expanduser('~'), 'Library', 'Application Support', APP_DIR_NAME)
+        else:
+            xdg_data = os.environ.get('XDG_DATA_HOME', os.path.join(os.path.expanduser('~'), '.local', 'share'))
+            base = os.path.join(xdg_data, APP_DIR_NAME.lower())
+
+    path = os.path.abspath(os.path.join(base, *sub_dirs))
+    os.makedirs(path, exist_ok=True)
+
+    return path
@@ -11,6 +11,7 @@ from PyQt5.QtGui import (QPixmap, QFont)
 from figshare_interface.http_requests.figshare_requests import login_request
 
 from Figshare_desktop.main_window.framing_window import MainWindow
+from Figshare_desktop.network.transport import install as install_transport
 
 __author__ = "Tobias Gill"
 __credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
@@ -137,6 +138,9 @@ class LoginWindow(QWidget):
             self.accountNameEdit.setFocus()
 
 if __name__ == '__main__':
+    # Route all Figshare requests through the shared keep-alive transport
+    install_transport()
+
     app = QApplication(sys.argv)
     login_window = LoginWindow()
     login_window.show()
@@ -4,14 +4,18 @@
 
 import os
 import sys
-from PyQt5.QtWidgets import (QMainWindow, QMdiArea, QAction, qApp)
+from PyQt5.QtWidgets import (QMainWindow, QMdiArea, QAction, QMessageBox, qApp)
 from PyQt5.QtGui import (QIcon, QFont, QKeySequence)
-
-# Figshare API Imports
-from figshare_interface.http_requests.figshare_requests import issue_request
+from PyQt5.QtCore import Qt
 
 from ..formatting.formatting import scaling_ratio
+from ..local_store.reference_data import get_reference_data
+from ..local_store.article_cache import ArticleCache
+from ..local_store.file_registry import FileRegistry
+from ..local_store.offline_mirror import LocalMirror
+from ..background_jobs.mirror_sync import (MirrorSync, edit_senders)
 from .section_window import sectionWindow
+from .network_panel import NetworkPanel
 
 __author__ = "Tobias Gill"
 __credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
@@ -73,9 +77,18 @@ class MainWindow(QMainWindow):
         :return:
         """
         self.figshare_articles = {}
+        # Persistent store of article metadata from previous sessions
+        self.article_cache = ArticleCache(self.token)
+        # Mirror of Figshare listings that windows read first, and the queue of edits waiting to be sent
+        self.local_mirror = LocalMirror(self.token)
+        self.mirror_sync = MirrorSync(self.local_mirror, edit_senders(self.token))
+        self.mirror_sync.sig_online_changed.connect(self.on_online_changed)
+        self.mirror_sync.sig_edits_sent.connect(self.on_edits_sent)
 
         self.local_articles = {}
         self.next_local_id = 0
+        # Record of the files local articles have been created from
+        self.local_file_registry = FileRegistry()
 
         self.id_categories, self.name_categories = self.get_figshare_cats()
 
@@ -92,6 +105,11 @@ class MainWindow(QMainWindow):
         self.setWindowTitle('Figshare Desktop')
         self.setWindowIcon(QIcon(os.path.abspath(__file__ + '/../..' + '/img/figshare_logo.png')))
 
+        # Network debug panel, hidden until opened from the View menu
+        self.network_panel = NetworkPanel(parent=self)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.network_panel)
+        self.network_panel.hide()
+
         self.menu_bar()
 
         # Add Section Window
@@ -99,6 +117,9 @@ class MainWindow(QMainWindow):
         self.mdi.addSubWindow(self.section_window)
         self.section_window.show()
 
+        # Send any edits left queued by a previous session
+        self.mirror_sync.send_edits()
+
     def format_window(self):
         """
         Maximizes the main window
@@ -123,6 +144,11 @@ class MainWindow(QMainWindow):
         file = bar.addMenu('&File')
         file.addAction(self.exitAction())
 
+        view = bar.addMenu('&View')
+        network_action = self.network_panel.toggleViewAction()
+        network_action.setShortcut('Ctrl+Shift+N')
+        view.addAction(network_action)
+
     def exitAction(self):
         """
 
@@ -133,6 +159,33 @@ class MainWindow(QMainWindow):
         self.exit_action.triggered.connect(qApp.quit)
         return self.exit_action
 
+    # Offline Mirror Functions
+    # ========================
+
+    def on_online_changed(self, online: bool):
+        """
+        Shows in the status bar when Figshare cannot be reached and the windows are showing the offline mirror.
+        """
+        if online:
+            self.statusBar().showMessage('Reconnected to Figshare', 5000)
+        else:
+            n_edits = self.local_mirror.pending_count()
+            self.statusBar().showMessage('Offline: showing the local mirror of Figshare. {} edits queued.'.format(
+                n_edits))
+
+    def on_edits_sent(self, sent: list, errors: list):
+        """
+        Reports the outcome of sending queued edits.
+        """
+        self.statusBar().showMessage('Sent {} queued edits to Figshare'.format(len(sent)), 5000)
+        if errors:
+            msg_box = QMessageBox(self)
+            msg_box.setIcon(QMessageBox.Warning)
+            msg_box.setWindowTitle('Queued Edit Errors')
+            msg_box.setText('{} queued edits were refused by Figshare.'.format(len(errors)))
+            msg_box.setDetailedText('\n'.join(errors))
+            msg_box.show()
+
     # Figshare API Functions
     # ======================
 
@@ -142,11 +195,5 @@ class MainWindow(QMainWindow):
         Returns:
             cat_dict (dict): Figshare categories dictionary.
         """
-        # Get a dictionary of categories from Figshare with id and name pairs
-        allowed_cats = issue_request(method='GET', endpoint='categories', token=self.token)
-        id_dict = {}
-        name_dict = {}
-        for cat in allowed_cats:
-            id_dict[cat['id']] = cat['title']
-            name_dict[cat['title']] = cat['id']
-        return id_dict, name_dict
+        # Get the cached dictionaries of categories from Figshare with id and name pairs
+        return get_reference_data(self.token).get_categories()
@@ -0,0 +1,166 @@
+"""
+Network Panel
+
+Dockable debug panel showing the Figshare API traffic recorded by the network monitor, refreshed while it is visible.
+Each row is an endpoint, with its latencies, bytes moved and errors, and the recorded statistics can be exported as a
+JSON or CSV report.
+"""
+
+from PyQt5.QtWidgets import (QDockWidget, QWidget, QTableWidget, QTableWidgetItem, QPushButton, QLabel, QFileDialog,
+                             QMessageBox, QHBoxLayout, QVBoxLayout, QHeaderView, QAbstractItemView)
+from PyQt5.QtCore import (Qt, QTimer)
+
+from Figshare_desktop.network.instrumentation import default_monitor
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+# Milliseconds between refreshes of the panel while it is visible
+REFRESH_INTERVAL = 1000
+
+# Table columns as (header, report key, format)
+COLUMNS = (('Endpoint', 'endpoint', '{}'),
+           ('Calls', 'calls', '{}'),
+           ('Errors', 'errors', '{}'),
+           ('Retries', 'retries', '{}'),
+           ('Mean ms', 'mean_ms', '{:.1f}'),
+           ('p50 ms', 'p50_ms', '{:.0f}'),
+           ('p95 ms', 'p95_ms', '{:.0f}'),
+           ('Max ms', 'max_ms', '{:.1f}'),
+           ('Sent', 'bytes_sent', None),
+           ('Received', 'bytes_received', None))
+
+
+def format_bytes(n_bytes: int):
+    """
+    Formats a number of bytes with a binary unit prefix.
+    """
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if n_bytes < 1024 or unit == 'GB':
+            return '{:.0f} {}'.format(n_bytes, unit) if unit == 'B' else '{:.1f} {}'.format(n_bytes, unit)
+        n_bytes /= 1024
+
+
+class NetworkPanel(QDockWidget):
+    """
+    Dock widget listing request statistics by endpoint.
+    """
+
+    def __init__(self, parent=None, monitor=None):
+        """
+        Args:
+            parent: Main window the panel is docked in.
+            monitor: NetworkMonitor to display. Defaults to the monitor shared by the application.
+
+        Returns:
+            None
+        """
+        super().__init__('Network', parent)
+        self.setObjectName('network_panel')
+        self.monitor = default_monitor() if monitor is None else monitor
+
+        self.initUI()
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(REFRESH_INTERVAL)
+        self.timer.timeout.connect(self.refresh)
+        self.visibilityChanged.connect(self.on_visibility_changed)
+
+    def initUI(self):
+
+        self.summary = QLabel()
+
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels([header for header, key, fmt in COLUMNS])
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+
+        reset_btn = QPushButton('Reset')
+        reset_btn.setToolTip('Discard the recorded statistics')
+        reset_btn.pressed.connect(self.on_reset_pressed)
+
+        export_btn = QPushButton('Export')
+        export_btn.setToolTip('Save the recorded statistics as a JSON or CSV report')
+        export_btn.pressed.connect(self.on_export_pressed)
+
+        hbox = QHBoxLayout()
+        hbox.addWidget(self.summary)
+        hbox.addStretch(1)
+        hbox.addWidget(reset_btn)
+        hbox.addWidget(export_btn)
+
+        vbox = QVBoxLayout()
+        vbox.addLayout(hbox)
+        vbox.addWidget(self.table)
+
+        widget = QWidget()
+        widget.setLayout(vbox)
+        self.setWidget(widget)
+
+    #####
+    # Panel Functions
+    #####
+
+    def on_visibility_changed(self, visible: bool):
+        """
+        Only refreshes the panel while it can be seen.
+        """
+        if visible:
+            self.refresh()
+            self.timer.start()
+        else:
+            self.timer.stop()
+
+    def refresh(self):
+        """
+        Fills the table from the current statistics of the monitor.
+        """
+        report = self.monitor.report()
+        self.summary.setText('{} requests, {} errors, {} sent, {} received'.format(
+            report['calls'], report['errors'], format_bytes(report['bytes_sent']),
+            format_bytes(report['bytes_received'])))
+
+        # Endpoints come slowest total time first
+        endpoints = report['endpoints']
+        self.table.setRowCount(len(endpoints))
+        for row, endpoint in enumerate(endpoints):
+            for column, (header, key, fmt) in enumerate(COLUMNS):
+                value = endpoint[key]
+                if fmt is None:
+                    item = QTableWidgetItem(format_bytes(value))
+                else:
+                    item = QTableWidgetItem(fmt.format(value))
+                if key != 'endpoint':
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, column, item)
+
+            # Where the requests came from, and their latency distribution, are shown on hovering over the endpoint
+            sites = '\n'.join('{} ({})'.format(site, n) for site, n in endpoint['call_sites'].items())
+            histogram = ', '.join('<={} ms: {}'.format(bound, n) for bound, n in endpoint['histogram'].items() if n)
+            statuses = ', '.join('{}: {}'.format(status, n) for status, n in endpoint['statuses'].items())
+            self.table.item(row, 0).setToolTip('Called from:\n{}\n\nStatus: {}\nLatency: {}'.format(
+                sites, statuses, histogram))
+
+    def on_reset_pressed(self):
+        self.monitor.reset()
+        self.refresh()
+
+    def on_export_pressed(self):
+        """
+        Asks for a file and writes the report to it, as CSV for a .csv file and as JSON otherwise.
+        """
+        path, file_filter = QFileDialog.getSaveFileName(self, 'Export Network Report', 'network_report.json',
+                                                        'JSON (*.json);;CSV (*.csv)')
+        if not path:
+            return
+        try:
+            self.monitor.export(path)
+        except OSError as err:
+            QMessageBox.warning(self, 'Export Error', 'Could not write the report.\n{}'.format(err), QMessageBox.Ok)
@@ -0,0 +1,98 @@
+"""
+Transport Benchmark
+
+Compares the latency of requests made through the shared keep-alive transport with requests made through the module
+level functions of requests, which open a new connection for every call, against a local stand-in Figshare server.
+
+Usage:
+    python -m Figshare_desktop.network.benchmark_transport [--requests N] [--workers N]
+
+Against a local server only the TCP connection setup is saved. Against Figshare each new connection also needs a TLS
+handshake over the network, so the saving per request is larger.
+"""
+
+import sys
+import time
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from Figshare_desktop.network.stub_server import StubFigshareServer
+from Figshare_desktop.network.transport import HTTPTransport
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+# Token sent to the stand-in server, which does not check it
+BENCHMARK_TOKEN = 'benchmark'
+
+
+def time_calls(call, n_requests: int, workers: int=1):
+    """
+    Times each of a number of calls, made from a pool of threads.
+
+    Args:
+        call: Callable making a single request and returning the response.
+        n_requests: Number of calls to make.
+        workers: Number of concurrent threads.
+
+    Returns:
+        latencies (list of float): Time in seconds of each call.
+        elapsed (float): Total time in seconds.
+    """
+    def timed(_):
+        start = time.perf_counter()
+        response = call()
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        latencies = list(executor.map(timed, range(n_requests)))
+    return latencies, time.perf_counter() - start
+
+
+def report(name: str, latencies: list, elapsed: float):
+    print('{:<8} mean {:.3f} ms, median {:.3f} ms, total {:.3f} s'.format(
+        name, 1000 * statistics.mean(latencies), 1000 * statistics.median(latencies), elapsed))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--requests', type=int, default=500, help='Number of requests made by each method.')
+    parser.add_argument('--workers', type=int, default=1, help='Number of concurrent requests.')
+    args = parser.parse_args(argv)
+
+    server = StubFigshareServer()
+    server.start()
+    transport = HTTPTransport()
+    try:
+        headers = {'Authorization': 'token {}'.format(BENCHMARK_TOKEN)}
+        response = transport.post('{}/account/projects/1/articles'.format(server.api_base), token=BENCHMARK_TOKEN,
+                                  json={'title': 'benchmark'})
+        url = '{}/account/articles/{}/files'.format(server.api_base, response.json()['entity_id'])
+
+        print('{} requests, {} concurrent'.format(args.requests, args.workers))
+        fresh, fresh_elapsed = time_calls(lambda: requests.get(url, headers=headers), args.requests, args.workers)
+        report('new', fresh, fresh_elapsed)
+        pooled, pooled_elapsed = time_calls(lambda: transport.get(url, token=BENCHMARK_TOKEN), args.requests,
+                                            args.workers)
+        report('pooled', pooled, pooled_elapsed)
+
+        saved = statistics.mean(fresh) - statistics.mean(pooled)
+        print('saved    {:.3f} ms per request ({:.0f}%)'.format(1000 * saved, 100 * saved / statistics.mean(fresh)))
+    finally:
+        transport.close()
+        server.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,299 @@
+"""
+Request Instrumentation
+
+Records the Figshare API traffic of the application. Requests are grouped by endpoint, with the ids and tokens in their
+paths replaced by placeholders, and for each endpoint the monitor keeps a latency histogram, the bytes sent and
+received, error and retry counts, and the places in the code the requests were made from.
+
+Every request made through an HTTPTransport is recorded, which covers issue_request, the Projects and Collections
+structures, uploads and downloads once the transport is installed.
+"""
+
+import re
+import csv
+import sys
+import json
+import time
+import threading
+import collections
+from urllib.parse import urlsplit
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+# Upper bounds in milliseconds of the latency histogram buckets. A final bucket holds anything slower.
+LATENCY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+
+# Number of call sites kept for each endpoint
+MAX_CALL_SITES = 10
+
+# Modules skipped when finding the call site of a request, as they only pass requests on
+SKIPPED_MODULES = ('Figshare_desktop.network.', 'requests', 'urllib3', 'figshare_interface.http_requests')
+
+# Path segments replaced by placeholders when grouping requests by endpoint
+ID_SEGMENT = re.compile(r'^\d+$')
+TOKEN_SEGMENT = re.compile(r'^[0-9a-fA-F-]{16,}$')
+
+# Columns of the CSV report
+CSV_COLUMNS = ('endpoint', 'calls', 'errors', 'retries', 'mean_ms', 'p50_ms', 'p95_ms', 'max_ms', 'bytes_sent',
+               'bytes_received', 'statuses', 'call_sites')
+
+
+def endpoint_name(method: str, url: str):
+    """
+    Groups a request by its method and path, with numeric ids and upload tokens replaced by placeholders.
+
+    Args:
+        method: HTTP method.
+        url: Full url of the request.
+
+    Returns:
+        str, such as 'GET /v2/account/articles/{id}/files'
+    """
+    segments = []
+    for segment in urlsplit(url).path.split('/'):
+        if ID_SEGMENT.match(segment):
+            segment = '{id}'
+        elif TOKEN_SEGMENT.match(segment):
+            segment = '{token}'
+        segments.append(segment)
+    return '{} {}'.format(method.upper(), '/'.join(segments))
+
+
+def call_site(depth: int=2):
+    """
+    Returns the module and function the current request was made from, skipping the transport and request helpers.
+
+    Args:
+        depth: Number of frames above this function to start from.
+
+    Returns:
+        str, such as 'figshare_interface.figshare_structures.projects.list_articles'
+    """
+    frame = sys._getframe(depth)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if not module.startswith(SKIPPED_MODULES):
+            return '{}.{}'.format(module, frame.f_code.co_name)
+        frame = frame.f_back
+    return 'unknown'
+
+
+def body_size(body):
+    """
+    Returns the size in bytes of a request body, or 0 if it cannot be known without reading it.
+    """
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    if isinstance(body, str):
+        return len(body.encode('utf-8'))
+    if isinstance(body, (dict, list)):
+        return len(json.dumps(body).encode('utf-8'))
+    return 0
+
+
+class EndpointStats(object):
+    """
+    Request statistics of a single endpoint.
+    """
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_time = 0.
+        self.max_time = 0.
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.statuses = collections.Counter()
+        self.call_sites = collections.Counter()
+
+    def add(self, elapsed: float, sent: int, received: int, status, error: bool, retry: bool, site: str):
+        self.calls += 1
+        self.errors += error
+        self.retries += retry
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        self.bytes_sent += sent
+        self.bytes_received += received
+        self.statuses[status] += 1
+        if site in self.call_sites or len(self.call_sites) < MAX_CALL_SITES:
+            self.call_sites[site] += 1
+
+        ms = 1000 * elapsed
+        for n, bound in enumerate(LATENCY_BUCKETS):
+            if ms <= bound:
+                self.histogram[n] += 1
+                break
+        else:
+            self.histogram[-1] += 1
+
+    def percentile(self, q: float):
+        """
+        Estimates a latency percentile in milliseconds from the histogram, as the upper bound of the bucket holding it,
+        or the slowest latency recorded if that is lower.
+
+        Args:
+            q: Percentile between 0 and 100.
+
+        Returns:
+            float
+        """
+        if not self.calls:
+            return 0.
+        target = q / 100. * self.calls
+        seen = 0
+        for n, count in enumerate(self.histogram):
+            seen += count
+            if seen >= target and count:
+                break
+        else:
+            return 1000 * self.max_time
+        # No request took longer than the slowest one recorded
+        return min(float(LATENCY_BUCKETS[n]) if n < len(LATENCY_BUCKETS) else float('inf'), 1000 * self.max_time)
+
+    def as_dict(self):
+        return {'endpoint': self.endpoint,
+                'calls': self.calls,
+                'errors': self.errors,
+                'retries': self.retries,
+                'mean_ms': 1000 * self.total_time / self.calls if self.calls else 0.,
+                'p50_ms': self.percentile(50),
+                'p95_ms': self.percentile(95),
+                'max_ms': 1000 * self.max_time,
+                'bytes_sent': self.bytes_sent,
+                'bytes_received': self.bytes_received,
+                'histogram': dict(zip([str(b) for b in LATENCY_BUCKETS] + ['inf'], self.histogram)),
+                'statuses': {str(status): count for status, count in self.statuses.items()},
+                'call_sites': dict(self.call_sites.most_common())}
+
+
+class NetworkMonitor(object):
+    """
+    Thread safe record of request statistics by endpoint.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self.started = time.time()
+        self.enabled = True
+
+    def record(self, method: str, url: str, elapsed: float, sent: int=0, received: int=0, status=None,
+               error: bool=False, retry: bool=False, site: str=None):
+        """
+        Records a single request.
+
+        Args:
+            method: HTTP method.
+            url: Full url of the request.
+            elapsed: Time in seconds until the response headers were received, or the request failed.
+            sent: Bytes in the request body.
+            received: Bytes in the response body.
+            status: HTTP status code, or the name of the exception if no response was received.
+            error: True if the request failed or received an error status.
+            retry: True if the request was a retry of an earlier attempt.
+            site: Place in the code the request was made from.
+
+        Returns:
+            None
+        """
+        if not self.enabled:
+            return
+        endpoint = endpoint_name(method, url)
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = EndpointStats(endpoint)
+            stats.add(elapsed, sent, received, status, error, retry, site or 'unknown')
+
+    def snapshot(self):
+        """
+        Returns the statistics of each endpoint, slowest total time first.
+
+        Returns:
+            list of dict
+        """
+        with self._lock:
+            stats = sorted(self._endpoints.values(), key=lambda s: s.total_time, reverse=True)
+            return [s.as_dict() for s in stats]
+
+    def reset(self):
+        """
+        Discards all recorded statistics.
+        """
+        with self._lock:
+            self._endpoints = {}
+            self.started = time.time()
+
+    def report(self):
+        """
+        Returns the full report, with totals across all endpoints.
+
+        Returns:
+            dict
+        """
+        endpoints = self.snapshot()
+        return {'started': self.started,
+                'duration': time.time() - self.started,
+                'calls': sum(e['calls'] for e in endpoints),
+                'errors': sum(e['errors'] for e in endpoints),
+                'bytes_sent': sum(e['bytes_sent'] for e in endpoints),
+                'bytes_received': sum(e['bytes_received'] for e in endpoints),
+                'endpoints': endpoints}
+
+    def export_json(self, path: str):
+        """
+        Writes the full report to a JSON file.
+        """
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+    def export_csv(self, path: str):
+        """
+        Writes one row per endpoint to a CSV file. Status codes and call sites are written as 'key=count' lists.
+        """
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_COLUMNS)
+            for e in self.snapshot():
+                row = []
+                for column in CSV_COLUMNS:
+                    value = e[column]
+                    if isinstance(value, dict):
+                        value = '; '.join('{}={}'.format(k, v) for k, v in value.items())
+                    elif isinstance(value, float):
+                        value = '{:.3f}'.format(value)
+                    row.append(value)
+                writer.writerow(row)
+
+    def export(self, path: str):
+        """
+        Writes the report as CSV if the path ends in .csv, and as JSON otherwise.
+        """
+        if path.lower().endswith('.csv'):
+            self.export_csv(path)
+        else:
+            self.export_json(path)
+
+
+_default_monitor = NetworkMonitor()
+
+
+def default_monitor():
+    """
+    Returns the monitor shared by the whole application.
+
+    Returns:
+        NetworkMonitor
+    """
+    return _default_monitor
@@ -0,0 +1,340 @@
+"""
+Stand-in Figshare Server
+
+A minimal local HTTP server implementing the parts of the Figshare API used by Figshare Desktop for uploads and
+downloads. It holds all state in memory and can be told to fail requests, so that interrupted and resumed transfers can
+be exercised without a Figshare account or network connection.
+
+Example:
+    server = StubFigshareServer(part_size=1024)
+    server.start()
+    uploader = ChunkedUploader(token, journal, api_base=server.api_base)
+    ...
+    server.stop()
+"""
+
+import re
+import json
+import uuid
+import hashlib
+import threading
+from http.server import (BaseHTTPRequestHandler, ThreadingHTTPServer)
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+# Default size in bytes of the file parts the server asks for
+DEFAULT_PART_SIZE = 1024 * 1024
+
+
+class StubFigshareServer(object):
+    """
+    In memory stand-in for the Figshare API and upload service.
+    """
+
+    def __init__(self, host: str='127.0.0.1', port: int=0, part_size: int=DEFAULT_PART_SIZE):
+        """
+        Args:
+            host: Interface to listen on.
+            port: Port to listen on. 0 picks a free port.
+            part_size: Size in bytes of the file parts uploads are split into.
+
+        Returns:
+            None
+        """
+        self.part_size = part_size
+
+        self.lock = threading.Lock()
+        self.articles = {}
+        self.files = {}
+        self.uploads = {}
+        self.failures = []
+        self.request_log = []
+        self._next_id = 1000
+
+        handler = type('StubFigshareHandler', (StubFigshareHandler,), {'stub': self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    @property
+    def api_base(self):
+        return self.base_url + '/v2'
+
+    def start(self):
+        """
+        Serves requests from a background thread.
+        """
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='stub_figshare_server', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops the server and releases its port.
+        """
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def new_id(self):
+        with self.lock:
+            self._next_id += 1
+            return self._next_id
+
+    #####
+    # Failure Injection
+    #####
+
+    def fail(self, method: str, path_pattern: str, status: int=503, count: int=1):
+        """
+        Makes the next matching requests fail.
+
+        Args:
+            method: HTTP method to match.
+            path_pattern: Regular expression searched for in the request path.
+            status: HTTP status code to respond with.
+            count: Number of matching requests to fail.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.failures.append([method, re.compile(path_pattern), status, count])
+
+    def take_failure(self, method: str, path: str):
+        """
+        Returns the status code of an injected failure matching the request, or None.
+        """
+        with self.lock:
+            for failure in self.failures:
+                f_method, pattern, status, count = failure
+                if f_method == method and pattern.search(path):
+                    failure[3] -= 1
+                    if failure[3] <= 0:
+                        self.failures.remove(failure)
+                    return status
+        return None
+
+    #####
+    # Inspection
+    #####
+
+    def file_data(self, file_id: int):
+        """
+        Returns the bytes received for a file, with any missing parts left empty.
+        """
+        upload = self.uploads[self.files[file_id]['upload_token']]
+        return b''.join(upload['data'].get(part['partNo'], b'') for part in upload['parts'])
+
+    def file_info(self, file_id: int):
+        """
+        Returns the Figshare file dictionary of a file, including its download url.
+        """
+        file_info = dict(self.files[file_id])
+        file_info['download_url'] = '{}/download/{}'.format(self.base_url, file_id)
+        return file_info
+
+    def count_requests(self, method: str, path_pattern: str):
+        """
+        Returns the number of requests received matching the method and path pattern.
+        """
+        pattern = re.compile(path_pattern)
+        return sum(1 for m, p in self.request_log if m == method and pattern.search(p))
+
+
+class StubFigshareHandler(BaseHTTPRequestHandler):
+    """
+    Request handler routing each request to the StubFigshareServer given by the stub class attribute.
+    """
+
+    stub = None
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately, which on a kept-alive connection would otherwise wait on a delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    #####
+    # Response Functions
+    #####
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return self.rfile.read(length) if length else b''
+
+    def send_json(self, status: int, body=None):
+        data = b'' if body is None else json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_error_json(self, status: int, message: str=''):
+        self.send_json(status, {'message': message, 'code': 'StubError'})
+
+    #####
+    # Routing
+    #####
+
+    routes = [
+        ('POST', r'^/v2/account/projects/(\d+)/articles$', 'create_article'),
+        ('GET', r'^/v2/account/articles/(\d+)$', 'get_article'),
+        ('POST', r'^/v2/account/articles/(\d+)/files$', 'initiate_file'),
+        ('GET', r'^/v2/account/articles/(\d+)/files/(\d+)$', 'get_file'),
+        ('POST', r'^/v2/account/articles/(\d+)/files/(\d+)$', 'complete_file'),
+        ('DELETE', r'^/v2/account/projects/(\d+)/articles/(\d+)$', 'delete_article'),
+        ('GET', r'^/v2/account/articles/(\d+)/files$', 'list_files'),
+        ('GET', r'^/download/(\d+)$', 'download_file'),
+        ('GET', r'^/upload/([\w-]+)$', 'get_upload'),
+        ('PUT', r'^/upload/([\w-]+)/(\d+)$', 'put_part'),
+    ]
+
+    def route(self, method: str):
+        path = self.path.split('?')[0]
+        self.stub.request_log.append((method, path))
+        body = self.read_body()
+
+        status = self.stub.take_failure(method, path)
+        if status is not None:
+            return self.send_error_json(status, 'Injected failure')
+
+        for r_method, pattern, name in self.routes:
+            match = re.match(pattern, path)
+            if r_method == method and match:
+                return getattr(self, name)(body, *match.groups())
+        self.send_error_json(404, 'No route for {} {}'.format(method, path))
+
+    def do_GET(self):
+        self.route('GET')
+
+    def do_POST(self):
+        self.route('POST')
+
+    def do_PUT(self):
+        self.route('PUT')
+
+    def do_DELETE(self):
+        self.route('DELETE')
+
+    #####
+    # Endpoints
+    #####
+
+    def create_article(self, body: bytes, project_id: str):
+        article_id = self.stub.new_id()
+        metadata = json.loads(body.decode('utf-8')) if body else {}
+        self.stub.articles[article_id] = {'id': article_id, 'project_id': int(project_id), 'files': [],
+                                          'metadata': metadata}
+        self.send_json(201, {'entity_id': article_id,
+                             'location': '{}/account/articles/{}'.format(self.stub.api_base, article_id)})
+
+    def get_article(self, body: bytes, article_id: str):
+        article = self.stub.articles.get(int(article_id))
+        if article is None:
+            return self.send_error_json(404, 'Article not found')
+        result = dict(article['metadata'], id=article['id'], project_id=article['project_id'],
+                      files=[self.stub.file_info(file_id) for file_id in article['files']])
+        self.send_json(200, result)
+
+    def initiate_file(self, body: bytes, article_id: str):
+        article = self.stub.articles.get(int(article_id))
+        if article is None:
+            return self.send_error_json(404, 'Article not found')
+        info = json.loads(body.decode('utf-8'))
+
+        file_id = self.stub.new_id()
+        upload_token = uuid.uuid4().hex
+        parts = []
+        part_size = self.stub.part_size
+        for n, start in enumerate(range(0, max(info['size'], 1), part_size)):
+            parts.append({'partNo': n + 1, 'startOffset': start,
+                          'endOffset': min(start + part_size, info['size']) - 1, 'status': 'PENDING'})
+
+        self.stub.uploads[upload_token] = {'parts': parts, 'data': {}}
+        self.stub.files[file_id] = {'id': file_id, 'name': info['name'], 'size': info['size'],
+                                    'supplied_md5': info.get('md5'), 'computed_md5': None, 'status': 'created',
+                                    'upload_token': upload_token,
+                                    'upload_url': '{}/upload/{}'.format(self.stub.base_url, upload_token)}
+        article['files'].append(file_id)
+        self.send_json(201, {'location': '{}/account/articles/{}/files/{}'.format(self.stub.api_base, article_id,
+                                                                                  file_id)})
+
+    def list_files(self, body: bytes, article_id: str):
+        article = self.stub.articles.get(int(article_id))
+        if article is None:
+            return self.send_error_json(404, 'Article not found')
+        self.send_json(200, [self.stub.file_info(file_id) for file_id in article['files']])
+
+    def get_file(self, body: bytes, article_id: str, file_id: str):
+        article = self.stub.articles.get(int(article_id))
+        if article is None or int(file_id) not in article['files']:
+            return self.send_error_json(404, 'File not found')
+        self.send_json(200, self.stub.file_info(int(file_id)))
+
+    def complete_file(self, body: bytes, article_id: str, file_id: str):
+        article = self.stub.articles.get(int(article_id))
+        if article is None or int(file_id) not in article['files']:
+            return self.send_error_json(404, 'File not found')
+        file_info = self.stub.files[int(file_id)]
+        upload = self.stub.uploads[file_info['upload_token']]
+        if any(part['status'] != 'COMPLETE' for part in upload['parts']):
+            return self.send_error_json(400, 'Upload has missing parts')
+        file_info['computed_md5'] = hashlib.md5(self.stub.file_data(int(file_id))).hexdigest()
+        file_info['status'] = 'available'
+        self.send_json(202)
+
+    def delete_article(self, body: bytes, project_id: str, article_id: str):
+        if self.stub.articles.pop(int(article_id), None) is None:
+            return self.send_error_json(404, 'Article not found')
+        self.send_json(204)
+
+    def download_file(self, body: bytes, file_id: str):
+        file_info = self.stub.files.get(int(file_id))
+        if file_info is None or file_info['status'] != 'available':
+            return self.send_error_json(404, 'File not found')
+        data = self.stub.file_data(int(file_id))
+
+        # Support open ended range requests, as used to resume downloads
+        start = 0
+        match = re.match(r'bytes=(\d+)-$', self.headers.get('Range', ''))
+        if match:
+            start = int(match.group(1))
+            if start >= len(data):
+                return self.send_error_json(416, 'Range not satisfiable')
+        chunk = data[start:]
+
+        self.send_response(206 if match else 200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(chunk)))
+        if match:
+            self.send_header('Content-Range', 'bytes {}-{}/{}'.format(start, len(data) - 1, len(data)))
+        self.end_headers()
+        self.wfile.write(chunk)
+
+    def get_upload(self, body: bytes, upload_token: str):
+        upload = self.stub.uploads.get(upload_token)
+        if upload is None:
+            return self.send_error_json(404, 'Upload not found')
+        self.send_json(200, {'token': upload_token, 'parts': upload['parts']})
+
+    def put_part(self, body: bytes, upload_token: str, part_no: str):
+        upload = self.stub.uploads.get(upload_token)
+        if upload is None:
+            return self.send_error_json(404, 'Upload not found')
+        part = upload['parts'][int(part_no) - 1]
+        if len(body) != part['endOffset'] - part['startOffset'] + 1:
+            return self.send_error_json(400, 'Part size mismatch')
+        upload['data'][part['partNo']] = body
+        part['status'] = 'COMPLETE'
+        self.send_json(200)
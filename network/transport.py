@@ -0,0 +1,373 @@
+"""
+HTTP Transport
+
+Shared HTTP transport for all requests made to Figshare. Each token is given a single requests.Session whose pooled
+keep-alive connections are reused between requests and threads, so that requests after the first to a host do not pay
+for a new TCP connection and TLS handshake. Responses are requested gzip compressed, requests have default connect and
+read timeouts, and requests rejected by rate limiting or a transient server error are retried with a jittered
+exponential backoff. Requests the GUI thread waits on are made within single_attempt(), which makes them once with a
+shorter timeout.
+
+The figshare_interface package makes its requests through the module level functions of requests, which open a new
+connection for every call. install() routes those calls through the shared transport by replacing the requests module
+referenced by the figshare_interface modules with a TransportModule.
+
+Example:
+    install()
+    response = default_transport().request('GET', url, token=OAuth_token)
+"""
+
+import sys
+import time
+import random
+import importlib
+import threading
+import contextlib
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests import (ConnectionError as RequestsConnectionError, Timeout)
+
+# Figshare Desktop Imports
+from Figshare_desktop.background_jobs.concurrency import (DEFAULT_MAX_WORKERS, RETRY_STATUS_CODES)
+from Figshare_desktop.network.instrumentation import (default_monitor, call_site, body_size)
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+# Default (connect, read) timeouts in seconds of requests that do not give their own
+DEFAULT_TIMEOUT = (10., 60.)
+
+# Default number of times a request is retried after a retryable failure
+DEFAULT_RETRIES = 3
+
+# (connect, read) timeouts in seconds of requests made within single_attempt(), which the user is waiting on
+FOREGROUND_TIMEOUT = (3., 30.)
+
+# Default number of keep-alive connections kept open to each host. Enough for every concurrent worker to hold one.
+DEFAULT_POOL_SIZE = 2 * DEFAULT_MAX_WORKERS
+
+# Methods that can safely be sent again after a server error, as repeating them has no further effect
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+# Modules of the figshare_interface package that make requests
+INTERFACE_MODULES = ('figshare_interface.http_requests.figshare_requests',
+                     'figshare_interface.figshare_structures.projects',
+                     'figshare_interface.figshare_structures.collections')
+
+# Request functions of the requests module that modules may import directly
+REQUEST_FUNCTIONS = ('request', 'get', 'options', 'head', 'post', 'put', 'patch', 'delete')
+
+
+def token_from_headers(headers):
+    """
+    Returns the token of a Figshare 'Authorization: token ...' header.
+
+    Args:
+        headers: Request headers dictionary, or None.
+
+    Returns:
+        token (str or None)
+    """
+    if not headers:
+        return None
+    authorization = headers.get('Authorization', '')
+    if authorization.startswith('token '):
+        return authorization[len('token '):]
+    return None
+
+
+class HTTPTransport(object):
+    """
+    Pool of keep-alive sessions, one per token, through which requests are made with retries and default timeouts.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, retries: int=DEFAULT_RETRIES, base_delay: float=0.5,
+                 max_delay: float=30., pool_size: int=DEFAULT_POOL_SIZE, monitor=default_monitor()):
+        """
+        Args:
+            timeout: Default timeout in seconds, or (connect, read) tuple of timeouts, of each request.
+            retries: Maximum number of retries of a request.
+            base_delay: Delay in seconds before the first retry. Doubled for each subsequent retry.
+            max_delay: Upper limit of the delay between retries.
+            pool_size: Number of connections kept open to each host.
+            monitor: NetworkMonitor recording each request made, or None to record nothing.
+
+        Returns:
+            None
+        """
+        self.monitor = monitor
+        self.timeout = timeout
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.pool_size = pool_size
+
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    def session(self, OAuth_token: str=None):
+        """
+        Returns the session of a token, creating it on first use. Requests without a token share a single session.
+
+        Args:
+            OAuth_token: Authentication token generated from Figshare login, or None.
+
+        Returns:
+            requests.Session
+        """
+        with self._lock:
+            session = self._sessions.get(OAuth_token)
+            if session is None:
+                session = requests.Session()
+                # Retries are made by request() so that they can be limited to requests that are safe to repeat
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size, max_retries=0)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers['Accept-Encoding'] = 'gzip, deflate'
+                if OAuth_token is not None:
+                    session.headers['Authorization'] = 'token {}'.format(OAuth_token)
+                self._sessions[OAuth_token] = session
+            return session
+
+    def close(self):
+        """
+        Closes all sessions and their open connections.
+        """
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            session.close()
+
+    def retry_delay(self, attempt: int, response=None):
+        """
+        Returns the delay before a retry, as requested by a Retry-After header or else a jittered exponential backoff.
+        """
+        if response is not None:
+            try:
+                return float(response.headers.get('Retry-After'))
+            except (TypeError, ValueError):
+                pass
+        # Full jitter stops a pool of workers that were throttled together from retrying in lockstep
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def request(self, method: str, url: str, token: str=None, **kwargs):
+        """
+        Makes a request through the session of its token.
+
+        Rate limited requests are always retried, as Figshare has not acted on them. Server errors and connection
+        failures are only retried for idempotent methods, so that a request creating an item is not repeated.
+
+        Args:
+            method: HTTP method.
+            url: Full url of the request.
+            token: Authentication token. If None it is taken from any Authorization header given.
+            kwargs: Keyword arguments of requests.Session.request, such as headers, data, json, stream and timeout.
+
+        Returns:
+            requests.Response: The final response, which may have an error status once retries are exhausted.
+
+        Raises:
+            ConnectionError, Timeout: If the request could not be made once retries are exhausted.
+        """
+        method = method.upper()
+        if token is None:
+            token = token_from_headers(kwargs.get('headers'))
+        # Requests made within single_attempt() are not retried, and have its shorter timeout
+        foreground_timeout = getattr(_foreground, 'timeout', None)
+        retries = self.retries if foreground_timeout is None else 0
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout if foreground_timeout is None else foreground_timeout
+        session = self.session(token)
+        idempotent = method in IDEMPOTENT_METHODS
+
+        if self.monitor is not None:
+            site = call_site()
+            sent = body_size(kwargs.get('data')) or body_size(kwargs.get('json'))
+
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = session.request(method, url, **kwargs)
+            except Exception as err:
+                if self.monitor is not None:
+                    self.monitor.record(method, url, time.perf_counter() - start, sent=sent,
+                                        status=type(err).__name__, error=True, retry=attempt > 0, site=site)
+                retryable = isinstance(err, (RequestsConnectionError, Timeout))
+                if attempt >= retries or not (retryable and idempotent):
+                    raise
+                delay = self.retry_delay(attempt)
+            else:
+                if self.monitor is not None:
+                    self.record_response(method, url, response, time.perf_counter() - start, sent, attempt > 0, site,
+                                         streamed=kwargs.get('stream', False))
+                status = response.status_code
+                retryable = status == 429 or (idempotent and status in RETRY_STATUS_CODES)
+                if attempt >= retries or not retryable:
+                    return response
+                delay = self.retry_delay(attempt, response)
+                # Return the connection to the pool before waiting
+                response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def record_response(self, method: str, url: str, response, elapsed: float, sent: int, retry: bool, site: str,
+                        streamed: bool=False):
+        """
+        Records a response with the monitor under the url requested, rather than any url it was redirected to. The body
+        of a streamed response has not been read yet, so its size is taken from the Content-Length header.
+        """
+        if streamed:
+            try:
+                received = int(response.headers.get('Content-Length', 0))
+            except ValueError:
+                received = 0
+        else:
+            received = len(response.content or b'')
+        self.monitor.record(method, url, elapsed, sent=sent, received=received,
+                            status=response.status_code, error=response.status_code >= 400, retry=retry, site=site)
+
+    def get(self, url: str, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url: str, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def delete(self, url: str, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+
+class TransportModule(object):
+    """
+    Stand-in for the requests module whose request functions go through an HTTPTransport. All other attributes, such
+    as the exception classes, are those of the requests module.
+    """
+
+    def __init__(self, transport: HTTPTransport):
+        self.transport = transport
+
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+    def request(self, method, url, **kwargs):
+        return self.transport.request(method, url, **kwargs)
+
+    def get(self, url, params=None, **kwargs):
+        return self.request('GET', url, params=params, **kwargs)
+
+    def options(self, url, **kwargs):
+        return self.request('OPTIONS', url, **kwargs)
+
+    def head(self, url, **kwargs):
+        kwargs.setdefault('allow_redirects', False)
+        return self.request('HEAD', url, **kwargs)
+
+    def post(self, url, data=None, json=None, **kwargs):
+        return self.request('POST', url, data=data, json=json, **kwargs)
+
+    def put(self, url, data=None, **kwargs):
+        return self.request('PUT', url, data=data, **kwargs)
+
+    def patch(self, url, data=None, **kwargs):
+        return self.request('PATCH', url, data=data, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+
+#####
+# Shared Transport
+#####
+
+_default_transport = None
+_default_lock = threading.Lock()
+
+# Thread local state of single_attempt()
+_foreground = threading.local()
+
+
+@contextlib.contextmanager
+def single_attempt(timeout=FOREGROUND_TIMEOUT):
+    """
+    Makes the requests of the current thread, within the context, once and with a short timeout. Used for requests the
+    GUI thread waits on, so that an unreachable Figshare is reported after a single connection attempt rather than
+    after every retry.
+
+    Args:
+        timeout: Timeout in seconds, or (connect, read) tuple of timeouts, of requests that do not give their own.
+
+    Example:
+        with single_attempt():
+            value = fetch()
+    """
+    previous = getattr(_foreground, 'timeout', None)
+    _foreground.timeout = timeout
+    try:
+        yield
+    finally:
+        _foreground.timeout = previous
+
+
+def default_transport():
+    """
+    Returns the transport shared by the whole application, creating it on first use.
+
+    Returns:
+        HTTPTransport
+    """
+    global _default_transport
+    with _default_lock:
+        if _default_transport is None:
+            _default_transport = HTTPTransport()
+        return _default_transport
+
+
+def install(transport: HTTPTransport=None, package: str='figshare_interface'):
+    """
+    Routes the requests of a package through a transport, by replacing the requests module, and any request functions
+    imported from it, in each of the package's loaded modules.
+
+    Args:
+        transport: Transport to route requests through. Defaults to the shared transport.
+        package: Name of the package whose modules are patched.
+
+    Returns:
+        patched (list): Names of the modules patched.
+    """
+    if transport is None:
+        transport = default_transport()
+    module = TransportModule(transport)
+
+    # Make sure the modules known to make requests are loaded before they are patched
+    if package == 'figshare_interface':
+        for name in INTERFACE_MODULES:
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                continue
+
+    patched = []
+    for name, loaded in list(sys.modules.items()):
+        if loaded is None or not (name == package or name.startswith(package + '.')):
+            continue
+        changed = False
+        if getattr(loaded, 'requests', None) is requests or isinstance(getattr(loaded, 'requests', None),
+                                                                        TransportModule):
+            loaded.requests = module
+            changed = True
+        for function in REQUEST_FUNCTIONS:
+            if getattr(loaded, function, None) is getattr(requests, function):
+                setattr(loaded, function, getattr(module, function))
+                changed = True
+        if changed:
+            patched.append(name)
+    return patched
@@ -4,6 +4,7 @@
 
 import os
 import math
+from functools import partial
 from requests import HTTPError
 
 from PyQt5.QtWidgets import (QWidget, QLabel, QPushButton, QLineEdit, QMessageBox, QMainWindow, QMdiSubWindow,
@@ -18,6 +19,7 @@ from Figshare_desktop.custom_widgets.button_field import QButtonField
 from Figshare_desktop.formatting.formatting import (grid_label, grid_edit, checkable_button, grid_title)
 
 from Figshare_desktop.projects_windows.articles_window import ProjectsArticlesWindow
+from Figshare_desktop.local_store.offline_mirror import mirror_key
 
 from figshare_interface import (Groups, Projects)
 
@@ -52,7 +54,9 @@ class ProjectInfoWindow(QMdiSubWindow):
         :return:
         """
         projects = Projects(self.token)
-        self.project_info = projects.get_info(project_id)
+        # Read from the offline mirror, which is refreshed from Figshare in the background
+        self.project_info = self.parent.mirror_sync.load(mirror_key('project', project_id),
+                                                         partial(projects.get_info, project_id))
 
     def initUI(self):
         """
@@ -540,6 +544,8 @@ class ProjectInfoWindow(QMdiSubWindow):
         try:
             projects = Projects(token)
             info = projects.update(project_id, **update_dict)
+            # Fetch the updated project when the window is reopened
+            self.parent.local_mirror.remove(mirror_key('project', project_id))
             return True
         except TypeError as err:
             return err
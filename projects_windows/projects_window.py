@@ -4,6 +4,7 @@
 
 import os
 import math
+from functools import partial
 from PyQt5.QtWidgets import (QMdiSubWindow, QLabel, QPushButton, QMessageBox, QMainWindow,
                              QWidget, QLineEdit, QHBoxLayout, QVBoxLayout, QSizePolicy, QScrollBar)
 from PyQt5.QtGui import (QIcon, QFont, QPalette, QColor)
@@ -12,6 +13,7 @@ from PyQt5.QtCore import (Qt, QObject)
 from ..formatting.formatting import (scaling_ratio, checkable_button, search_bar)
 from Figshare_desktop.projects_windows.new_project_window import NewProjectWindow
 from Figshare_desktop.projects_windows.project_info_window import ProjectInfoWindow
+from Figshare_desktop.local_store.offline_mirror import (PROJECTS_KEY, mirror_key)
 
 from figshare_interface import Projects
 
@@ -43,6 +45,7 @@ class ProjectsWindow(QMdiSubWindow):
         Initialize Figshare information
         """
         self.project_list = self.get_project_list(self.token)
+        self.mirror_projects(self.project_list)
 
     def initUI(self):
 
@@ -229,6 +232,7 @@ class ProjectsWindow(QMdiSubWindow):
         # Connect search function to the return key
         edit.returnPressed.connect(lambda: self.search_on_return(edit.text()))
         edit.textChanged.connect(lambda: self.search_on_clear(edit.text()))
+        self.search_edit = edit
         return edit
 
     #####
@@ -274,6 +278,31 @@ class ProjectsWindow(QMdiSubWindow):
 
         self.create_project_bar(0, number)
 
+    def on_project_list_changed(self, key, project_list):
+        """
+        Called when a background sync of the offline mirror finds that the project list has changed on Figshare.
+        Redraws the project buttons, unless search results are being shown.
+        :param key: str. Mirror key of the project list
+        :param project_list: list of dicts. Updated project list
+        :return:
+        """
+        self.mirror_projects(project_list)
+        if self.search_edit.text() != '':
+            return
+        self.project_list = project_list
+
+        while self.project_buttons_box.count():
+            item = self.project_buttons_box.takeAt(0)
+            item.widget().deleteLater()
+
+        # The list may have shrunk, so the scroll bar is limited before its position is read
+        number = min(len(self.project_list), 4)
+        self.s_bar.blockSignals(True)
+        self.s_bar.setMaximum(len(self.project_list) - number)
+        self.s_bar.blockSignals(False)
+        s_bar_pos = self.s_bar.value()
+        self.create_project_bar(s_bar_pos, s_bar_pos + number)
+
     def search_on_return(self, search_text):
         """
         Called when return is pressed in the search bar.
@@ -414,7 +443,22 @@ class ProjectsWindow(QMdiSubWindow):
         :return: array of project
         """
         projects = Projects(token)
-        return projects.get_list()
+        # Read from the offline mirror, which is refreshed from Figshare in the background
+        return self.parent.mirror_sync.load(PROJECTS_KEY, projects.get_list, self.on_project_list_changed, default=[])
+
+    def mirror_projects(self, project_list):
+        """
+        Mirrors in the background the info and article listing of any projects that have not been mirrored yet, so that
+        they can be opened offline
+        :param project_list: list of dicts. Figshare projects
+        :return:
+        """
+        projects = Projects(self.token)
+        fetches = {}
+        for project in project_list:
+            fetches[mirror_key('project', project['id'])] = partial(projects.get_info, project['id'])
+            fetches[mirror_key('project_articles', project['id'])] = partial(projects.list_articles, project['id'])
+        self.parent.mirror_sync.prefetch(fetches)
 
     def search_projects(self, search_text, token):
         """
@@ -425,9 +469,10 @@ class ProjectsWindow(QMdiSubWindow):
         """
         projects = Projects(token)
 
-        result = projects.search(search_text)
+        # Searches the titles of the mirrored project list when offline
+        result = self.parent.local_mirror.search(PROJECTS_KEY, search_text, projects.search)
         if len(result) == 0:
-            result = projects.get_list()
+            result = self.get_project_list(token)
 
         return result
 
@@ -441,6 +486,8 @@ class ProjectsWindow(QMdiSubWindow):
         projects = Projects(token)
         try:
             projects.delete(project_id, safe=False)  # Suppresses command line requirement for acknowledgement
+            mirror = self.parent.local_mirror
+            mirror.store(PROJECTS_KEY, [p for p in mirror.get(PROJECTS_KEY) or [] if p['id'] != project_id])
             return True
         except:
             return False
@@ -0,0 +1,28 @@
+"""
+Makes the Figshare_desktop package importable when the tests are run from a checkout of the repository.
+
+The repository root is the Figshare_desktop package itself, and has no packaging of its own. If the package cannot
+already be imported, for example from a checkout in a directory of another name, the root is registered under the
+package name so that both absolute Figshare_desktop imports and relative imports resolve to the checkout.
+"""
+
+import os
+import sys
+import types
+import importlib.util
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+PACKAGE_NAME = 'Figshare_desktop'
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+if importlib.util.find_spec(PACKAGE_NAME) is None:
+    package = types.ModuleType(PACKAGE_NAME)
+    package.__path__ = [REPO_ROOT]
+    sys.modules[PACKAGE_NAME] = package
@@ -0,0 +1,117 @@
+"""
+Chunked Upload Tests
+
+Drives the resumable uploader against the stand-in Figshare server, interrupting uploads part way through and resuming
+them from the upload journal as a restarted application would.
+"""
+
+import os
+
+import pytest
+from requests import HTTPError
+
+# Figshare Desktop Imports
+from Figshare_desktop.data_window.chunked_upload import ChunkedUploader
+from Figshare_desktop.local_store.upload_journal import (UploadJournal, STATE_COMPLETE, STATE_INITIATED)
+from Figshare_desktop.network.stub_server import StubFigshareServer
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+TOKEN = 'test_token'
+PROJECT_ID = 1
+PART_SIZE = 1024
+FILE_SIZE = 5 * PART_SIZE - 120
+
+
+@pytest.fixture
+def server():
+    server = StubFigshareServer(part_size=PART_SIZE)
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / 'topography.flat'
+    path.write_bytes(os.urandom(FILE_SIZE))
+    return str(path)
+
+
+def open_uploader(server, tmp_path):
+    """
+    Returns an uploader with a newly opened journal, as the application would have after a restart.
+    """
+    journal = UploadJournal(TOKEN, db_path=str(tmp_path / 'journal.sqlite'))
+    return ChunkedUploader(TOKEN, journal, api_base=server.api_base)
+
+
+def test_interrupted_upload_resumes_after_restart(server, data_file, tmp_path):
+    upload_dict = {'title': 'Topography'}
+
+    # Part 3 is refused, interrupting the upload after parts 1 and 2 have been confirmed
+    server.fail('PUT', r'^/upload/\w+/3$', status=400)
+    uploader = open_uploader(server, tmp_path)
+    with pytest.raises(HTTPError):
+        uploader.upload(PROJECT_ID, data_file, upload_dict)
+    uploader.journal.close()
+
+    uploader = open_uploader(server, tmp_path)
+    incomplete = uploader.journal.incomplete()
+    assert len(incomplete) == 1
+    entry = incomplete[0]
+    assert entry['state'] == STATE_INITIATED
+    assert entry['parts'] == {1, 2}
+    assert entry['upload_dict'] == upload_dict
+
+    article_id, bytes_sent = uploader.resume_interrupted(entry)
+
+    # The same article is used and only the parts Figshare did not hold are sent
+    assert article_id == entry['article_id']
+    assert bytes_sent == FILE_SIZE - 2 * PART_SIZE
+    assert server.count_requests('POST', r'/projects/\d+/articles$') == 1
+    assert server.articles[article_id]['metadata'] == upload_dict
+
+    file_id = server.articles[article_id]['files'][0]
+    with open(data_file, 'rb') as f:
+        assert server.file_data(file_id) == f.read()
+    assert server.files[file_id]['status'] == 'available'
+
+    assert uploader.journal.incomplete() == []
+    assert uploader.journal.get(os.path.abspath(data_file), PROJECT_ID)['state'] == STATE_COMPLETE
+
+
+def test_resume_forgets_missing_file(server, data_file, tmp_path):
+    server.fail('PUT', r'^/upload/\w+/2$', status=400)
+    uploader = open_uploader(server, tmp_path)
+    with pytest.raises(HTTPError):
+        uploader.upload(PROJECT_ID, data_file, {'title': 'Topography'})
+
+    os.remove(data_file)
+    entry = uploader.journal.incomplete()[0]
+    with pytest.raises(FileNotFoundError):
+        uploader.resume_interrupted(entry)
+    assert uploader.journal.incomplete() == []
+
+
+def test_completed_upload_of_deleted_article_uploads_again(server, data_file, tmp_path):
+    uploader = open_uploader(server, tmp_path)
+    article_id, bytes_sent = uploader.upload(PROJECT_ID, data_file, {'title': 'Topography'})
+    assert bytes_sent == FILE_SIZE
+
+    # While the article exists the unchanged file is not uploaded twice
+    with pytest.raises(FileExistsError):
+        uploader.upload(PROJECT_ID, data_file, {'title': 'Topography'})
+
+    del server.articles[article_id]
+
+    new_article_id, bytes_sent = uploader.upload(PROJECT_ID, data_file, {'title': 'Topography'})
+    assert new_article_id != article_id
+    assert bytes_sent == FILE_SIZE
+    assert server.count_requests('POST', r'/projects/\d+/articles$') == 2
@@ -0,0 +1,108 @@
+"""
+File Scanner Tests
+
+Scans temporary directory trees, checking the extension filter, the depth and file count limits, and that symbolic
+links back up the tree do not cause a loop.
+"""
+
+import os
+
+import pytest
+
+# Figshare Desktop Imports
+from Figshare_desktop.data_window.file_scanner import FileScanner
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+
+def make_files(directory, names):
+    """
+    Creates empty files in a directory, creating the directory if needed, and returns their paths.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for name in names:
+        path = directory / name
+        path.write_bytes(b'')
+        paths.append(str(path))
+    return paths
+
+
+def names(paths):
+    return sorted(os.path.basename(path) for path in paths)
+
+
+def test_extension_filter_applies_to_directories_only(tmp_path):
+    make_files(tmp_path / 'data', ['a.Z_flat', 'b.I(V)_flat', 'notes.txt'])
+    selected = make_files(tmp_path, ['readme.txt'])
+
+    scanner = FileScanner([str(tmp_path / 'data')] + selected, extensions={'.Z_flat', '.I(V)_flat'})
+    assert names(scanner) == ['a.Z_flat', 'b.I(V)_flat', 'readme.txt']
+
+
+def test_max_depth(tmp_path):
+    make_files(tmp_path, ['0.Z_flat'])
+    make_files(tmp_path / 'one', ['1.Z_flat'])
+    make_files(tmp_path / 'one' / 'two', ['2.Z_flat'])
+
+    assert names(FileScanner([str(tmp_path)], max_depth=0)) == ['0.Z_flat']
+    assert names(FileScanner([str(tmp_path)], max_depth=1)) == ['0.Z_flat', '1.Z_flat']
+    assert names(FileScanner([str(tmp_path)], max_depth=2)) == ['0.Z_flat', '1.Z_flat', '2.Z_flat']
+
+
+def test_max_files_truncates_directories(tmp_path):
+    make_files(tmp_path / 'large', ['{}.Z_flat'.format(i) for i in range(10)])
+
+    scanner = FileScanner([str(tmp_path / 'large')], max_files=4)
+    assert len(list(scanner)) == 4
+    assert scanner.truncated
+    assert scanner.count == 4
+
+
+def test_max_files_not_truncated_at_limit(tmp_path):
+    make_files(tmp_path / 'data', ['{}.Z_flat'.format(i) for i in range(4)])
+
+    scanner = FileScanner([str(tmp_path / 'data')], max_files=4)
+    assert len(list(scanner)) == 4
+    assert not scanner.truncated
+
+
+def test_selected_files_after_large_directory_are_included(tmp_path):
+    make_files(tmp_path / 'large', ['{}.Z_flat'.format(i) for i in range(10)])
+    make_files(tmp_path / 'other', ['other.Z_flat'])
+    selected = make_files(tmp_path, ['selected_1.Z_flat', 'selected_2.Z_flat'])
+
+    paths = [str(tmp_path / 'large'), selected[0], str(tmp_path / 'other'), selected[1]]
+    scanner = FileScanner(paths, max_files=4)
+    found = list(scanner)
+
+    assert len(found) == 6
+    assert set(selected) <= set(found)
+    assert os.path.join(str(tmp_path / 'other'), 'other.Z_flat') not in found
+    assert scanner.truncated
+
+
+def test_files_are_yielded_once(tmp_path):
+    paths = make_files(tmp_path, ['a.Z_flat', 'b.Z_flat'])
+
+    scanner = FileScanner([str(tmp_path), paths[0], str(tmp_path)])
+    assert names(scanner) == ['a.Z_flat', 'b.Z_flat']
+
+
+@pytest.mark.skipif(not hasattr(os, 'symlink'), reason='symbolic links are not supported')
+def test_symlink_loop_is_not_followed(tmp_path):
+    make_files(tmp_path / 'data' / 'sub', ['a.Z_flat'])
+    try:
+        os.symlink(str(tmp_path / 'data'), str(tmp_path / 'data' / 'sub' / 'loop'), target_is_directory=True)
+    except OSError:
+        pytest.skip('symbolic links cannot be created')
+
+    scanner = FileScanner([str(tmp_path / 'data')], max_depth=100)
+    assert names(scanner) == ['a.Z_flat']
+    assert not scanner.truncated
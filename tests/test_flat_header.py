@@ -0,0 +1,72 @@
+"""
+Flat Header Tests
+
+Checks that damaged flat file headers are reported as FlatHeaderError, so that the full loader is used in their place,
+and compares the header reader with the full loader on any real flat files placed in tests/data.
+"""
+
+import io
+import glob
+import os
+import struct
+
+import pytest
+
+# Figshare Desktop Imports
+from Figshare_desktop.local_articles.local_stm_articles.flat_header import (FLAT_MAGIC, FlatHeaderError,
+                                                                            FlatHeaderReader, read_flat_header,
+                                                                            topo_metadata)
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+# Real topography files recorded by the MATRIX software, used to confirm the header field mapping
+FLAT_FIXTURES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), 'data', '*.Z_flat')))
+
+
+def no_axes_channel():
+    """
+    Returns the start of a flat file with no axes and an empty channel, up to the creation time.
+    """
+    empty_string = struct.pack('<I', 0)
+    return FLAT_MAGIC + struct.pack('<I', 0) + empty_string * 3 + struct.pack('<II', 0, 0)
+
+
+def read(data: bytes):
+    return FlatHeaderReader(io.BytesIO(data)).read_header()
+
+
+def test_not_a_flat_file():
+    with pytest.raises(FlatHeaderError):
+        read(b'NOTFLAT0')
+
+
+def test_truncated_header():
+    with pytest.raises(FlatHeaderError):
+        read(no_axes_channel()[:-2])
+
+
+def test_invalid_string():
+    # A lone UTF-16 surrogate cannot be decoded
+    data = FLAT_MAGIC + struct.pack('<I', 1) + struct.pack('<I', 1) + b'\x00\xd8'
+    with pytest.raises(FlatHeaderError):
+        read(data)
+
+
+def test_invalid_creation_time():
+    with pytest.raises(FlatHeaderError):
+        read(no_axes_channel() + struct.pack('<Q', 2 ** 64 - 1))
+
+
+@pytest.mark.skipif(not FLAT_FIXTURES, reason='No real flat files in tests/data')
+@pytest.mark.parametrize('path', FLAT_FIXTURES)
+def test_header_matches_full_loader(path):
+    pytest.importorskip('figshare_interface')
+    from Figshare_desktop.local_articles.local_stm_articles.topo_metadata import load_flat_metadata
+
+    assert topo_metadata(read_flat_header(path)) == load_flat_metadata(path)
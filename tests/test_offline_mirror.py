@@ -0,0 +1,193 @@
+"""
+Offline Mirror Tests
+
+Mirrors article listings and queues edits in a temporary mirror database, sending the edits with stand-in senders and
+checking how edits of the same object are merged, what is left queued when Figshare cannot be reached or refuses an
+edit, and that an edit sent from two threads at once is only sent once.
+"""
+
+import threading
+
+import pytest
+from requests import (ConnectionError as RequestsConnectionError, HTTPError)
+
+# Figshare Desktop Imports
+from Figshare_desktop.local_store.offline_mirror import (LocalMirror, ARTICLE_UPDATE, PROJECTS_KEY, merge_edits,
+                                                         mirror_key)
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    mirror = LocalMirror('test_token', db_path=str(tmp_path / 'mirror.sqlite'))
+    yield mirror
+    mirror.close()
+
+
+class Sender(object):
+    """
+    Stand-in for a Figshare update request, recording each update sent.
+    """
+
+    def __init__(self, error=None):
+        self.error = error
+        self.sent = []
+
+    def __call__(self, object_id, payload):
+        if self.error is not None:
+            raise self.error
+        self.sent.append((object_id, payload))
+
+
+#####
+# Listings
+#####
+
+def test_listed_article_ids(mirror):
+    mirror.store(mirror_key('project_articles', 1), [{'id': 10}, {'id': 11}])
+    mirror.store(mirror_key('collection_articles', 2), [{'id': 11}, {'id': 12}])
+    # Other listings and records are not article listings
+    mirror.store(PROJECTS_KEY, [{'id': 1}])
+    mirror.store(mirror_key('project', 1), {'id': 1, 'title': 'Project'})
+
+    assert mirror.listed_article_ids() == {'10', '11', '12'}
+
+    mirror.store(mirror_key('project_articles', 1), [{'id': 11}])
+    assert mirror.listed_article_ids() == {'11', '12'}
+
+
+#####
+# Queue
+#####
+
+def test_merge_edits():
+    queued = {'title': 'old', 'tags': ['a'], 'custom_fields': {'xres': 256, 'yres': 256}}
+    update = {'title': 'new', 'custom_fields': {'xres': 512}}
+
+    assert merge_edits(queued, update) == {'title': 'new', 'tags': ['a'], 'custom_fields': {'xres': 512, 'yres': 256}}
+    # The queued edit itself is not changed
+    assert queued['custom_fields'] == {'xres': 256, 'yres': 256}
+
+
+def test_queue_edit_merges_edits_of_the_same_object(mirror):
+    first = mirror.queue_edit(ARTICLE_UPDATE, 1, {'title': 'a', 'custom_fields': {'xres': 256}})
+    second = mirror.queue_edit(ARTICLE_UPDATE, '1', {'description': 'b', 'custom_fields': {'yres': 128}})
+    other = mirror.queue_edit(ARTICLE_UPDATE, 2, {'title': 'c'})
+
+    assert second['edit_id'] == first['edit_id']
+    assert second['payload'] == {'title': 'a', 'description': 'b', 'custom_fields': {'xres': 256, 'yres': 128}}
+    assert other['edit_id'] != first['edit_id']
+
+    assert mirror.pending_edits() == [second, other]
+    assert mirror.pending_ids(ARTICLE_UPDATE) == {'1', '2'}
+    assert mirror.pending_count() == 2
+
+
+def test_pending_edits_persist(mirror):
+    edit = mirror.queue_edit(ARTICLE_UPDATE, 1, {'title': 'a'})
+    mirror.close()
+
+    reopened = LocalMirror('test_token', db_path=mirror.db_path)
+    assert reopened.pending_edits() == [edit]
+    reopened.close()
+
+
+def test_remove_edit_keeps_newer_merged_update(mirror):
+    edit = mirror.queue_edit(ARTICLE_UPDATE, 1, {'title': 'a'})
+    merged = mirror.queue_edit(ARTICLE_UPDATE, 1, {'title': 'b'})
+
+    # The edit read before the merge was sent, but the merged update has not been
+    mirror.remove_edit(edit)
+    assert mirror.pending_edits() == [merged]
+
+    mirror.remove_edit(merged)
+    assert mirror.pending_edits() == []
+
+
+#####
+# Sending
+#####
+
+def test_send_edit_removes_sent_edit(mirror):
+    edit = mirror.queue_edit(ARTICLE_UPDATE, 1, {'title': 'a'})
+    send = Sender()
+
+    assert mirror.send_edit(edit, send)
+    assert send.sent == [('1', {'title': 'a'})]
+    assert mirror.pending_edits() == []
+    assert not mirror.offline
+
+
+def test_send_edit_keeps_edit_when_offline(mirror):
+    edit = mirror.queue_edit(ARTICLE_UPDATE, 1, {'title': 'a'})
+
+    assert not mirror.send_edit(edit, Sender(RequestsConnectionError()))
+    assert mirror.offline
+    assert mirror.pending_edits() == [edit]
+
+    # The edit can be sent once Figshare is reachable again
+    assert mirror.send_edit(edit, Sender())
+    assert not mirror.offline
+    assert mirror.pending_edits() == []
+
+
+def test_send_edit_removes_refused_edit(mirror):
+    edit = mirror.queue_edit(ARTICLE_UPDATE, 1, {'title': 'a'})
+
+    with pytest.raises(HTTPError):
+        mirror.send_edit(edit, Sender(HTTPError('400 Client Error')))
+    assert mirror.pending_edits() == []
+    assert not mirror.offline
+
+
+def test_edit_being_sent_is_not_sent_again(mirror):
+    edit = mirror.queue_edit(ARTICLE_UPDATE, 1, {'title': 'a'})
+    started = threading.Event()
+    release = threading.Event()
+    sent = []
+
+    def slow_send(object_id, payload):
+        sent.append((object_id, payload))
+        started.set()
+        release.wait(5)
+
+    thread = threading.Thread(target=mirror.send_edit, args=(edit, slow_send))
+    thread.start()
+    try:
+        assert started.wait(5)
+        # The background sync reads the same edit from the queue while it is being sent
+        pending = mirror.pending_edits()
+        assert pending == [edit]
+        assert not mirror.send_edit(pending[0], slow_send)
+        assert not mirror.offline
+    finally:
+        release.set()
+        thread.join(5)
+
+    assert sent == [('1', {'title': 'a'})]
+    assert mirror.pending_edits() == []
+
+
+def test_update_merged_while_sending_is_sent_later(mirror):
+    edit = mirror.queue_edit(ARTICLE_UPDATE, 1, {'title': 'a'})
+    send = Sender()
+    claimed = mirror.claim_edit(edit)
+    assert claimed
+
+    # An update of the same object made while the edit is being sent is merged into it, but not sent straight away
+    merged = mirror.queue_edit(ARTICLE_UPDATE, 1, {'description': 'b'})
+    assert not mirror.send_edit(merged, send)
+    assert send.sent == []
+
+    mirror.remove_edit(edit)
+    mirror.release_edit(edit)
+    assert mirror.pending_edits() == [merged]
+    assert mirror.send_edit(merged, send)
+    assert send.sent == [('1', {'title': 'a', 'description': 'b'})]
@@ -0,0 +1,233 @@
+"""
+Search Index Tests
+
+Indexes article metadata dictionaries in a temporary Whoosh index and searches them with the typed field queries
+offered by the article search bar.
+"""
+
+import datetime
+
+import pytest
+from whoosh.query import NullQuery
+
+# Figshare Desktop Imports
+from Figshare_desktop.data_window.search_index import (ArticleIndex, to_int, to_float, to_datetime)
+
+__author__ = "Tobias Gill"
+__credits__ = ["Tobias Gill", "Adrian-Tudor Panescu", "Miriam Keshani"]
+__license__ = ""
+__version__ = "0.0.1"
+__maintainer__ = "Tobias Gill"
+__email__ = "toby.gill.09@ucl.ac.uk"
+__status__ = "Development"
+
+SCHEMA = 'figshare_articles'
+
+INDEX_SCHEMA = {
+    'id': ('id', True),
+    'title': ('text', True),
+    'tags': ('keyword', True),
+    'vgap': ('numeric', True),
+    'xres': ('numeric', False),
+    'modified_date': ('datetime', False)
+}
+
+ARTICLES = [
+    {'id': '1', 'title': 'gold surface', 'tags': ['Au', 'STM'], 'vgap': '0.5', 'xres': 256,
+     'modified_date': '2017-03-01T10:00:00Z'},
+    {'id': '2', 'title': 'silver surface', 'tags': ['Ag', 'STM'], 'vgap': 1.0, 'xres': '512',
+     'modified_date': '01/06/2018'},
+    {'id': '3', 'title': 'gold wire', 'tags': 'Au', 'vgap': 2, 'xres': 1024, 'modified_date': 'not a date'}
+]
+
+
+@pytest.fixture
+def article_index(tmp_path):
+    article_index = ArticleIndex(str(tmp_path / 'index'))
+    article_index.create_schema(SCHEMA)
+    article_index.ensure_fields(SCHEMA, INDEX_SCHEMA)
+    article_index.addDocuments(SCHEMA, ARTICLES)
+    yield article_index
+    article_index.delete_index()
+
+
+def search_ids(article_index, field, query):
+    return sorted(fields['id'] for fields in article_index.search(SCHEMA, field, query).values())
+
+
+#####
+# Value Coercion
+#####
+
+@pytest.mark.parametrize('value, expected', [
+    (512, 512), ('512', 512), (' 512 ', 512), ('0.5', 0), (1024.7, 1024), ('x', None), ('', None), (None, None),
+    (True, None), (float('inf'), None), (float('nan'), None)
+])
+def test_to_int(value, expected):
+    assert to_int(value) == expected
+
+
+@pytest.mark.parametrize('value, expected', [
+    (0.5, 0.5), ('0.5', 0.5), (' 2 ', 2.0), (3, 3.0), ('-1e-3', -0.001), ('x', None), (None, None), (False, None),
+    ([1], None)
+])
+def test_to_float(value, expected):
+    assert to_float(value) == expected
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('2017-03-01T10:00:00Z', datetime.datetime(2017, 3, 1, 10)),
+    ('2017-03-01T10:00:00', datetime.datetime(2017, 3, 1, 10)),
+    ('2017-03-01 10:00:00', datetime.datetime(2017, 3, 1, 10)),
+    ('01/06/2018 12:30:15', datetime.datetime(2018, 6, 1, 12, 30, 15)),
+    ('01/06/2018 12:30', datetime.datetime(2018, 6, 1, 12, 30)),
+    ('01/06/2018', datetime.datetime(2018, 6, 1)),
+    (datetime.date(2018, 6, 1), datetime.datetime(2018, 6, 1)),
+    (datetime.datetime(2018, 6, 1, 9), datetime.datetime(2018, 6, 1, 9)),
+    ('not a date', None),
+    ('', None)
+])
+def test_to_datetime(value, expected):
+    assert to_datetime(value) == expected
+
+
+def test_document_dict_coerces_values(article_index):
+    document = article_index.document_dict(SCHEMA, dict(ARTICLES[2], unknown='x', title=''))
+    assert document == {'id': '3', 'tags': 'Au', 'vgap': 2.0, 'xres': 1024.0}
+
+
+#####
+# Typed Field Queries
+#####
+
+@pytest.mark.parametrize('field, query, expected', [
+    ('vgap', 'vgap:[0.5 TO 1]', ['1', '2']),
+    ('vgap', '[0.5 TO 1]', ['1', '2']),
+    ('vgap', 'vgap:{0.5 TO 2]', ['2', '3']),
+    ('', 'vgap:[1 TO]', ['2', '3']),
+    ('xres', 'xres:>=512', ['2', '3']),
+    ('xres', '>=512', ['2', '3']),
+    ('xres', ' <512', ['1']),
+    ('', 'xres:>512 title:gold', ['3'])
+])
+def test_numeric_queries(article_index, field, query, expected):
+    assert search_ids(article_index, field, query) == expected
+
+
+@pytest.mark.parametrize('field, query, expected', [
+    ('modified_date', 'modified_date:[20170101 TO 20171231]', ['1']),
+    ('modified_date', '[2017 TO 2018]', ['1', '2']),
+    ('modified_date', 'modified_date:>20180101', ['2']),
+    ('modified_date', '<20180101', ['1'])
+])
+def test_date_queries(article_index, field, query, expected):
+    assert search_ids(article_index, field, query) == expected
+
+
+def test_text_queries(article_index):
+    assert search_ids(article_index, '', 'gold') == ['1', '3']
+    assert search_ids(article_index, 'title', 'surface') == ['1', '2']
+    assert search_ids(article_index, 'tags', 'STM') == ['1', '2']
+
+
+@pytest.mark.parametrize('field, query', [
+    ('xres', '>='),
+    ('xres', 'xres:>='),
+    ('vgap', 'vgap:[0.5 TO'),
+    ('modified_date', 'modified_date:[2017 TO'),
+    ('modified_date', '>')
+])
+def test_incomplete_queries_match_nothing(article_index, field, query):
+    assert search_ids(article_index, field, query) == []
+
+
+def test_incomplete_comparison_is_null_query(article_index):
+    assert article_index.parse_query(SCHEMA, 'xres', '>=') == NullQuery
+
+
+#####
+# Facets
+#####
+
+def test_facets_group_ids_by_value(article_index):
+    facets = article_index.facets(SCHEMA, ['tags', 'id', 'title', 'missing'])
+
+    # Text fields and fields that are not in the schema cannot be faceted
+    assert set(facets) == {'tags', 'id'}
+    assert facets['tags'] == {'Au': frozenset({'1', '3'}), 'STM': frozenset({'1', '2'}), 'Ag': frozenset({'2'})}
+    assert facets['id'] == {'1': frozenset({'1'}), '2': frozenset({'2'}), '3': frozenset({'3'})}
+
+
+def test_facet_counts(article_index):
+    assert article_index.facet_counts(SCHEMA, ['tags']) == {'tags': {'Au': 2, 'STM': 2, 'Ag': 1}}
+    # Values without any of the given documents are left out
+    assert article_index.facet_counts(SCHEMA, ['tags'], within={'2', '3'}) == {'tags': {'Au': 1, 'STM': 1, 'Ag': 1}}
+    assert article_index.facet_counts(SCHEMA, ['tags'], within={'3'}) == {'tags': {'Au': 1}}
+
+
+def test_facets_follow_index_changes(article_index):
+    assert article_index.facet_counts(SCHEMA, ['tags'])['tags']['Au'] == 2
+
+    article_index.updateDocuments(SCHEMA, [{'id': '3', 'title': 'gold wire', 'tags': 'Pt'}])
+    assert article_index.facet_counts(SCHEMA, ['tags']) == {'tags': {'Au': 1, 'STM': 2, 'Ag': 1, 'Pt': 1}}
+
+    article_index.removeDocumentsByTerm(SCHEMA, 'id', ['1'])
+    assert article_index.facet_counts(SCHEMA, ['tags']) == {'tags': {'STM': 1, 'Ag': 1, 'Pt': 1}}
+
+
+#####
+# Schema Fields
+#####
+
+def test_ensure_fields_adds_missing_fields_in_one_commit(article_index):
+    generation = article_index.schemas[SCHEMA].latest_generation()
+
+    added = article_index.ensure_fields(SCHEMA, dict(INDEX_SCHEMA, sample=('keyword', True), zres=('numeric', True),
+                                                     unknown=('no_such_type', True)))
+
+    assert sorted(added) == ['sample', 'zres']
+    assert {'sample', 'zres'} <= set(article_index.get_fields(SCHEMA))
+    assert 'unknown' not in article_index.get_fields(SCHEMA)
+    assert article_index.schemas[SCHEMA].latest_generation() == generation + 1
+
+    # Nothing is committed when all the fields exist
+    assert article_index.ensure_fields(SCHEMA, INDEX_SCHEMA) == []
+    assert article_index.schemas[SCHEMA].latest_generation() == generation + 1
+
+
+def test_reopened_schema_keeps_fields_and_documents(article_index):
+    article_index.schemas[SCHEMA].close()
+
+    reopened = ArticleIndex(article_index.index_dir)
+    assert reopened.create_schema(SCHEMA)
+    assert reopened.ensure_fields(SCHEMA, INDEX_SCHEMA) == []
+    assert search_ids(reopened, 'xres', '>=512') == ['2', '3']
+
+    # A schema that is not reused starts empty
+    assert not reopened.create_schema(SCHEMA, reuse=False)
+    assert reopened.get_fields(SCHEMA) == []
+
+
+def test_serializer_is_rebuilt_when_fields_change(article_index):
+    serializer = article_index.document_serializer(SCHEMA)
+    assert article_index.document_serializer(SCHEMA) is serializer
+
+    # Writing documents does not change the fields, so the serializer is kept
+    article_index.addDocuments(SCHEMA, [{'id': '4', 'title': 'copper', 'zres': '0.1'}])
+    assert article_index.document_serializer(SCHEMA) is serializer
+    assert 'zres' not in article_index.document_dict(SCHEMA, {'id': '4', 'zres': '0.1'})
+
+    article_index.ensure_fields(SCHEMA, {'zres': ('numeric', True)})
+    assert article_index.document_serializer(SCHEMA) is not serializer
+    assert article_index.document_dict(SCHEMA, {'id': '4', 'zres': '0.1'}) == {'id': '4', 'zres': 0.1}
+
+    article_index.remove_field(SCHEMA, 'zres')
+    assert article_index.document_dict(SCHEMA, {'id': '4', 'zres': '0.1'}) == {'id': '4'}
+
+
+def test_new_field_is_searchable(article_index):
+    article_index.ensure_fields(SCHEMA, {'zres': ('numeric', True)})
+    article_index.updateDocuments(SCHEMA, [dict(ARTICLES[0], zres='0.25')])
+
+    assert search_ids(article_index, 'zres', '<1') == ['1']
+    assert search_ids(article_index, '', 'gold') == ['1', '3']